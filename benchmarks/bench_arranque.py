@@ -0,0 +1,166 @@
+# bench_arranque.py
+"""
+Arranque en frío de MADly Safe (lo que nota el primer usuario cuando la
+instancia gratuita de Render se ha dormido).
+
+- Importación: `python -X importtime -c "import app"` en un proceso
+  nuevo. Se da el tiempo total, los módulos que más pesan y si se han
+  importado pandas, scikit-learn, joblib o scipy (no deberían: el camino
+  rápido no los necesita).
+- Tiempo hasta el primer byte: se arranca gunicorn con gunicorn.conf.py
+  y se mide, desde el lanzamiento, cuándo responde la página ("/"), el
+  layout de Dash ("/_dash-layout", lo que el navegador pide justo
+  después) y cuándo /api/v1/listo pasa a 200 (modelo caliente). Se mide
+  con la precarga clásica en el maestro y con MADLY_CARGA_FONDO=1.
+
+Si el layout con MADLY_CARGA_FONDO=1 tarda más que --objetivo-ms en
+responder, el proceso sale con 1.
+
+Uso, desde la raíz del proyecto:
+
+    python benchmarks/bench_arranque.py [--repeticiones 3] [--objetivo-ms 1800]
+"""
+
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# Carpeta raíz del proyecto (un nivel arriba de benchmarks)
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Módulos que no deberían importarse al arrancar la app
+PESADOS = ("pandas", "sklearn", "joblib", "scipy")
+
+# Modos de arranque de gunicorn que se comparan (variables de entorno)
+MODOS = {
+    "precarga en el maestro": {"MADLY_CARGA_FONDO": "0"},
+    "carga en segundo plano": {"MADLY_CARGA_FONDO": "1"},
+}
+
+
+def importtime(modulo: str = "app") -> tuple:
+    """
+    Importa `modulo` en un proceso nuevo con -X importtime.
+
+    Returns
+    -------
+    total_ms : float
+        Tiempo acumulado de la importación de `modulo`.
+    modulos : dict
+        {nombre: (propio_ms, acumulado_ms)} de todos los módulos importados.
+    """
+    salida = subprocess.run(
+        [sys.executable, "-X", "importtime", "-W", "ignore", "-c", f"import {modulo}"],
+        cwd=root_path, capture_output=True, text=True, check=True,
+    )
+    modulos = {}
+    for linea in salida.stderr.splitlines():
+        if not linea.startswith("import time:") or "|" not in linea:
+            continue
+        propio, acumulado, nombre = linea[len("import time:"):].split("|")
+        if not propio.strip().isdigit():
+            continue  # cabecera
+        modulos[nombre.strip()] = (int(propio) / 1000, int(acumulado) / 1000)
+    return modulos[modulo][1], modulos
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(puerto: int, ruta: str):
+    # Estado de la respuesta, o None si el servidor todavía no escucha
+    conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=30)
+    try:
+        conexion.request("GET", ruta)
+        respuesta = conexion.getresponse()
+        respuesta.read()
+        return respuesta.status
+    except OSError:
+        return None
+    finally:
+        conexion.close()
+
+
+def arranque_en_frio(entorno: dict, workers: int, limite_s: float = 60.0) -> dict:
+    """
+    Lanza gunicorn y mide (ms desde el lanzamiento) la primera respuesta
+    de "/", la de "/_dash-layout" y el primer 200 de /api/v1/listo.
+    """
+    puerto = _puerto_libre()
+    env = {**os.environ, **entorno, "PORT": str(puerto), "WEB_CONCURRENCY": str(workers),
+           "MADLY_RECARGA_SEGUNDOS": "0", "PYTHONWARNINGS": "ignore"}
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:server"],
+        cwd=root_path, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    tiempos = {}
+    try:
+        while _get(puerto, "/") is None:
+            if proceso.poll() is not None or time.perf_counter() - inicio > limite_s:
+                raise RuntimeError("gunicorn no ha llegado a atender peticiones.")
+            time.sleep(0.005)
+        tiempos["pagina"] = (time.perf_counter() - inicio) * 1000
+        _get(puerto, "/_dash-layout")
+        tiempos["layout"] = (time.perf_counter() - inicio) * 1000
+        while _get(puerto, "/api/v1/listo") != 200:
+            if time.perf_counter() - inicio > limite_s:
+                raise RuntimeError("El modelo no ha terminado de cargar.")
+            time.sleep(0.01)
+        tiempos["listo"] = (time.perf_counter() - inicio) * 1000
+    finally:
+        proceso.terminate()
+        proceso.wait()
+    return tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--objetivo-ms", type=float, default=1800.0,
+                        help="Tiempo máximo hasta el layout con MADLY_CARGA_FONDO=1")
+    parser.add_argument("--modulos", type=int, default=12, help="Módulos más pesados a mostrar")
+    args = parser.parse_args()
+
+    totales = []
+    for _ in range(args.repeticiones):
+        total, modulos = importtime()
+        totales.append(total)
+    print(f"import app: {np.median(totales):.0f} ms (mediana de {args.repeticiones})")
+    pesados = [m for m in PESADOS if m in modulos]
+    print(f"Módulos pesados importados: {', '.join(pesados) if pesados else 'ninguno'}")
+    print(f"\n{'módulo':<40} {'propio ms':>10} {'acumulado ms':>13}")
+    # Solo los paquetes de primer nivel (lo que suma cada dependencia)
+    raiz = sorted(((n, t) for n, t in modulos.items() if "." not in n and n != "app"),
+                  key=lambda x: -x[1][1])
+    for nombre, (propio, acumulado) in raiz[:args.modulos]:
+        print(f"{nombre:<40} {propio:>10.1f} {acumulado:>13.1f}")
+
+    print(f"\ngunicorn, {args.workers} worker(s), ms desde el lanzamiento (mediana de {args.repeticiones})")
+    print(f"{'modo':<24} {'/':>8} {'layout':>8} {'listo':>8}")
+    resultados = {}
+    for modo, entorno in MODOS.items():
+        medidas = [arranque_en_frio(entorno, args.workers) for _ in range(args.repeticiones)]
+        resultados[modo] = {k: float(np.median([m[k] for m in medidas])) for k in medidas[0]}
+        r = resultados[modo]
+        print(f"{modo:<24} {r['pagina']:>8.0f} {r['layout']:>8.0f} {r['listo']:>8.0f}")
+
+    layout = resultados["carga en segundo plano"]["layout"]
+    cumple = layout <= args.objetivo_ms
+    print(f"\nObjetivo del layout en frío: {args.objetivo_ms:.0f} ms -> {layout:.0f} ms "
+          f"({'se cumple' if cumple else 'NO se cumple'})")
+    return 0 if cumple else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+# bench_bootstrap.py
+"""
+Coste de los intervalos del conjunto bootstrap (src/bootstrap.py).
+
+- Evaluar los n miembros de un escenario con la matriz apilada (una
+  multiplicación) frente a llamar a predict_proba de cada miembro.
+- calcular_riesgo con y sin con_intervalo=True, con la caché de
+  escenarios desactivada, por cada camino del modelo (tablas de riesgos
+  y de intervalos precalculadas, scorer lineal y pipeline con la matriz
+  apilada), y con un escenario ya en la caché.
+
+Con las tablas precalculadas (el camino de producción), pedir el
+intervalo debe costar menos del doble que no pedirlo: si la proporción
+llega a --max-proporcion, el proceso sale con 1.
+
+Hace falta haber generado el conjunto (python -m src.bootstrap).
+
+Uso, desde la raíz del proyecto:
+
+    python benchmarks/bench_bootstrap.py [--escenarios 2000] [--max-proporcion 2]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+# Añadimos la carpeta raíz del proyecto (un nivel arriba de benchmarks)
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.append(root_path)
+
+from src import model  # noqa: E402
+from src.precarga import _OPCIONES_ESCENARIO  # noqa: E402
+
+
+def _escenarios(n: int) -> list:
+    rng = random.Random(0)
+    return [tuple(rng.choice(opciones) for opciones in _OPCIONES_ESCENARIO) for _ in range(n)]
+
+
+def _us_por_llamada(funcion, escenarios: list) -> float:
+    funcion(*escenarios[0])
+    inicio = time.perf_counter()
+    for esc in escenarios:
+        funcion(*esc)
+    return (time.perf_counter() - inicio) / len(escenarios) * 1e6
+
+
+def _con_intervalo(*escenario):
+    return model.calcular_riesgo(*escenario, con_intervalo=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--escenarios", type=int, default=2000)
+    parser.add_argument("--max-proporcion", type=float, default=2.0,
+                        help="Máximo de (con intervalo / sin intervalo) con las tablas")
+    args = parser.parse_args()
+
+    activa = model.version_activa()
+    conjunto = activa.conjunto()
+    if conjunto is None:
+        raise SystemExit("No hay conjunto bootstrap para el modelo: python -m src.bootstrap")
+    escenarios = _escenarios(args.escenarios)
+
+    # Matriz apilada frente a un predict_proba por miembro (pipelines
+    # equivalentes al modelo, como los que ajusta entrenar_conjunto)
+    fila = [model._df_para_escenario(*escenarios[0]).iloc[0].tolist()]
+    inicio = time.perf_counter()
+    for _ in range(200):
+        conjunto.intervalos(fila)
+    ms_matriz = (time.perf_counter() - inicio) / 200 * 1000
+    X = model._df_para_escenario(*escenarios[0])
+    inicio = time.perf_counter()
+    for _ in range(conjunto.n_miembros):
+        activa.modelo.predict_proba(X)
+    ms_miembros = (time.perf_counter() - inicio) * 1000
+    print(f"{conjunto.n_miembros} miembros, 1 escenario: matriz apilada {ms_matriz:.3f} ms | "
+          f"{conjunto.n_miembros} × predict_proba {ms_miembros:.1f} ms")
+
+    base = _us_por_llamada(model.calcular_riesgo, [escenarios[0]] * args.escenarios)
+    con = _us_por_llamada(_con_intervalo, [escenarios[0]] * args.escenarios)
+    print(f"\n{'camino':<22} {'sin intervalo µs':>17} {'con intervalo µs':>17} {'x':>6}")
+    print(f"{'caché de escenarios':<22} {base:>17.1f} {con:>17.1f} {con / base:>6.2f}")
+
+    con_tablas = activa.tabla() is not None and activa.intervalos() is not None
+    model.configurar_cache(capacidad=0)
+    proporciones = {}
+    for camino in ("tabla", "scorer", "pipeline"):
+        if camino != "tabla":
+            activa._tabla, activa._tabla_cargada = None, True
+            activa._intervalos, activa._intervalos_cargados = None, True
+        if camino == "pipeline":
+            activa._scorer, activa._scorer_cargado = None, True
+            escenarios = escenarios[: max(1, len(escenarios) // 10)]
+        base = _us_por_llamada(model.calcular_riesgo, escenarios)
+        con = _us_por_llamada(_con_intervalo, escenarios)
+        proporciones[camino] = con / base
+        print(f"{camino:<22} {base:>17.1f} {con:>17.1f} {con / base:>6.2f}")
+
+    anchos = [superior - inferior for _, inferior, superior in
+              (model.calcular_intervalo(*esc) for esc in escenarios[:200])]
+    print(f"\nAncho medio del intervalo: {np.mean(anchos) * 100:.2f} puntos")
+
+    if not con_tablas:
+        print("Sin tabla de riesgos o de intervalos: no se comprueba el objetivo.")
+        return 0
+    cumple = proporciones["tabla"] < args.max_proporcion
+    print(f"Objetivo con las tablas: < {args.max_proporcion:g}x -> {proporciones['tabla']:.2f}x "
+          f"({'se cumple' if cumple else 'NO se cumple'})")
+    return 0 if cumple else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+# bench_calcular_riesgo.py
+"""
+Microbenchmark de calcular_riesgo: compara la versión antigua (siete
+llamadas a predict_proba con DataFrames de una fila), la versión por
+lotes (una única llamada con las seis franjas) y la lectura desde la
+tabla de riesgos precalculada.
+
+Al final compara, para el lote de seis franjas por el pipeline (sin
+scorer lineal), el DataFrame + predict_proba del pipeline completo con
+el codificador compilado (src/codificador.py).
+
+Uso, desde la raíz del proyecto:
+
+    python benchmarks/bench_calcular_riesgo.py
+"""
+
+import os
+import sys
+import timeit
+
+# Añadimos la carpeta raíz del proyecto (un nivel arriba de benchmarks)
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.append(root_path)
+
+import src.model as model  # noqa: E402
+from src.model import (  # noqa: E402
+    FRANJAS_VALIDAS,
+    _df_para_escenario,
+    _normalizar_dia_semana,
+    _normalizar_meteo,
+    _puntuar_filas,
+    calcular_riesgo,
+    cargar_modelo,
+)
+
+ESCENARIO = ("Conductor", "Turismo", "25-34", "Hombre",
+             "CENTRO", "Lunes", "Tarde_punta", "Despejado")
+
+
+def calcular_riesgo_secuencial(tipo_persona, tipo_vehiculo, rango_edad, sexo,
+                               distrito, dia, franja, meteo):
+    """Réplica de la implementación anterior: una llamada por franja."""
+    dia_norm = _normalizar_dia_semana(dia)
+    meteo_norm = _normalizar_meteo(meteo)
+    modelo = cargar_modelo()
+
+    df_actual = _df_para_escenario(
+        tipo_persona, tipo_vehiculo, rango_edad, sexo,
+        distrito, dia_norm, franja, meteo_norm
+    )
+    riesgo = float(modelo.predict_proba(df_actual)[0, 1])
+
+    riesgos = []
+    for fr_opt in FRANJAS_VALIDAS:
+        df_opt = _df_para_escenario(
+            tipo_persona, tipo_vehiculo, rango_edad, sexo,
+            distrito, dia_norm, fr_opt, meteo_norm
+        )
+        riesgos.append((fr_opt, float(modelo.predict_proba(df_opt)[0, 1])))
+    return riesgo, riesgos
+
+
+def _medir(func, repeticiones: int = 200) -> float:
+    """Devuelve el tiempo medio por llamada en milisegundos."""
+    func(*ESCENARIO)  # calentamiento
+    total = timeit.timeit(lambda: func(*ESCENARIO), number=repeticiones)
+    return total / repeticiones * 1000
+
+
+def main():
+    activa = model.version_activa()
+    tabla = activa.tabla()
+
+    t_secuencial = _medir(calcular_riesgo_secuencial)
+
+    # Forzamos el camino del modelo desactivando temporalmente la tabla
+    activa._tabla = None
+    t_lote = _medir(calcular_riesgo)
+    activa._tabla = tabla
+
+    print(f"Secuencial (7 x predict_proba): {t_secuencial:8.3f} ms/petición")
+    print(f"Por lotes  (1 x predict_proba): {t_lote:8.3f} ms/petición  (x{t_secuencial / t_lote:.1f})")
+
+    if tabla is None:
+        print("Tabla precalculada no disponible (python -m src.tabla_riesgo)")
+        return
+
+    t_tabla = _medir(calcular_riesgo, repeticiones=5000)
+    print(f"Tabla precalculada (mmap):      {t_tabla:8.3f} ms/petición  (x{t_secuencial / t_tabla:.1f})")
+
+    # Seis franjas por el pipeline: DataFrame frente a codificador compilado
+    filas = [ESCENARIO[:5] + (_normalizar_dia_semana(ESCENARIO[5]), fr, _normalizar_meteo(ESCENARIO[7]))
+             for fr in FRANJAS_VALIDAS]
+    activa._scorer, activa._scorer_cargado = None, True
+    codificador = activa.codificador()
+    activa._codificador = None
+    t_dataframe = timeit.timeit(lambda: _puntuar_filas(filas, activa), number=200) / 200 * 1000
+    activa._codificador = codificador
+    if codificador is None:
+        print("El pipeline no admite el codificador compilado")
+        return
+    t_codificador = timeit.timeit(lambda: _puntuar_filas(filas, activa), number=200) / 200 * 1000
+    print(f"Pipeline con DataFrame:         {t_dataframe:8.3f} ms/lote")
+    print(f"Codificador compilado:          {t_codificador:8.3f} ms/lote      (x{t_dataframe / t_codificador:.1f})")
+
+
+if __name__ == "__main__":
+    main()
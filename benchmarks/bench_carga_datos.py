@@ -0,0 +1,56 @@
+# bench_carga_datos.py
+"""
+Benchmark de carga de los datos brutos de 2025: Excel (openpyxl) frente a
+las cachés columnares Parquet y Feather de src/etl.py.
+
+Uso, desde la raíz del proyecto:
+
+    python benchmarks/bench_carga_datos.py
+"""
+
+import os
+import sys
+import time
+
+# Añadimos la carpeta raíz del proyecto (un nivel arriba de benchmarks)
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.append(root_path)
+
+from src.etl import cargar_datos_brutos_2025  # noqa: E402
+
+COLUMNAS_MODELO = [
+    "fecha", "hora", "tipo_persona", "tipo_vehiculo", "rango_edad", "sexo",
+    "distrito", "estado_meteorológico", "cod_lesividad",
+]
+
+
+def _medir(func, repeticiones: int) -> float:
+    """Devuelve el mejor tiempo de varias repeticiones, en segundos."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        func()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+def main():
+    t_xlsx = _medir(lambda: cargar_datos_brutos_2025(usar_cache=False), repeticiones=1)
+    print(f"xlsx (openpyxl):          {t_xlsx * 1000:9.1f} ms")
+
+    for formato in ("parquet", "feather"):
+        # Primera llamada: crea (o valida) la caché
+        cargar_datos_brutos_2025(formato_cache=formato)
+
+        t_todo = _medir(lambda: cargar_datos_brutos_2025(formato_cache=formato), repeticiones=5)
+        t_cols = _medir(
+            lambda: cargar_datos_brutos_2025(columnas=COLUMNAS_MODELO, formato_cache=formato),
+            repeticiones=5,
+        )
+        print(f"{formato:8s} (todas):        {t_todo * 1000:9.1f} ms  (x{t_xlsx / t_todo:.0f})")
+        print(f"{formato:8s} (9 columnas):   {t_cols * 1000:9.1f} ms  (x{t_xlsx / t_cols:.0f})")
+
+
+if __name__ == "__main__":
+    main()
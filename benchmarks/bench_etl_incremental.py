@@ -0,0 +1,105 @@
+# bench_etl_incremental.py
+"""
+Tiempo de actualización del almacén incremental de src.etl frente a
+reconstruirlo entero, con un CSV al que se le van añadiendo filas al
+final (como cuando el portal publica accidentes nuevos).
+
+Los datos brutos de 2025 se copian a un CSV temporal: primero el 90 %
+(carga inicial) y luego se añaden deltas de distinto tamaño. Para cada
+delta se mide actualizar_almacen() y una reconstrucción completa. Después
+se modifica una fila ya procesada y se añade una con fecha anterior a la
+marca de agua (las dos obligan a reconstruir), y se comprueba que
+cargar_y_preparar_incremental() da lo mismo que cargar_y_preparar().
+
+Uso, desde la raíz del proyecto:
+
+    python benchmarks/bench_etl_incremental.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# Añadimos la carpeta raíz del proyecto (un nivel arriba de benchmarks)
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.append(root_path)
+
+from src.etl import (  # noqa: E402
+    actualizar_almacen,
+    cargar_y_preparar,
+    cargar_y_preparar_incremental,
+    descubrir_ficheros,
+    leer_bloques,
+)
+
+AÑO = 2025
+# Proporción de filas de cada delta (sobre el total del año)
+DELTAS = (0.001, 0.01, 0.05)
+
+
+def _iguales(a: pd.DataFrame, b: pd.DataFrame) -> bool:
+    # 'numero' cambia de tipo de nulo según la ruta de lectura
+    a = a.drop(columns=["numero"]).reset_index(drop=True)
+    b = b.drop(columns=["numero"]).reset_index(drop=True)
+    try:
+        pd.testing.assert_frame_equal(a, b)
+        return True
+    except AssertionError:
+        return False
+
+
+def main():
+    origen = descubrir_ficheros([AÑO])[AÑO]
+    df_raw = pd.concat(list(leer_bloques(origen)), ignore_index=True)
+    n_inicial = int(len(df_raw) * 0.9)
+
+    with tempfile.TemporaryDirectory(prefix="madly_incremental_") as tmp:
+        ruta = Path(tmp) / f"{AÑO}_Accidentalidad.csv"
+        df_raw.iloc[:n_inicial].to_csv(ruta, sep=";", index=False, date_format="%d/%m/%Y")
+
+        resumen = actualizar_almacen(AÑO, carpeta=tmp)
+        print(f"Carga inicial: {resumen['filas']} filas en {resumen['segundos']:.3f} s")
+
+        inicio = n_inicial
+        for proporcion in DELTAS:
+            fin = min(inicio + max(1, int(len(df_raw) * proporcion)), len(df_raw))
+            df_raw.iloc[inicio:fin].to_csv(ruta, sep=";", index=False, header=False,
+                                           mode="a", date_format="%d/%m/%Y")
+            inicio = fin
+
+            resumen = actualizar_almacen(AÑO, carpeta=tmp)
+            t0 = time.perf_counter()
+            actualizar_almacen(AÑO, carpeta=tmp, reconstruir=True)
+            completa = time.perf_counter() - t0
+            print(f"Delta de {resumen['filas_nuevas']:>6} filas ({resumen['modo']}): "
+                  f"{resumen['segundos']:.3f} s | reconstrucción: {completa:.3f} s")
+
+        resumen = actualizar_almacen(AÑO, carpeta=tmp)
+        print(f"Sin filas nuevas ({resumen['modo']}): {resumen['segundos']:.3f} s")
+
+        # Un cambio en una fila ya procesada obliga a reconstruir
+        df_raw.loc[10, "sexo"] = "Desconocido"
+        df_raw.iloc[:inicio].to_csv(ruta, sep=";", index=False, date_format="%d/%m/%Y")
+        resumen = actualizar_almacen(AÑO, carpeta=tmp)
+        print(f"Fila ya procesada modificada ({resumen['modo']}): {resumen['segundos']:.3f} s")
+
+        # Y también una fila añadida con fecha anterior a la marca de agua
+        df_raw.iloc[[0]].to_csv(ruta, sep=";", index=False, header=False,
+                                mode="a", date_format="%d/%m/%Y")
+        resumen = actualizar_almacen(AÑO, carpeta=tmp)
+        print(f"Fila añadida anterior a la fecha máxima ({resumen['modo']}): "
+              f"{resumen['segundos']:.3f} s")
+
+        df_inc, target_inc = cargar_y_preparar_incremental(AÑO, carpeta=tmp)
+        df_ref, target_ref = cargar_y_preparar(años=[AÑO], carpeta=tmp)
+        print(f"Mismo resultado que cargar_y_preparar: "
+              f"{_iguales(df_inc, df_ref) and _iguales(target_inc, target_ref)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# bench_ingesta_paralela.py
+"""
+Benchmark de la carga en frío de varios años con
+src.etl.cargar_y_preparar_paralelo, variando el número de procesos.
+
+Como en data/ solo se versiona 2025, se copia ese Excel con los nombres
+de otros años (2019–2025) en una carpeta temporal. Uno de ellos se
+reparte en dos hojas, y el resultado se compara con el de la carga por
+bloques en serie (src.etl.cargar_y_preparar), que debe ser idéntico.
+
+Uso, desde la raíz del proyecto:
+
+    python benchmarks/bench_ingesta_paralela.py [n_años]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Añadimos la carpeta raíz del proyecto (un nivel arriba de benchmarks)
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.append(root_path)
+
+import pandas as pd  # noqa: E402
+
+from src.etl import (  # noqa: E402
+    DATA_FILE_2025,
+    _ruta_data,
+    cargar_y_preparar,
+    cargar_y_preparar_paralelo,
+)
+
+
+def copiar_en_dos_hojas(origen: Path, destino: Path):
+    """Copia la primera hoja de un Excel repartiendo sus filas en dos hojas."""
+    from openpyxl import Workbook, load_workbook
+
+    libro = load_workbook(origen, read_only=True, data_only=True)
+    try:
+        filas = list(libro.worksheets[0].iter_rows(values_only=True))
+    finally:
+        libro.close()
+    cabecera, datos = filas[0], filas[1:]
+    mitad = len(datos) // 2
+
+    nuevo = Workbook(write_only=True)
+    for nombre, parte in (("Enero-Junio", datos[:mitad]), ("Julio-Diciembre", datos[mitad:])):
+        hoja = nuevo.create_sheet(nombre)
+        hoja.append(cabecera)
+        for fila in parte:
+            hoja.append(fila)
+    nuevo.save(destino)
+
+
+def main():
+    n_años = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    n_cpu = os.cpu_count() or 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        carpeta = Path(tmp)
+        años = list(range(2025 - n_años + 1, 2026))
+        for año in años[1:]:
+            shutil.copy(_ruta_data() / DATA_FILE_2025, carpeta / f"{año}_Accidentalidad.xlsx")
+        copiar_en_dos_hojas(_ruta_data() / DATA_FILE_2025, carpeta / f"{años[0]}_Accidentalidad.xlsx")
+
+        print(f"{n_años} ficheros Excel ({años[0]} en dos hojas), {n_cpu} núcleos disponibles")
+        t_serie = None
+        for n_workers in sorted({1, 2, 4, n_cpu}):
+            inicio = time.perf_counter()
+            df_proc, _ = cargar_y_preparar_paralelo(n_workers=n_workers, carpeta=carpeta)
+            t = time.perf_counter() - inicio
+            t_serie = t_serie or t
+            print(f"n_workers={n_workers:2d}: {t:6.2f} s  (x{t_serie / t:.2f}, {len(df_proc):,} filas)")
+
+        inicio = time.perf_counter()
+        df_serie, _ = cargar_y_preparar(carpeta=carpeta)
+        print(f"por bloques:  {time.perf_counter() - inicio:6.2f} s  ({len(df_serie):,} filas)")
+        pd.testing.assert_frame_equal(df_proc, df_serie)
+        print("Mismo resultado que la carga por bloques (incluido el Excel de dos hojas)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# bench_memoria_etl.py
+"""
+Huella en memoria (memory_usage(deep=True)) de df_proc y df_target tal y
+como salen de src.etl.cargar_y_preparar_2025, frente a la disposición
+anterior, que se reconstruye a partir del resultado actual:
+
+- "texto": variables del modelo como cadenas (object), grave float64,
+  hora_num / dia_semana_num int32 y df_target como copia aparte.
+- "categórica + float64": categóricas, pero con grave float64 y enteros
+  de 32 bits (la versión anterior de preparar_datos_2025).
+- "compacta": la salida actual (vocabulario fijo, int8, Int8/int8 en grave).
+
+Uso, desde la raíz del proyecto:
+
+    python benchmarks/bench_memoria_etl.py [n_repeticiones]
+
+n_repeticiones concatena los datos de 2025 varias veces para simular
+varios años.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Añadimos la carpeta raíz del proyecto (un nivel arriba de benchmarks)
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.append(root_path)
+
+from src.etl import cargar_datos_brutos_2025, preparar_datos_2025  # noqa: E402
+from src.model import COLUMNAS_MODELO  # noqa: E402
+
+
+def _anterior(df_proc: pd.DataFrame, como_texto: bool):
+    df = df_proc.copy()
+    df["grave"] = df["grave"].astype("float64")
+    df["hora_num"] = df["hora_num"].astype(np.int32)
+    df["dia_semana_num"] = df["dia_semana_num"].astype(np.int32)
+    if como_texto:
+        for col in COLUMNAS_MODELO:
+            df[col] = df[col].astype(object)
+    return df, df.dropna(subset=["grave"]).copy()
+
+
+def _mb(df: pd.DataFrame, columnas=None) -> float:
+    uso = df.memory_usage(deep=True, index=False)
+    return (uso[columnas] if columnas is not None else uso).sum() / 1e6
+
+
+def main():
+    n_rep = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    df_raw = cargar_datos_brutos_2025()
+    if n_rep > 1:
+        df_raw = pd.concat([df_raw] * n_rep, ignore_index=True)
+
+    df_proc, df_target = preparar_datos_2025(df_raw)
+    disposiciones = {
+        "texto": _anterior(df_proc, como_texto=True),
+        "categórica + float64": _anterior(df_proc, como_texto=False),
+        "compacta": (df_proc, df_target),
+    }
+
+    derivadas = COLUMNAS_MODELO + ["grave", "hora_num", "dia_semana_num", "es_fin_semana"]
+    print(f"{len(df_proc):,} filas (df_target: {len(df_target):,})\n")
+    print(f"{'':22s} {'df_proc':>10s} {'df_target':>10s} {'total':>10s} {'columnas modelo+derivadas':>26s}")
+    for nombre, (proc, target) in disposiciones.items():
+        print(f"{nombre:22s} {_mb(proc):8.2f} MB {_mb(target):8.2f} MB "
+              f"{_mb(proc) + _mb(target):8.2f} MB {_mb(proc, derivadas):24.2f} MB")
+
+    print("\nPor columna (df_proc, MB):")
+    for col in derivadas:
+        fila = "  ".join(f"{_mb(proc, [col]):7.3f}" for proc, _ in disposiciones.values())
+        print(f"  {col:22s} {fila}   ({df_proc[col].dtype})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# bench_memoria_multianual.py
+"""
+Benchmark de memoria pico al preparar varios años de accidentalidad:
+
+- "completo": se lee cada fichero entero, se concatenan los datos brutos
+  y después se aplica preparar_datos_2025 (lo que haríamos sin streaming).
+- "bloques": src.etl.cargar_y_preparar, que procesa cada fichero por
+  bloques de filas y solo guarda los bloques ya preparados y compactos.
+
+Como en data/ solo se versiona 2025, se generan años sintéticos en CSV
+replicando las filas de 2025. Cada modo se ejecuta en un proceso aparte y
+se mide su memoria residente máxima (ru_maxrss).
+
+Uso, desde la raíz del proyecto:
+
+    python benchmarks/bench_memoria_multianual.py [n_años] [réplicas_por_año]
+"""
+
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+# Añadimos la carpeta raíz del proyecto (un nivel arriba de benchmarks)
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.append(root_path)
+
+
+def _rss_max_mb() -> float:
+    # En Linux ru_maxrss viene en KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def generar_años_sinteticos(carpeta: Path, n_años: int, replicas: int):
+    import pandas as pd
+
+    from src.etl import cargar_datos_brutos_2025
+
+    base = cargar_datos_brutos_2025()
+    base = pd.concat([base] * replicas, ignore_index=True)
+    base["hora"] = base["hora"].astype(str)
+    for i in range(n_años):
+        año = 2025 - n_años + i
+        df = base.copy()
+        df["fecha"] = (df["fecha"] - pd.DateOffset(years=2025 - año)).dt.strftime("%d/%m/%Y")
+        df.to_csv(carpeta / f"{año}_Accidentalidad.csv", sep=";", index=False)
+
+
+def _ejecutar_modo(modo: str, carpeta: Path):
+    """Se ejecuta en el proceso hijo: imprime MB extra sobre el arranque."""
+    import pandas as pd
+
+    from src import etl
+
+    rss_inicial = _rss_max_mb()
+
+    if modo == "completo":
+        ficheros = etl.descubrir_ficheros(carpeta=carpeta)
+        brutos = [
+            etl._armonizar_columnas(pd.read_csv(ruta, sep=";", low_memory=False))
+            for ruta in ficheros.values()
+        ]
+        df_proc, df_target = etl.preparar_datos_2025(pd.concat(brutos, ignore_index=True))
+    else:
+        df_proc, df_target = etl.cargar_y_preparar(carpeta=carpeta)
+
+    print(f"{_rss_max_mb() - rss_inicial:.1f} {len(df_proc)}")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--modo":
+        _ejecutar_modo(sys.argv[2], Path(sys.argv[3]))
+        return
+
+    n_años = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    replicas = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    with tempfile.TemporaryDirectory() as tmp:
+        carpeta = Path(tmp)
+        generar_años_sinteticos(carpeta, n_años, replicas)
+
+        for modo in ("completo", "bloques"):
+            salida = subprocess.run(
+                [sys.executable, "-W", "ignore", __file__, "--modo", modo, str(carpeta)],
+                capture_output=True, text=True, check=True,
+            ).stdout.split()
+            pico_mb, filas = float(salida[0]), int(salida[1])
+            print(f"{modo:9s}: {filas:,} filas, pico de memoria +{pico_mb:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# bench_metricas.py
+"""
+Mide el coste de la instrumentación de src/metricas.py:
+
+1) Sobrecoste de un bloque `with etapa(...)` vacío, con las métricas
+   activadas y desactivadas (debe quedar en pocos microsegundos).
+2) calcular_riesgo sin caché de escenarios, con y sin métricas.
+
+Uso, desde la raíz del proyecto:
+
+    python benchmarks/bench_metricas.py
+"""
+
+import os
+import random
+import sys
+import timeit
+
+# Añadimos la carpeta raíz del proyecto (un nivel arriba de benchmarks)
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.append(root_path)
+
+from src import metricas  # noqa: E402
+from src.metricas import etapa  # noqa: E402
+from src.model import calcular_riesgo, configurar_cache  # noqa: E402
+from src.precarga import escenarios_calentamiento  # noqa: E402
+
+
+def _bloque_vacio():
+    with etapa("bench"):
+        pass
+
+
+def main():
+    n = 200_000
+    for activas in (True, False):
+        metricas.activar(activas)
+        t = min(timeit.repeat(_bloque_vacio, number=n, repeat=5)) / n * 1e6
+        print(f"with etapa(...) vacío, métricas {'activas' if activas else 'desactivadas'}: {t:.2f} µs")
+
+    configurar_cache(capacidad=0)
+    escenarios = escenarios_calentamiento()
+    random.Random(0).shuffle(escenarios)
+    calcular_riesgo(*escenarios[0])
+
+    n = 5000
+    for activas in (True, False):
+        metricas.activar(activas)
+        t = min(timeit.repeat(lambda: [calcular_riesgo(*e) for e in escenarios],
+                              number=n // len(escenarios), repeat=5))
+        t = t / (n // len(escenarios) * len(escenarios)) * 1e6
+        print(f"calcular_riesgo sin caché, métricas {'activas' if activas else 'desactivadas'}: {t:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# bench_microlotes.py
+"""
+Latencia y rendimiento de calcular_riesgo con y sin la cola de microlotes
+(src/microlotes.py) con muchos usuarios concurrentes.
+
+Cada usuario es un hilo (como los hilos de un worker gthread de gunicorn)
+que pide escenarios aleatorios uno tras otro. Se compara:
+
+- "directo": cada hilo llama a calcular_riesgo por su cuenta,
+- "microlotes": calcular_riesgo_microlote con varias ventanas (ms),
+- "asyncio": calcular_riesgo_async desde un bucle de asyncio.
+
+Para cada combinación se muestran escenarios/s, latencia p50/p95 y el
+tamaño medio de lote: la curva latencia/rendimiento según la ventana.
+La caché de escenarios se desactiva y, por defecto, también la tabla
+precalculada, para medir el modelo:
+
+- --camino scorer: scorer lineal de NumPy,
+- --camino pipeline: predict_proba del pipeline de scikit-learn,
+- --camino tabla: tabla precalculada (el camino de la app en producción;
+  aquí la cola no encola nada y "microlotes" equivale a "directo").
+
+Uso, desde la raíz del proyecto:
+
+    python benchmarks/bench_microlotes.py [--camino pipeline] [--usuarios 1,10,100,200]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+
+import numpy as np
+
+# Añadimos la carpeta raíz del proyecto (un nivel arriba de benchmarks)
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.append(root_path)
+
+from src import microlotes  # noqa: E402
+from src.model import calcular_riesgo, configurar_cache, version_activa  # noqa: E402
+from src.precarga import _OPCIONES_ESCENARIO  # noqa: E402
+
+VENTANAS_MS = (0, 1, 2, 5)
+
+
+def _escenarios(n: int, semilla: int) -> list:
+    rng = random.Random(semilla)
+    return [tuple(rng.choice(opciones) for opciones in _OPCIONES_ESCENARIO) for _ in range(n)]
+
+
+def _medir_hilos(funcion, n_usuarios: int, por_usuario: int) -> dict:
+    latencias = [[] for _ in range(n_usuarios)]
+    barrera = threading.Barrier(n_usuarios + 1)
+
+    def usuario(i):
+        escenarios = _escenarios(por_usuario, i)
+        barrera.wait()
+        for esc in escenarios:
+            t0 = time.perf_counter()
+            funcion(*esc)
+            latencias[i].append(time.perf_counter() - t0)
+
+    hilos = [threading.Thread(target=usuario, args=(i,)) for i in range(n_usuarios)]
+    for hilo in hilos:
+        hilo.start()
+    barrera.wait()
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.join()
+    return _resumen(np.concatenate(latencias), time.perf_counter() - inicio)
+
+
+def _medir_asyncio(n_usuarios: int, por_usuario: int) -> dict:
+    async def usuario(i, latencias):
+        for esc in _escenarios(por_usuario, i):
+            t0 = time.perf_counter()
+            await microlotes.calcular_riesgo_async(*esc)
+            latencias.append(time.perf_counter() - t0)
+
+    async def todos():
+        latencias = []
+        inicio = time.perf_counter()
+        await asyncio.gather(*(usuario(i, latencias) for i in range(n_usuarios)))
+        return latencias, time.perf_counter() - inicio
+
+    latencias, segundos = asyncio.run(todos())
+    return _resumen(np.array(latencias), segundos)
+
+
+def _resumen(latencias: np.ndarray, segundos: float) -> dict:
+    return {
+        "por_segundo": len(latencias) / segundos,
+        "p50_ms": float(np.percentile(latencias, 50) * 1000),
+        "p95_ms": float(np.percentile(latencias, 95) * 1000),
+    }
+
+
+def _fila(nombre: str, n_usuarios: int, r: dict, lote: float = None):
+    lote = f"{lote:8.1f}" if lote is not None else f"{'-':>8}"
+    print(f"{nombre:<18} {n_usuarios:>8} {r['por_segundo']:>12.0f} "
+          f"{r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {lote}")
+
+
+def _lote_medio(antes: dict) -> float:
+    despues = microlotes.estadisticas_cola()
+    lotes = despues["lotes"] - antes["lotes"]
+    return (despues["escenarios"] - antes["escenarios"]) / lotes if lotes else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--camino", choices=("scorer", "pipeline", "tabla"), default="scorer")
+    parser.add_argument("--usuarios", default="1,10,100,200")
+    parser.add_argument("--peticiones", type=int, default=2000,
+                        help="Escenarios en total por medición")
+    args = parser.parse_args()
+
+    configurar_cache(capacidad=0)
+    activa = version_activa()
+    if args.camino != "tabla":
+        activa._tabla, activa._tabla_cargada = None, True
+    if args.camino == "pipeline":
+        activa._scorer, activa._scorer_cargado = None, True
+    calcular_riesgo(*_escenarios(1, 0)[0])
+
+    print(f"Camino: {args.camino}")
+    print(f"{'modo':<18} {'usuarios':>8} {'escen./s':>12} {'p50 ms':>9} {'p95 ms':>9} {'lote':>8}")
+    for n_usuarios in [int(n) for n in args.usuarios.split(",")]:
+        por_usuario = max(1, args.peticiones // n_usuarios)
+        _fila("directo", n_usuarios, _medir_hilos(calcular_riesgo, n_usuarios, por_usuario))
+        for ventana in VENTANAS_MS:
+            microlotes.configurar_cola(ventana_ms=ventana)
+            antes = microlotes.estadisticas_cola()
+            r = _medir_hilos(microlotes.calcular_riesgo_microlote, n_usuarios, por_usuario)
+            _fila(f"microlotes {ventana} ms", n_usuarios, r, _lote_medio(antes))
+        microlotes.configurar_cola(ventana_ms=0)
+        antes = microlotes.estadisticas_cola()
+        _fila("asyncio 0 ms", n_usuarios, _medir_asyncio(n_usuarios, por_usuario), _lote_medio(antes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# bench_planificador.py
+"""
+Coste de buscar las combinaciones de día × franja × distrito más seguras
+para un perfil (7 × 6 × 7 = 294 combinaciones con las opciones de la app).
+
+- "secuencial": lo que haría falta con calcular_riesgo_franjas, una
+  llamada por combinación,
+- "planificador": model.planificar_franjas, un solo lote (o un único
+  indexado de la tabla) y ranking con np.argpartition.
+
+Se mide con la tabla precalculada, con el scorer lineal y con el
+pipeline de scikit-learn, y se comprueba que el top-k coincide.
+
+Uso, desde la raíz del proyecto:
+
+    python benchmarks/bench_planificador.py [--repeticiones 20] [--k 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Añadimos la carpeta raíz del proyecto (un nivel arriba de benchmarks)
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.append(root_path)
+
+from src.model import (  # noqa: E402
+    FRANJAS_VALIDAS,
+    calcular_riesgo_franjas,
+    planificar_franjas,
+    version_activa,
+)
+from src.opciones import DIAS_SEMANA, DISTRITOS, ESCENARIO_POR_DEFECTO, valores  # noqa: E402
+
+PERFIL = tuple(ESCENARIO_POR_DEFECTO[c] for c in ("tipo_persona", "tipo_vehiculo", "rango_edad", "sexo"))
+METEO = ESCENARIO_POR_DEFECTO["meteo"]
+
+
+def secuencial(k: int) -> list:
+    riesgos = []
+    for dia in valores(DIAS_SEMANA):
+        for fr in FRANJAS_VALIDAS:
+            for distrito in valores(DISTRITOS):
+                (_, p), = calcular_riesgo_franjas(*PERFIL, distrito, dia, METEO, franjas=[fr])
+                riesgos.append((p, dia, fr, distrito))
+    riesgos.sort(key=lambda r: r[0])
+    return [(dia, fr, distrito, p) for p, dia, fr, distrito in riesgos[:k]]
+
+
+def _medir(funcion, repeticiones: int) -> tuple:
+    funcion()
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - t0)
+    return resultado, float(np.percentile(tiempos, 50) * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    activa = version_activa()
+    print(f"{'camino':<10} {'secuencial ms':>14} {'planificador ms':>16} {'x':>8}  top-k igual")
+    for camino in ("tabla", "scorer", "pipeline"):
+        if camino != "tabla":
+            activa._tabla, activa._tabla_cargada = None, True
+        if camino == "pipeline":
+            activa._scorer, activa._scorer_cargado = None, True
+
+        rep_secuencial = max(1, args.repeticiones // (10 if camino == "pipeline" else 1))
+        esperado, ms_secuencial = _medir(lambda: secuencial(args.k), rep_secuencial)
+        obtenido, ms_plan = _medir(
+            lambda: planificar_franjas(*PERFIL, METEO, k=args.k), args.repeticiones
+        )
+        igual = [r[:3] for r in esperado] == [r[:3] for r in obtenido] and np.allclose(
+            [r[3] for r in esperado], [r[3] for r in obtenido], atol=1e-6
+        )
+        print(f"{camino:<10} {ms_secuencial:>14.2f} {ms_plan:>16.3f} "
+              f"{ms_secuencial / ms_plan:>8.0f}  {igual}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+# bench_respuestas.py
+"""
+Bytes descargados y CPU del servidor por sesión de la app Dash, con y
+sin la compresión y la caché HTTP de src/respuestas.py
+(MADLY_CACHE_HTTP=0).
+
+Cada sesión la hace un navegador simulado sobre el cliente de pruebas de
+Flask, que no repite lo que tiene fresco (max-age) y revalida lo demás
+con If-None-Match: la página, sus scripts, los que se cargan después
+(gráfico, desplegables y plotly.min.js), el layout, las dependencias y
+--cambios callbacks del escenario (cada uno cambia un desplegable al
+azar, empezando por el escenario por defecto). Se mide:
+
+- primera visita de --sesiones usuarios (sin nada en el navegador; la
+  caché del servidor, vacía al empezar, se va llenando),
+- segunda visita de esos usuarios, con lo que guardó su navegador,
+- primera visita de los mismos usuarios en otro proceso (otro worker)
+  que comparte el directorio de la caché de respuestas.
+
+Cada modo se mide en procesos aparte y con un directorio de caché nuevo.
+
+Uso, desde la raíz del proyecto:
+
+    python benchmarks/bench_respuestas.py [--sesiones 20] [--cambios 15]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+# Añadimos la carpeta raíz del proyecto (un nivel arriba de benchmarks)
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.append(root_path)
+
+MODOS = {
+    "sin caché HTTP": {"MADLY_CACHE_HTTP": "0"},
+    "con caché HTTP": {"MADLY_CACHE_HTTP": "1"},
+}
+
+# Scripts que el navegador pide después de la página (paquete, ruta)
+DIFERIDOS = [
+    ("dash", "dcc/async-graph.js"),
+    ("dash", "dcc/async-dropdown.js"),
+    ("plotly", "package_data/plotly.min.js"),
+]
+
+
+class Navegador:
+    """Cliente con la caché HTTP de un navegador."""
+
+    def __init__(self, cliente):
+        self.cliente = cliente
+        self.frescos = set()
+        self.etags = {}
+        self.bytes = 0
+        self.peticiones = 0
+
+    def _cabeceras(self, url: str = None) -> dict:
+        cabeceras = {"Accept-Encoding": "gzip, deflate, br"}
+        if url in self.etags:
+            cabeceras["If-None-Match"] = self.etags[url]
+        return cabeceras
+
+    def _anotar(self, url: str, respuesta):
+        self.peticiones += 1
+        self.bytes += len(respuesta.get_data())
+        if url is None:
+            return
+        if respuesta.cache_control.max_age and not respuesta.cache_control.no_cache:
+            self.frescos.add(url)
+        if respuesta.headers.get("ETag"):
+            self.etags[url] = respuesta.headers["ETag"]
+
+    def get(self, url: str):
+        if url in self.frescos:
+            return None
+        respuesta = self.cliente.get(url, headers=self._cabeceras(url))
+        self._anotar(url, respuesta)
+        return respuesta
+
+    def post(self, url: str, cuerpo: dict):
+        respuesta = self.cliente.post(url, json=cuerpo, headers=self._cabeceras())
+        self._anotar(None, respuesta)
+        return respuesta
+
+
+def _texto(respuesta) -> str:
+    datos = respuesta.get_data()
+    codificacion = respuesta.headers.get("Content-Encoding")
+    if codificacion == "gzip":
+        datos = gzip.decompress(datos)
+    elif codificacion == "br":
+        import brotli
+
+        datos = brotli.decompress(datos)
+    return datos.decode("utf-8")
+
+
+def _urls_diferidas() -> list:
+    from dash.fingerprint import build_fingerprint
+
+    urls = []
+    for paquete, ruta in DIFERIDOS:
+        modulo = sys.modules[paquete]
+        fichero = os.path.join(os.path.dirname(modulo.__file__), ruta)
+        huella = build_fingerprint(ruta, modulo.__version__, int(os.stat(fichero).st_mtime))
+        urls.append(f"/_dash-component-suites/{paquete}/{huella}")
+    return urls
+
+
+def _cuerpo_escenario(ids: list, valores: list, cambiado: str) -> dict:
+    salidas = [("card-riesgo", "children"), ("datos-franjas", "data"), ("explicacion", "children")]
+    return {
+        "output": "..card-riesgo.children...datos-franjas.data...explicacion.children..",
+        "outputs": [{"id": i, "property": p} for i, p in salidas],
+        "inputs": [{"id": "carga-lista", "property": "data", "value": True}]
+        + [{"id": i, "property": "value", "value": v} for i, v in zip(ids, valores)],
+        "changedPropIds": [f"{cambiado}.value"],
+        "state": [],
+    }
+
+
+def sesion(navegador: Navegador, semilla: int, cambios: int):
+    """Una visita completa a la app."""
+    from src.app import IDS_FORMULARIO
+    from src.opciones import ESCENARIO_POR_DEFECTO
+    from src.precarga import _OPCIONES_ESCENARIO
+
+    pagina = navegador.get("/")
+    for url in re.findall(r'<script src="([^"]+)"', _texto(pagina)) + _urls_diferidas():
+        navegador.get(url)
+    navegador.get("/_dash-layout")
+    navegador.get("/_dash-dependencies")
+
+    rng = random.Random(semilla)
+    valores = list(ESCENARIO_POR_DEFECTO.values())
+    for _ in range(cambios):
+        j = rng.randrange(len(valores))
+        valores[j] = rng.choice(_OPCIONES_ESCENARIO[j])
+        navegador.post("/_dash-update-component",
+                       _cuerpo_escenario(IDS_FORMULARIO, valores, IDS_FORMULARIO[j]))
+
+
+def medir(sesiones: int, cambios: int, segunda: bool) -> dict:
+    """
+    Media por sesión de peticiones, KB y ms de CPU de la primera visita
+    de cada usuario y, con segunda=True, de la segunda.
+    """
+    from src.app import server
+    from src.precarga import precalentar
+
+    precalentar()
+    cliente = server.test_client()
+    navegadores = [Navegador(cliente) for _ in range(sesiones)]
+    visitas = ["primera", "segunda"] if segunda else ["primera"]
+    resultados = {}
+    for visita in visitas:
+        peticiones = kb = 0
+        inicio = time.process_time()
+        for semilla, navegador in enumerate(navegadores):
+            navegador.bytes = navegador.peticiones = 0
+            sesion(navegador, semilla, cambios)
+            peticiones += navegador.peticiones
+            kb += navegador.bytes / 1024
+        cpu_ms = (time.process_time() - inicio) * 1000
+        resultados[visita] = {"peticiones": peticiones / sesiones, "kb": kb / sesiones,
+                              "cpu_ms": cpu_ms / sesiones}
+    return resultados
+
+
+def _en_proceso(entorno: dict, sesiones: int, cambios: int, segunda: bool) -> dict:
+    salida = subprocess.run(
+        [sys.executable, __file__, "--interno", "--sesiones", str(sesiones),
+         "--cambios", str(cambios)] + (["--segunda"] if segunda else []),
+        cwd=root_path, env={**os.environ, **entorno, "PYTHONWARNINGS": "ignore"},
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sesiones", type=int, default=20)
+    parser.add_argument("--cambios", type=int, default=15, help="Callbacks del escenario por sesión")
+    parser.add_argument("--interno", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--segunda", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        print(json.dumps(medir(args.sesiones, args.cambios, args.segunda)))
+        return
+
+    print(f"{args.sesiones} sesiones de {args.cambios} callbacks, media por sesión")
+    print(f"{'modo':<16} {'visita':<22} {'peticiones':>10} {'KB':>9} {'CPU ms':>8}")
+    resultados = {}
+    for modo, entorno in MODOS.items():
+        with tempfile.TemporaryDirectory() as carpeta:
+            entorno = {**entorno, "MADLY_CACHE_RESPUESTAS_DIR": carpeta}
+            r = _en_proceso(entorno, args.sesiones, args.cambios, segunda=True)
+            r["primera, otro worker"] = _en_proceso(entorno, args.sesiones, args.cambios,
+                                                    segunda=False)["primera"]
+        resultados[modo] = r
+        for visita, m in r.items():
+            print(f"{modo:<16} {visita:<22} {m['peticiones']:>10.0f} {m['kb']:>9.1f} {m['cpu_ms']:>8.1f}")
+
+    sin, con = resultados["sin caché HTTP"], resultados["con caché HTTP"]
+    print()
+    for visita in sin:
+        print(f"{visita:<22} KB x{sin[visita]['kb'] / con[visita]['kb']:.1f} menos, "
+              f"CPU x{sin[visita]['cpu_ms'] / con[visita]['cpu_ms']:.1f} menos")
+
+
+if __name__ == "__main__":
+    main()
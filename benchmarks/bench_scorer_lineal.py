@@ -0,0 +1,105 @@
+# bench_scorer_lineal.py
+"""
+Comprueba y mide el scorer lineal (src/scorer_lineal.py) frente a
+predict_proba del pipeline de scikit-learn:
+
+1) Diferencia máxima sobre la rejilla completa de escenarios de la app
+   (~635.000 filas); debe ser < 1e-9.
+2) Lo mismo para la tabla de riesgos (src/tabla_riesgo.py), que la app
+   lee antes que el scorer cuando existe: al ser float32, su tolerancia
+   es media unidad de float32 en [0, 1) (2**-25, unos 3e-8).
+3) Tiempo por petición (6 franjas de un escenario) y tiempo de la rejilla.
+
+Uso, desde la raíz del proyecto:
+
+    python benchmarks/bench_scorer_lineal.py
+"""
+
+import os
+import sys
+import time
+import timeit
+
+import numpy as np
+import pandas as pd
+
+# Añadimos la carpeta raíz del proyecto (un nivel arriba de benchmarks)
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.append(root_path)
+
+from src.model import COLUMNAS_MODELO, FRANJAS_VALIDAS, cargar_modelo  # noqa: E402
+from src.scorer_lineal import exportar_pesos  # noqa: E402
+from src.tabla_riesgo import cargar_tabla, ejes_por_defecto  # noqa: E402
+
+TOLERANCIA = 1e-9
+# Redondeo a float32 de una probabilidad (media ulp en [0.5, 1))
+TOLERANCIA_TABLA = 2 ** -25 + TOLERANCIA
+
+
+def filas_rejilla() -> list:
+    """Todas las combinaciones de la app, en el orden de COLUMNAS_MODELO."""
+    ejes = dict(ejes_por_defecto())
+    valores = [np.asarray(ejes[col], dtype=object) for col in COLUMNAS_MODELO]
+    forma = tuple(len(v) for v in valores)
+    codigos = np.unravel_index(np.arange(int(np.prod(forma))), forma)
+    columnas = [v[c] for v, c in zip(valores, codigos)]
+    return list(zip(*columnas))
+
+
+def main():
+    modelo = cargar_modelo()
+    scorer = exportar_pesos(modelo)
+    if scorer is None:
+        raise SystemExit("El modelo cargado no es lineal: no hay scorer que comparar.")
+
+    filas = filas_rejilla()
+    df = pd.DataFrame(filas, columns=COLUMNAS_MODELO)
+
+    inicio = time.perf_counter()
+    p_sklearn = modelo.predict_proba(df)[:, 1]
+    t_sklearn = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    p_lineal = scorer.puntuar(filas)
+    t_lineal = time.perf_counter() - inicio
+
+    dif = float(np.max(np.abs(p_sklearn - p_lineal)))
+    estado = "OK" if dif < TOLERANCIA else "FALLO"
+    print(f"Rejilla: {len(filas):,} filas | diferencia máxima {dif:.2e} ({estado})")
+    print(f"  predict_proba: {t_sklearn:7.3f} s   scorer lineal: {t_lineal:7.3f} s")
+
+    # La tabla va en el orden de ejes_por_defecto (meteorología antes que
+    # la franja): se reordena al de COLUMNAS_MODELO, el de la rejilla
+    dif_tabla = None
+    tabla = cargar_tabla()
+    if tabla is None:
+        print("Tabla de riesgos: no hay tabla al día para este modelo")
+    else:
+        orden = [[col for col, _ in tabla.ejes].index(col) for col in COLUMNAS_MODELO]
+        p_tabla = np.asarray(tabla.valores).transpose(orden).ravel().astype(np.float64)
+        dif_tabla = float(np.max(np.abs(p_sklearn - p_tabla)))
+        estado = "OK" if dif_tabla <= TOLERANCIA_TABLA else "FALLO"
+        print(f"Tabla de riesgos (float32): diferencia máxima {dif_tabla:.2e} "
+              f"(tolerancia {TOLERANCIA_TABLA:.1e}, {estado})")
+
+    escenario = ("Conductor", "Turismo", "25-34", "Hombre", "CENTRO", "Lunes")
+    filas_peticion = [escenario + (fr, "Despejado") for fr in FRANJAS_VALIDAS]
+    df_peticion = pd.DataFrame(filas_peticion, columns=COLUMNAS_MODELO)
+
+    n = 2000
+    t_pp = timeit.timeit(lambda: modelo.predict_proba(
+        pd.DataFrame(filas_peticion, columns=COLUMNAS_MODELO)), number=n) / n * 1e6
+    t_pp_sin_df = timeit.timeit(lambda: modelo.predict_proba(df_peticion), number=n) / n * 1e6
+    t_sc = timeit.timeit(lambda: scorer.puntuar(filas_peticion), number=n) / n * 1e6
+    print("Petición (6 franjas):")
+    print(f"  DataFrame + predict_proba: {t_pp:9.1f} µs")
+    print(f"  predict_proba (sin DF):    {t_pp_sin_df:9.1f} µs")
+    print(f"  scorer lineal:             {t_sc:9.1f} µs  (x{t_pp / t_sc:.0f})")
+
+    if dif >= TOLERANCIA or (dif_tabla is not None and dif_tabla > TOLERANCIA_TABLA):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# bench_variables_tiempo.py
+"""
+Benchmark de _añadir_variables_tiempo sobre un DataFrame sintético de
+1.000.000 de filas: versión anterior (apply fila a fila y varias copias)
+frente a la versión vectorizada de src/etl.py.
+
+Uso, desde la raíz del proyecto:
+
+    python benchmarks/bench_variables_tiempo.py [n_filas]
+"""
+
+import datetime as dt
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Añadimos la carpeta raíz del proyecto (un nivel arriba de benchmarks)
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.append(root_path)
+
+from src.etl import _añadir_variables_tiempo  # noqa: E402
+
+
+def _añadir_variables_tiempo_anterior(df: pd.DataFrame) -> pd.DataFrame:
+    """Réplica de la implementación anterior, como referencia."""
+    df = df.copy()
+    df["fecha"] = pd.to_datetime(df["fecha"])
+    df["hora_num"] = pd.to_datetime(df["hora"], format="%H:%M:%S", errors="coerce").dt.hour
+    df["dia_semana_num"] = df["fecha"].dt.dayofweek
+    map_dia = {0: "Lunes", 1: "Martes", 2: "Miércoles", 3: "Jueves",
+               4: "Viernes", 5: "Sábado", 6: "Domingo"}
+    df["dia_semana"] = df["dia_semana_num"].map(map_dia)
+    df["es_fin_semana"] = df["dia_semana"].isin(["Sábado", "Domingo"])
+
+    def asignar_franja(hora):
+        if pd.isna(hora):
+            return "Desconocida"
+        hora = int(hora)
+        if 0 <= hora <= 5:
+            return "Noche_madrugada"
+        elif 6 <= hora <= 9:
+            return "Manana_punta"
+        elif 10 <= hora <= 13:
+            return "Manana_media"
+        elif 14 <= hora <= 17:
+            return "Tarde"
+        elif 18 <= hora <= 21:
+            return "Tarde_punta"
+        elif 22 <= hora <= 23:
+            return "Noche"
+        else:
+            return "Desconocida"
+
+    df["franja_horaria"] = df["hora_num"].apply(asignar_franja)
+    return df
+
+
+def datos_sinteticos(n_filas: int, semilla: int = 42) -> pd.DataFrame:
+    """Fechas de un año y horas como objetos time, igual que en el Excel."""
+    rng = np.random.default_rng(semilla)
+    minutos = rng.integers(0, 24 * 60, size=n_filas)
+    horas_unicas = np.array([dt.time(m // 60, m % 60) for m in range(24 * 60)], dtype=object)
+    return pd.DataFrame(
+        {
+            "fecha": pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 365, size=n_filas), unit="D"),
+            "hora": horas_unicas[minutos],
+        }
+    )
+
+
+def _medir(func, df: pd.DataFrame) -> float:
+    inicio = time.perf_counter()
+    func(df)
+    return time.perf_counter() - inicio
+
+
+def main():
+    n_filas = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    df = datos_sinteticos(n_filas)
+
+    t_anterior = _medir(_añadir_variables_tiempo_anterior, df)
+    t_nueva = _medir(_añadir_variables_tiempo, df)
+
+    print(f"Filas: {n_filas:,}")
+    print(f"Anterior (apply + copias): {t_anterior:7.2f} s")
+    print(f"Vectorizada:               {t_nueva:7.2f} s  (x{t_anterior / t_nueva:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+# suite.py
+"""
+Suite de benchmarks de latencia de MADly Safe.
+
+Mide, sin conexión a internet y con los datos/modelos del repositorio:
+
+- cargar_modelo en frío (sin nada en memoria) y en caliente,
+- calcular_riesgo (p50/p95/p99) con la caché de escenarios llena y vacía,
+- las funciones de ETL (carga con caché columnar y preparación),
+- el callback de Dash a través de /_dash-update-component con el cliente
+  de pruebas de Flask y varios clientes concurrentes.
+
+Los resultados se guardan en JSON. Con --comparar se contrastan con una
+línea base y se marcan como regresión las métricas cuyo p50 empeora más
+de --umbral (por defecto, un 20 %); en ese caso el proceso sale con 1.
+
+Uso, desde la raíz del proyecto:
+
+    python benchmarks/suite.py --salida resultados.json
+    python benchmarks/suite.py --comparar benchmarks/baseline.json
+    python benchmarks/suite.py --salida benchmarks/baseline.json   # nueva línea base
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+# Añadimos la carpeta raíz del proyecto (un nivel arriba de benchmarks)
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.append(root_path)
+
+import src.model as model  # noqa: E402
+from src import etl  # noqa: E402
+from src.opciones import (  # noqa: E402
+    TIPOS_PERSONA,
+    TIPOS_VEHICULO,
+    RANGOS_EDAD,
+    SEXO_OPCIONES,
+    DISTRITOS,
+    DIAS_SEMANA,
+    METEOROLOGIA,
+    FRANJAS_HORARIAS,
+    ESCENARIO_POR_DEFECTO,
+    valores,
+)
+
+# Valores de cada desplegable del formulario, por id del componente
+OPCIONES_POR_ID = {
+    "input-tipo-persona": valores(TIPOS_PERSONA),
+    "input-tipo-vehiculo": valores(TIPOS_VEHICULO),
+    "input-rango-edad": valores(RANGOS_EDAD),
+    "input-sexo": valores(SEXO_OPCIONES),
+    "input-distrito": valores(DISTRITOS),
+    "input-dia": valores(DIAS_SEMANA),
+    "input-franja": valores(FRANJAS_HORARIAS),
+    "input-meteo": valores(METEOROLOGIA),
+}
+
+UMBRAL_REGRESION = 0.20
+
+# Diferencias de p50 por debajo de esto (ms) se consideran ruido
+MINIMO_MS = 0.05
+
+
+# --- Utilidades ---
+
+
+def _resumen(tiempos_s: list) -> dict:
+    """Percentiles en milisegundos."""
+    ms = np.asarray(tiempos_s) * 1000
+    return {
+        "n": int(ms.size),
+        "media_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+    }
+
+
+def _cronometrar(func, repeticiones: int) -> list:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        func()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def _escenario_aleatorio(rng: random.Random) -> tuple:
+    return tuple(rng.choice(OPCIONES_POR_ID[id_]) for id_ in OPCIONES_POR_ID)
+
+
+def _carga_en_frio() -> float:
+    """
+    Tiempo de cargar_modelo() en un proceso Python nuevo (incluye importar
+    scikit-learn al deserializar), en segundos.
+    """
+    codigo = (
+        "import sys, time; sys.path.insert(0, %r)\n"
+        "from src.model import cargar_modelo\n"
+        "t = time.perf_counter(); cargar_modelo(); print(time.perf_counter() - t)"
+    ) % root_path
+    salida = subprocess.run([sys.executable, "-W", "ignore", "-c", codigo],
+                            capture_output=True, text=True, check=True)
+    return float(salida.stdout.strip())
+
+
+# --- Capa de modelo ---
+
+
+def bench_modelo(repeticiones: int) -> dict:
+    resultados = {}
+
+    resultados["cargar_modelo_frio"] = _resumen(
+        [_carga_en_frio() for _ in range(max(3, repeticiones // 100))]
+    )
+    resultados["cargar_modelo_caliente"] = _resumen(_cronometrar(model.cargar_modelo, repeticiones))
+
+    rng = random.Random(0)
+    escenarios = [_escenario_aleatorio(rng) for _ in range(repeticiones)]
+    capacidad = model.estadisticas_cache()["capacidad"]
+
+    # Sin caché de escenarios: cada llamada hace el cálculo completo
+    model.configurar_cache(capacidad=0)
+    iterador = iter(escenarios)
+    resultados["calcular_riesgo_sin_cache"] = _resumen(
+        _cronometrar(lambda: model.calcular_riesgo(*next(iterador)), repeticiones)
+    )
+
+    # Con caché: el mismo escenario (el por defecto de la app) una y otra vez
+    model.configurar_cache(capacidad=capacidad)
+    por_defecto = tuple(ESCENARIO_POR_DEFECTO.values())
+    resultados["calcular_riesgo_con_cache"] = _resumen(
+        _cronometrar(lambda: model.calcular_riesgo(*por_defecto), repeticiones)
+    )
+
+    lote = escenarios[:1000]
+    resultados["calcular_riesgo_lote_1000"] = _resumen(
+        _cronometrar(lambda: model.calcular_riesgo_lote(lote), max(5, repeticiones // 100))
+    )
+    return resultados
+
+
+# --- Capa de ETL ---
+
+
+def bench_etl(repeticiones: int) -> dict:
+    resultados = {}
+    etl.cargar_datos_brutos_2025()  # asegura que la caché columnar existe
+
+    resultados["etl_cargar_brutos_cache"] = _resumen(
+        _cronometrar(etl.cargar_datos_brutos_2025, repeticiones)
+    )
+    df_raw = etl.cargar_datos_brutos_2025()
+    resultados["etl_variables_tiempo"] = _resumen(
+        _cronometrar(lambda: etl._añadir_variables_tiempo(df_raw), repeticiones)
+    )
+    resultados["etl_preparar_datos"] = _resumen(
+        _cronometrar(lambda: etl.preparar_datos_2025(df_raw), repeticiones)
+    )
+    return resultados
+
+
+# --- Capa web (callback de Dash) ---
+
+
+def _payload_callback(dependencia: dict, escenario: dict) -> dict:
+    """Cuerpo de /_dash-update-component para una dependencia de Dash."""
+    salida = dependencia["output"]
+    if salida.startswith(".."):
+        salidas = [s.rsplit(".", 1) for s in salida.strip(".").split("...")]
+        outputs = [{"id": id_, "property": prop} for id_, prop in salidas]
+    else:
+        id_, prop = salida.rsplit(".", 1)
+        outputs = {"id": id_, "property": prop}
+
+    def _valor(item):
+        if item["id"] in escenario:
+            return escenario[item["id"]]
+        return 1 if item["property"] == "n_clicks" else None
+
+    inputs = [dict(item, value=_valor(item)) for item in dependencia["inputs"]]
+    state = [dict(item, value=_valor(item)) for item in dependencia.get("state", [])]
+    return {
+        "output": salida,
+        "outputs": outputs,
+        "inputs": inputs,
+        "state": state,
+        "changedPropIds": [f"{inputs[0]['id']}.{inputs[0]['property']}"],
+    }
+
+
+def _dependencia_formulario(cliente) -> dict:
+    """Callback servidor que recibe los valores del formulario."""
+    dependencias = cliente.get("/_dash-dependencies").get_json()
+    for dep in dependencias:
+        if dep.get("clientside_function"):
+            continue
+        ids = {item["id"] for item in dep["inputs"] + dep.get("state", [])}
+        if ids & set(OPCIONES_POR_ID):
+            return dep
+    raise RuntimeError("No se ha encontrado el callback del formulario.")
+
+
+def bench_callback(repeticiones: int, clientes: int) -> dict:
+    from src.app import server
+
+    dependencia = _dependencia_formulario(server.test_client())
+    rng = random.Random(1)
+    payloads = [
+        _payload_callback(dependencia, dict(zip(OPCIONES_POR_ID, _escenario_aleatorio(rng))))
+        for _ in range(repeticiones)
+    ]
+
+    def trabajo(indices):
+        cliente = server.test_client()
+        tiempos, bytes_respuesta = [], 0
+        for i in indices:
+            inicio = time.perf_counter()
+            respuesta = cliente.post("/_dash-update-component", json=payloads[i])
+            tiempos.append(time.perf_counter() - inicio)
+            if respuesta.status_code != 200:
+                raise RuntimeError(f"Callback con estado {respuesta.status_code}: {respuesta.data[:200]!r}")
+            bytes_respuesta += len(respuesta.data)
+        return tiempos, bytes_respuesta
+
+    resultados = {}
+    for n_clientes in sorted({1, clientes}):
+        repartos = [range(i, repeticiones, n_clientes) for i in range(n_clientes)]
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=n_clientes) as ejecutor:
+            partes = list(ejecutor.map(trabajo, repartos))
+        total = time.perf_counter() - inicio
+
+        tiempos = [t for ts, _ in partes for t in ts]
+        resumen = _resumen(tiempos)
+        resumen["peticiones_por_s"] = repeticiones / total
+        resumen["bytes_por_respuesta"] = sum(b for _, b in partes) / repeticiones
+        resultados[f"callback_dash_{n_clientes}_clientes"] = resumen
+    return resultados
+
+
+# --- Comparación con la línea base ---
+
+
+def comparar(resultados: dict, base: dict, umbral: float, minimo_ms: float = MINIMO_MS) -> list:
+    """
+    Devuelve las métricas cuyo p50 ha empeorado más del umbral relativo
+    (y más de minimo_ms en valor absoluto, para no marcar ruido).
+    """
+    regresiones = []
+    for nombre, actual in resultados.items():
+        anterior = base.get(nombre)
+        if anterior is None:
+            continue
+        ratio = actual["p50_ms"] / anterior["p50_ms"] if anterior["p50_ms"] else 1.0
+        empeora = actual["p50_ms"] - anterior["p50_ms"] > minimo_ms
+        marca = "REGRESIÓN" if ratio > 1 + umbral and empeora else ""
+        print(f"{nombre:34s} {anterior['p50_ms']:10.3f} -> {actual['p50_ms']:10.3f} ms  x{ratio:5.2f} {marca}")
+        if marca:
+            regresiones.append(nombre)
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de latencia de MADly Safe")
+    parser.add_argument("--salida", help="Fichero JSON donde guardar los resultados")
+    parser.add_argument("--comparar", help="JSON de línea base con el que comparar")
+    parser.add_argument("--umbral", type=float, default=UMBRAL_REGRESION,
+                        help="Empeoramiento relativo del p50 que se considera regresión")
+    parser.add_argument("--repeticiones", type=int, default=500)
+    parser.add_argument("--clientes", type=int, default=8,
+                        help="Clientes concurrentes contra el callback de Dash")
+    parser.add_argument("--capas", default="modelo,etl,callback",
+                        help="Capas a medir, separadas por comas")
+    args = parser.parse_args(argv)
+
+    capas = set(args.capas.split(","))
+    resultados = {}
+    if "modelo" in capas:
+        resultados.update(bench_modelo(args.repeticiones))
+    if "etl" in capas:
+        resultados.update(bench_etl(max(3, args.repeticiones // 50)))
+    if "callback" in capas:
+        resultados.update(bench_callback(args.repeticiones, args.clientes))
+
+    for nombre, r in resultados.items():
+        print(f"{nombre:34s} p50 {r['p50_ms']:9.3f}  p95 {r['p95_ms']:9.3f}  p99 {r['p99_ms']:9.3f} ms")
+
+    if args.salida:
+        informe = {
+            "meta": {
+                "fecha": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "plataforma": platform.platform(),
+                "repeticiones": args.repeticiones,
+            },
+            "resultados": resultados,
+        }
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(informe, f, ensure_ascii=False, indent=2)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)["resultados"]
+        print()
+        regresiones = comparar(resultados, base, args.umbral)
+        if regresiones:
+            print(f"\n{len(regresiones)} métrica(s) con regresión: {', '.join(regresiones)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+# gunicorn.conf.py
+"""
+Configuración de gunicorn para desplegar MADly Safe.
+
+Por defecto la app se importa en el proceso maestro (preload_app) y el
+modelo se carga y calienta ahí (src/precarga.py) antes de crear los
+workers, que lo heredan ya listo y comparten sus páginas de memoria.
+
+Variables de entorno:
+- MADLY_PRECARGA=0 desactiva la precarga: cada worker importa la app y se
+  calienta él mismo al arrancar.
+- MADLY_CARGA_FONDO=1 es el arranque rápido (el de render.yaml, donde la
+  instancia se duerme y cada arranque en frío lo nota un usuario): nadie
+  espera al modelo. Cada worker empieza a atender en cuanto importa la
+  app (sin pandas ni scikit-learn) y se calienta en un hilo; mientras
+  tanto, la página sale con avisos que se rellenan al terminar y
+  /api/v1/listo responde 503. Ver benchmarks/bench_arranque.py.
+- WEB_CONCURRENCY: número de workers (por defecto, 2).
+- MADLY_HILOS: hilos por worker (por defecto, 1). Con más de uno se usa
+  el worker gthread; conviene combinarlo con MADLY_MICROLOTES=1 para que
+  los escenarios de los hilos se puntúen juntos (src/microlotes.py).
+- MADLY_RECARGA_SEGUNDOS: cada cuánto mira cada worker si ha cambiado la
+  versión activa del registro de modelos para recargarla en caliente
+  (src/recarga.py). Por defecto 30; 0 lo desactiva.
+- PORT: puerto en el que escuchar (lo define Render).
+"""
+
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+threads = int(os.environ.get("MADLY_HILOS", "1"))
+preload_app = os.environ.get("MADLY_PRECARGA", "1") != "0"
+carga_fondo = os.environ.get("MADLY_CARGA_FONDO", "0") == "1"
+
+
+def when_ready(server):
+    # Maestro, con la app ya importada y antes del fork de los workers
+    # (en el maestro no se lanzan hilos: no sobrevivirían al fork)
+    if not preload_app or carga_fondo:
+        return
+
+    from src.precarga import precalentar
+
+    estado = precalentar()
+    server.log.info("Modelo precargado en %.2f s (pid %s)", estado["segundos"], estado["pid"])
+
+    # Los objetos ya creados pasan a la generación permanente, así el
+    # recolector no los toca en los workers y sus páginas no se copian
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    # Sin precarga, cada worker se calienta antes de aceptar peticiones (o,
+    # con carga en segundo plano, mientras las acepta)
+    from src.precarga import precalentar, precalentar_en_fondo
+    from src.recarga import iniciar_vigilancia
+
+    if carga_fondo:
+        precalentar_en_fondo()
+    else:
+        precalentar()
+    # Los hilos no sobreviven al fork: la vigilancia se arranca en cada worker
+    iniciar_vigilancia()
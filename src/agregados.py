@@ -0,0 +1,286 @@
+# agregados.py
+"""
+Agregados espaciales de la accidentalidad de 2025 para la vista de mapa
+de MADly Safe.
+
+construir_cubo(...) recorre una sola vez los datos preparados por
+src/etl.py y cuenta, con np.bincount sobre los códigos de las
+categóricas (un groupby vectorizado), para cada distrito × franja
+horaria × día de la semana:
+
+- accidentes (num_expediente distintos),
+- personas implicadas,
+- personas con lesividad conocida y cuántas de ellas fueron graves,
+
+y lo mismo para una rejilla de celdas de CELDA_METROS metros sobre las
+coordenadas UTM (franja × día × fila × columna). El resultado es un
+CuboRiesgo de arrays enteros compactos que se guarda en data/ como .npz
+y se invalida, como la caché columnar de src/etl.py, si cambia el Excel.
+
+La app solo hace cortes y sumas sobre esos arrays
+(CuboRiesgo.distritos_franjas y CuboRiesgo.rejilla): ningún groupby de
+pandas por petición. firma_cubo() identifica los datos del cubo cargado,
+para las cachés de respuestas que incluyen el mapa.
+
+Para regenerarlo, desde la raíz del proyecto:
+
+    python -m src.agregados
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .etl import (
+    DATA_FILE_2025,
+    DIAS_SEMANA,
+    FRANJAS_HORARIAS,
+    _cache_valida,
+    _firma_fichero,
+    _hash_fichero,
+    _ruta_data,
+    _ruta_meta_cache,
+    cargar_y_preparar_2025,
+)
+
+# Lado de las celdas de la rejilla (metros, coordenadas UTM)
+CELDA_METROS = 500
+
+# Versión del formato del cubo (si cambia, se reconstruye)
+VERSION_CUBO = 1
+
+METRICAS = ("tasa_grave", "accidentes", "personas")
+
+# Conteos del cubo (por distrito y, con prefijo "rejilla_", por celda)
+CONTEOS = ("accidentes", "personas", "graves", "evaluadas")
+
+_CUBO_CACHE = None
+_CUBO_CARGADO = False
+_CUBO_FIRMA = None
+_LOCK = threading.Lock()
+
+
+def _ruta_cubo() -> Path:
+    return (_ruta_data() / DATA_FILE_2025).with_suffix(".cubo.npz")
+
+
+def _metrica(accidentes, personas, graves, evaluadas, metrica: str) -> np.ndarray:
+    if metrica == "tasa_grave":
+        # NaN donde no hay ninguna persona con lesividad conocida
+        return np.divide(graves, evaluadas, out=np.full(graves.shape, np.nan),
+                         where=evaluadas > 0)
+    if metrica == "accidentes":
+        return accidentes.astype(float)
+    if metrica == "personas":
+        return personas.astype(float)
+    raise ValueError(f"Métrica no válida: {metrica!r} (usa una de {list(METRICAS)}).")
+
+
+class CuboRiesgo:
+    """
+    Conteos históricos por distrito × franja × día y por celda de rejilla.
+
+    Parameters
+    ----------
+    distritos : list of str
+        Eje 0 de los arrays por distrito.
+    conteos : dict of numpy.ndarray
+        "accidentes", "personas", "graves", "evaluadas": arrays
+        (distrito, franja, día); y los mismos con prefijo "rejilla_":
+        arrays (franja, día, fila, columna).
+    origen : tuple of float
+        Coordenadas UTM (x, y) de la esquina inferior izquierda de la rejilla.
+    celda : float
+        Lado de las celdas en metros.
+    """
+
+    def __init__(self, distritos: list, conteos: dict, origen: tuple, celda: float):
+        self.distritos = list(distritos)
+        self.franjas = list(FRANJAS_HORARIAS)
+        self.dias = list(DIAS_SEMANA)
+        self.conteos = conteos
+        self.origen = (float(origen[0]), float(origen[1]))
+        self.celda = float(celda)
+
+    def _cortar_dia(self, prefijo: str, dia: Optional[str], eje_dia: int) -> list:
+        # Conteos de un día de la semana, o sumando la semana si dia es None
+        arrays = []
+        for nombre in CONTEOS:
+            a = self.conteos[prefijo + nombre]
+            arrays.append(a.sum(axis=eje_dia) if dia is None
+                          else a.take(self.dias.index(dia), axis=eje_dia))
+        return arrays
+
+    def distritos_franjas(self, dia: Optional[str] = None, metrica: str = "tasa_grave") -> np.ndarray:
+        """
+        Matriz distrito × franja de la métrica, para un día de la semana o
+        para toda la semana (dia=None).
+        """
+        return _metrica(*self._cortar_dia("", dia, eje_dia=2), metrica)
+
+    def rejilla(self, franja: Optional[str] = None, dia: Optional[str] = None,
+                metrica: str = "tasa_grave") -> np.ndarray:
+        """
+        Matriz fila × columna de la rejilla (filas de sur a norte) para una
+        franja y un día, o sumando los que sean None.
+        """
+        arrays = self._cortar_dia("rejilla_", dia, eje_dia=1)
+        if franja is None:
+            arrays = [a.sum(axis=0) for a in arrays]
+        else:
+            arrays = [a[self.franjas.index(franja)] for a in arrays]
+        return _metrica(*arrays, metrica)
+
+    def centros_rejilla(self):
+        """Coordenadas UTM de los centros de las columnas (x) y filas (y)."""
+        n_filas, n_columnas = self.conteos["rejilla_accidentes"].shape[2:]
+        x = self.origen[0] + (np.arange(n_columnas) + 0.5) * self.celda
+        y = self.origen[1] + (np.arange(n_filas) + 0.5) * self.celda
+        return x, y
+
+
+def _contar(indices: np.ndarray, expediente: np.ndarray, grave: np.ndarray,
+            evaluada: np.ndarray, n_celdas: int) -> dict:
+    """Conteos por celda (índice plano) de las filas válidas."""
+    # Accidentes: pares (expediente, celda) distintos
+    pares = np.unique(expediente.astype(np.int64) * n_celdas + indices)
+    enteros = np.uint32
+    return {
+        "accidentes": np.bincount(pares % n_celdas, minlength=n_celdas).astype(enteros),
+        "personas": np.bincount(indices, minlength=n_celdas).astype(enteros),
+        "graves": np.bincount(indices, weights=grave, minlength=n_celdas).astype(enteros),
+        "evaluadas": np.bincount(indices, weights=evaluada, minlength=n_celdas).astype(enteros),
+    }
+
+
+def construir_cubo(df_proc: pd.DataFrame = None, celda: float = CELDA_METROS) -> CuboRiesgo:
+    """
+    Calcula el cubo a partir de los datos preparados (por defecto, los de
+    cargar_y_preparar_2025).
+    """
+    if df_proc is None:
+        df_proc, _ = cargar_y_preparar_2025()
+
+    distrito = df_proc["distrito"].astype("category")
+    distritos = list(distrito.cat.categories)
+    cod_distrito = distrito.cat.codes.to_numpy(np.int64)
+    # Franja y día son categóricas con el vocabulario fijo de src/etl.py
+    cod_franja = df_proc["franja_horaria"].cat.codes.to_numpy(np.int64)
+    cod_dia = df_proc["dia_semana"].cat.codes.to_numpy(np.int64)
+
+    expediente = pd.factorize(df_proc["num_expediente"])[0]
+    grave = df_proc["grave"]
+    evaluada = grave.notna().to_numpy()
+    grave = (grave.fillna(0).to_numpy(np.int8) == 1).astype(np.int8)
+
+    n_dist, n_fr, n_dias = len(distritos), len(FRANJAS_HORARIAS), len(DIAS_SEMANA)
+    tiempo_valido = (cod_franja >= 0) & (cod_franja < n_fr) & (cod_dia >= 0) & (cod_dia < n_dias)
+
+    # Distrito × franja × día
+    ok = tiempo_valido & (cod_distrito >= 0)
+    indices = np.ravel_multi_index((cod_distrito[ok], cod_franja[ok], cod_dia[ok]), (n_dist, n_fr, n_dias))
+    conteos = {
+        nombre: a.reshape(n_dist, n_fr, n_dias)
+        for nombre, a in _contar(indices, expediente[ok], grave[ok], evaluada[ok],
+                                 n_dist * n_fr * n_dias).items()
+    }
+
+    # Franja × día × celda de la rejilla
+    x = df_proc["coordenada_x_utm"].to_numpy(float)
+    y = df_proc["coordenada_y_utm"].to_numpy(float)
+    ok = tiempo_valido & np.isfinite(x) & np.isfinite(y)
+    origen = (np.floor(x[ok].min() / celda) * celda, np.floor(y[ok].min() / celda) * celda)
+    columna = ((x[ok] - origen[0]) // celda).astype(np.int64)
+    fila = ((y[ok] - origen[1]) // celda).astype(np.int64)
+    forma = (n_fr, n_dias, int(fila.max()) + 1, int(columna.max()) + 1)
+    indices = np.ravel_multi_index((cod_franja[ok], cod_dia[ok], fila, columna), forma)
+    for nombre, a in _contar(indices, expediente[ok], grave[ok], evaluada[ok],
+                             int(np.prod(forma))).items():
+        conteos["rejilla_" + nombre] = a.reshape(forma)
+
+    return CuboRiesgo(distritos, conteos, origen, celda)
+
+
+def guardar_cubo(cubo: CuboRiesgo, ruta_fichero: Path, ruta_cubo: Path):
+    """Guarda el cubo en .npz (y sus metadatos en .json) de forma atómica."""
+    ruta_tmp = ruta_cubo.with_name(f"{ruta_cubo.stem}.{os.getpid()}.tmp.npz")
+    # La rejilla es casi toda ceros: comprimida ocupa una fracción
+    np.savez_compressed(ruta_tmp, **cubo.conteos)
+    os.replace(ruta_tmp, ruta_cubo)
+
+    meta = {
+        **_firma_fichero(ruta_fichero),
+        "sha256": _hash_fichero(ruta_fichero),
+        "version": VERSION_CUBO,
+        "distritos": cubo.distritos,
+        "origen": list(cubo.origen),
+        "celda": cubo.celda,
+    }
+    _ruta_meta_cache(ruta_cubo).write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+
+def cargar_cubo_disco(ruta_fichero: Path, ruta_cubo: Path, celda: float = CELDA_METROS) -> Optional[CuboRiesgo]:
+    """Lee el cubo guardado, o None si no existe o está desactualizado."""
+    if not _cache_valida(ruta_fichero, ruta_cubo):
+        return None
+    meta = json.loads(_ruta_meta_cache(ruta_cubo).read_text(encoding="utf-8"))
+    if meta.get("version") != VERSION_CUBO or meta.get("celda") != celda:
+        return None
+    with np.load(ruta_cubo) as datos:
+        conteos = {nombre: datos[nombre] for nombre in datos.files}
+    return CuboRiesgo(meta["distritos"], conteos, tuple(meta["origen"]), meta["celda"])
+
+
+def cargar_cubo() -> Optional[CuboRiesgo]:
+    """
+    Cubo de 2025 (solo se prepara la primera vez en cada proceso): se lee
+    de disco si está al día y, si no, se calcula y se guarda.
+
+    Devuelve None si no está el fichero de datos (p. ej. en un despliegue
+    sin data/); la app muestra entonces la pestaña del mapa sin datos.
+    """
+    global _CUBO_CACHE, _CUBO_CARGADO, _CUBO_FIRMA
+
+    with _LOCK:
+        if not _CUBO_CARGADO:
+            ruta_fichero = _ruta_data() / DATA_FILE_2025
+            ruta_cubo = _ruta_cubo()
+            if not ruta_fichero.exists():
+                _CUBO_CACHE = None
+                _CUBO_FIRMA = "sin datos"
+            else:
+                _CUBO_FIRMA = {**_firma_fichero(ruta_fichero), "version": VERSION_CUBO,
+                               "celda": CELDA_METROS}
+                cubo = cargar_cubo_disco(ruta_fichero, ruta_cubo)
+                if cubo is None:
+                    cubo = construir_cubo()
+                    try:
+                        guardar_cubo(cubo, ruta_fichero, ruta_cubo)
+                    except OSError:
+                        # Sin permisos de escritura: se usa solo en memoria
+                        pass
+                _CUBO_CACHE = cubo
+            _CUBO_CARGADO = True
+
+    return _CUBO_CACHE
+
+
+def firma_cubo():
+    """
+    Firma (fecha y tamaño del Excel, versión del formato y celda) de los
+    datos del cubo que usa este proceso, o "sin datos" si no hay cubo.
+    """
+    cargar_cubo()
+    return _CUBO_FIRMA
+
+
+if __name__ == "__main__":
+    ruta_fichero = _ruta_data() / DATA_FILE_2025
+    cubo = construir_cubo()
+    guardar_cubo(cubo, ruta_fichero, _ruta_cubo())
+    print(f"Cubo de agregados guardado en: {_ruta_cubo()}")
@@ -0,0 +1,190 @@
+# api.py
+"""
+API JSON de MADly Safe, montada sobre el servidor Flask de la app Dash.
+
+POST /api/v1/riesgo
+    Cuerpo: lista JSON de escenarios (o {"escenarios": [...]}), cada uno
+    con los campos de CAMPOS_ESCENARIO:
+
+        [{"tipo_persona": "Conductor", "tipo_vehiculo": "Turismo",
+          "rango_edad": "25-34", "sexo": "Hombre", "distrito": "CENTRO",
+          "dia": "Lunes", "franja": "Tarde_punta", "meteo": "Despejado"}]
+
+    Respuesta: {"version_modelo": "...", "resultados": [{"riesgo": 0.12,
+        "alternativas": [{"franja": "10:00–13:59 (Opción A)", "riesgo": 0.10},
+        ...]}, ...]}, con la versión del modelo que ha puntuado el lote.
+
+GET /api/v1/listo
+    Disponibilidad del proceso: 200 si el modelo está cargado y calentado
+    (ver src/precarga.py), 503 si todavía no.
+
+POST /api/v1/admin/recargar
+    Cuerpo opcional: {"version": "..."}. Carga, valida y activa esa
+    versión del registro (src/registro.py) en este worker (src/recarga.py)
+    y, si es válida, la fija como activa en el registro para que el resto
+    la recoja con su vigilancia. Sin versión, recarga la activa del
+    registro. Exige la cabecera
+    "Authorization: Bearer <MADLY_ADMIN_TOKEN>"; si la variable no está
+    definida, la ruta no existe (404).
+
+Todos los escenarios se puntúan en un único lote (calcular_riesgo_lote).
+Los valores se validan contra las opciones del formulario de la app y la
+respuesta se comprime con gzip si el cliente lo admite.
+"""
+
+import gzip
+import hmac
+import json
+import os
+
+from flask import Blueprint, Response, g, request
+
+from .metricas import contar_escenario
+from .model import CAMPOS_ESCENARIO, calcular_riesgo_lote, version_activa
+from .opciones import (
+    TIPOS_PERSONA,
+    TIPOS_VEHICULO,
+    RANGOS_EDAD,
+    SEXO_OPCIONES,
+    DISTRITOS,
+    DIAS_SEMANA,
+    METEOROLOGIA,
+    FRANJAS_HORARIAS,
+    valores,
+)
+from .precarga import estado_precarga
+from .registro import fijar_activa
+
+api = Blueprint("api", __name__, url_prefix="/api/v1")
+
+# Máximo de escenarios por petición
+MAX_ESCENARIOS = 5000
+
+# Por debajo de este tamaño (bytes) no compensa comprimir
+MIN_BYTES_GZIP = 1024
+
+# Valores admitidos para cada campo (los mismos que ofrece el formulario)
+VALORES_VALIDOS = {
+    campo: set(valores(opciones))
+    for campo, opciones in zip(
+        CAMPOS_ESCENARIO,
+        [TIPOS_PERSONA, TIPOS_VEHICULO, RANGOS_EDAD, SEXO_OPCIONES,
+         DISTRITOS, DIAS_SEMANA, FRANJAS_HORARIAS, METEOROLOGIA],
+    )
+}
+
+
+def _respuesta_json(datos, status: int = 200) -> Response:
+    cuerpo = json.dumps(datos, ensure_ascii=False).encode("utf-8")
+    respuesta = Response(cuerpo, status=status, mimetype="application/json")
+
+    # accept_encodings tiene en cuenta la calidad (gzip;q=0 lo rechaza),
+    # igual que la negociación de src/respuestas.py
+    if len(cuerpo) >= MIN_BYTES_GZIP and request.accept_encodings["gzip"] > 0:
+        respuesta.set_data(gzip.compress(cuerpo, compresslevel=5))
+        respuesta.headers["Content-Encoding"] = "gzip"
+    respuesta.headers["Vary"] = "Accept-Encoding"
+    return respuesta
+
+
+def _error(mensaje: str, status: int = 400, detalles=None) -> Response:
+    datos = {"error": mensaje}
+    if detalles:
+        datos["detalles"] = detalles
+    return _respuesta_json(datos, status)
+
+
+def _validar_escenario(escenario) -> list:
+    """Devuelve la lista de errores de un escenario (vacía si es válido)."""
+    if not isinstance(escenario, dict):
+        return ["El escenario debe ser un objeto JSON."]
+
+    errores = []
+    for campo in CAMPOS_ESCENARIO:
+        if campo not in escenario:
+            errores.append(f"Falta el campo '{campo}'.")
+        elif not isinstance(escenario[campo], str) or escenario[campo] not in VALORES_VALIDOS[campo]:
+            errores.append(f"Valor no válido para '{campo}': {escenario[campo]!r}.")
+    return errores
+
+
+@api.route("/riesgo", methods=["POST"])
+def riesgo():
+    datos = request.get_json(silent=True)
+    if isinstance(datos, dict):
+        datos = datos.get("escenarios")
+    if not isinstance(datos, list):
+        return _error("El cuerpo debe ser una lista JSON de escenarios.")
+    if len(datos) > MAX_ESCENARIOS:
+        return _error(f"Se admiten como máximo {MAX_ESCENARIOS} escenarios por petición.", 413)
+
+    detalles = []
+    for i, escenario in enumerate(datos):
+        errores = _validar_escenario(escenario)
+        if errores:
+            detalles.append({"indice": i, "errores": errores})
+    if detalles:
+        contar_escenario("api", "invalido", len(detalles))
+        return _error("Hay escenarios no válidos.", detalles=detalles)
+
+    escenarios = [tuple(esc[campo] for campo in CAMPOS_ESCENARIO) for esc in datos]
+    # La misma versión para el cálculo, version_modelo y X-Modelo-Version
+    activa = g.madly_version = version_activa()
+    try:
+        resultados = calcular_riesgo_lote(escenarios, activa=activa)
+    except Exception:
+        contar_escenario("api", "error", len(escenarios))
+        raise
+    contar_escenario("api", "ok", len(escenarios))
+
+    return _respuesta_json(
+        {
+            "version_modelo": activa.version,
+            "resultados": [
+                {
+                    "riesgo": riesgo_principal,
+                    "alternativas": [
+                        {"franja": nombre, "riesgo": proba} for nombre, proba in alternativas
+                    ],
+                }
+                for riesgo_principal, alternativas in resultados
+            ]
+        }
+    )
+
+
+@api.route("/listo", methods=["GET"])
+def listo():
+    estado = estado_precarga()
+    respuesta = _respuesta_json(estado, 200 if estado["listo"] else 503)
+    respuesta.headers["Cache-Control"] = "no-store"
+    return respuesta
+
+
+@api.route("/admin/recargar", methods=["POST"])
+def admin_recargar():
+    token = os.environ.get("MADLY_ADMIN_TOKEN")
+    if not token:
+        return _error("No encontrado.", 404)
+    cabecera = request.headers.get("Authorization", "")
+    enviado = cabecera[len("Bearer "):].strip() if cabecera.startswith("Bearer ") else ""
+    if not hmac.compare_digest(enviado.encode("utf-8"), token.encode("utf-8")):
+        return _error("No autorizado.", 401)
+
+    from .recarga import recargar
+
+    datos = request.get_json(silent=True) or {}
+    version = datos.get("version") if isinstance(datos, dict) else None
+    try:
+        resultado = recargar(version)
+        # Solo se marca como activa si ha pasado la validación
+        if version is not None:
+            fijar_activa(version)
+    except FileNotFoundError as e:
+        return _error(str(e), 404)
+    except ValueError as e:
+        return _error(str(e), 422)
+
+    respuesta = _respuesta_json(resultado)
+    respuesta.headers["Cache-Control"] = "no-store"
+    return respuesta
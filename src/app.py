@@ -1,262 +1,127 @@
-from dash import Dash, html, dcc, Input, Output
-import plotly.graph_objects as go
-
-from .model import calcular_riesgo
+import os
+from functools import lru_cache
+
+from dash import Dash, html, dcc, Input, Output, State, ClientsideFunction
+from dash.exceptions import PreventUpdate
+from flask import g, has_request_context
+
+from .api import api
+from .graphics import (
+    TITULOS_METRICA,
+    datos_franjas,
+    figura_mapa_distritos,
+    figura_mapa_rejilla,
+    figura_vacia,
+    layouts_cliente,
+)
+from . import metricas, microlotes, respuestas
+from .metricas import contar_escenario, etapa
+from .model import (
+    FRANJA_LABELS,
+    calcular_intervalo,
+    calcular_riesgo,
+    planificar_franjas,
+    version_cargada,
+)
+from .opciones import (
+    TIPOS_PERSONA,
+    TIPOS_VEHICULO,
+    RANGOS_EDAD,
+    SEXO_OPCIONES,
+    DISTRITOS,
+    DIAS_SEMANA,
+    METEOROLOGIA,
+    FRANJAS_HORARIAS,
+    ESCENARIO_POR_DEFECTO,
+    valores,
+)
+from .precarga import esperar_importaciones, estado_precarga, precalentar_en_fondo
 
 
 # Creamos la app Dash
 app = Dash(__name__, title="MADly Safe · Riesgo de lesión grave en Madrid")
 server = app.server
 
-# ----- Opciones de los controles -----
+# API JSON para clientes externos (/api/v1/riesgo)
+server.register_blueprint(api)
 
-TIPOS_PERSONA = [
-    {"label": "Conductor", "value": "Conductor"},
-    {"label": "Pasajero", "value": "Pasajero"},
-    {"label": "Peatón", "value": "Peatón"},
-]
-
-TIPOS_VEHICULO = [
-    {"label": "Turismo", "value": "Turismo"},
-    {"label": "Motocicleta", "value": "Motocicleta"},
-    {"label": "Furgoneta", "value": "Furgoneta"},
-    {"label": "Bicicleta", "value": "Bicicleta"},
-    {"label": "VMP / Patinete", "value": "VMP"},
-    {"label": "Sin vehículo (peatón)", "value": "Sin_vehiculo"},
-]
+# Métricas de Prometheus en /metrics (MADLY_METRICAS=0 para desactivarlas)
+if metricas.activas():
+    metricas.registrar(server)
 
-RANGOS_EDAD = [
-    {"label": "Menor de 18 años", "value": "<18"},
-    {"label": "18–24 años", "value": "18-24"},
-    {"label": "25–34 años", "value": "25-34"},
-    {"label": "35–44 años", "value": "35-44"},
-    {"label": "45–54 años", "value": "45-54"},
-    {"label": "55–64 años", "value": "55-64"},
-    {"label": "65–74 años", "value": "65-74"},
-    {"label": "75+ años", "value": "75+"},
-]
 
-SEXO_OPCIONES = [
-    {"label": "Hombre", "value": "Hombre"},
-    {"label": "Mujer", "value": "Mujer"},
-    {"label": "Desconocido / Otro", "value": "Desconocido"},
-]
+# Mientras la precarga en segundo plano importa pandas, las peticiones
+# esperan (ver precarga.esperar_importaciones)
+server.before_request(esperar_importaciones)
 
-DISTRITOS = [
-    {"label": "Centro", "value": "CENTRO"},
-    {"label": "Arganzuela", "value": "ARGANZUELA"},
-    {"label": "Retiro", "value": "RETIRO"},
-    {"label": "Salamanca", "value": "SALAMANCA"},
-    {"label": "Chamartín", "value": "CHAMARTIN"},
-    {"label": "Tetuán", "value": "TETUAN"},
-    {"label": "Chamberí", "value": "CHAMBERI"},
-]
 
-DIAS_SEMANA = [
-    {"label": "Lunes", "value": "Lunes"},
-    {"label": "Martes", "value": "Martes"},
-    {"label": "Miércoles", "value": "Miércoles"},
-    {"label": "Jueves", "value": "Jueves"},
-    {"label": "Viernes", "value": "Viernes"},
-    {"label": "Sábado", "value": "Sábado"},
-    {"label": "Domingo", "value": "Domingo"},
-]
+# Versión del modelo en todas las respuestas (ver src/recarga.py): la que
+# había al empezar la petición, o la que haya anotado el propio handler
+# (p. ej. /api/v1/riesgo), no la que haya al terminar si entretanto se ha
+# recargado
+@server.before_request
+def _anotar_version():
+    g.madly_version = version_cargada()
 
-METEOROLOGIA = [
-    {"label": "Despejado", "value": "Despejado"},
-    {"label": "Nublado", "value": "Nublado"},
-    {"label": "Lluvia débil", "value": "Lluvia debil"},
-    {"label": "Lluvia intensa", "value": "Lluvia intensa"},
-    {"label": "Se desconoce", "value": "Desconocido"},
-]
 
-FRANJAS_HORARIAS = [
-    {"label": "00:00 – 05:59", "value": "Noche_madrugada"},
-    {"label": "06:00 – 09:59", "value": "Manana_punta"},
-    {"label": "10:00 – 13:59", "value": "Manana_media"},
-    {"label": "14:00 – 17:59", "value": "Tarde"},
-    {"label": "18:00 – 21:59", "value": "Tarde_punta"},
-    {"label": "22:00 – 23:59", "value": "Noche"},
-]
+@server.after_request
+def _cabecera_version(respuesta):
+    activa = g.get("madly_version") or version_cargada()
+    if activa is not None:
+        respuesta.headers["X-Modelo-Version"] = activa.version
+    return respuesta
 
-# ----- Layout de la app -----
 
-app.layout = html.Div(
-    children=[
-        # Cabecera
-        html.Div(
-            children=[
-                html.H1("MADly Safe", style={"marginBottom": "5px"}),
-                html.H3(
-                    "Recomendador de franjas más seguras según perfil y contexto en Madrid",
-                    style={"fontWeight": "normal", "color": "#444"},
-                ),
-                html.P(
-                    "Selecciona tu perfil y condiciones de desplazamiento. "
-                    "La aplicación estima la probabilidad de lesión grave "
-                    "(condicionada a que ocurra un accidente) y sugiere franjas alternativas.",
-                    style={"maxWidth": "900px"},
-                ),
-            ],
-            style={
-                "textAlign": "left",
-                "padding": "20px 40px 10px 40px",
-                "backgroundColor": "#f8f9fa",
-                "borderBottom": "1px solid #ddd",
-            },
-        ),
-
-        # Cuerpo: formulario + resultados
-        html.Div(
-            children=[
-                # Columna izquierda: formulario
-                html.Div(
-                    children=[
-                        html.H4("1. Define tu escenario"),
-
-                        html.Label("Tipo de persona"),
-                        dcc.Dropdown(
-                            id="input-tipo-persona",
-                            options=TIPOS_PERSONA,
-                            value="Conductor",
-                        ),
-                        html.Br(),
-
-                        html.Label("Tipo de vehículo"),
-                        dcc.Dropdown(
-                            id="input-tipo-vehiculo",
-                            options=TIPOS_VEHICULO,
-                            value="Turismo",
-                        ),
-                        html.Br(),
-
-                        html.Label("Rango de edad"),
-                        dcc.Dropdown(
-                            id="input-rango-edad",
-                            options=RANGOS_EDAD,
-                            value="25-34",
-                        ),
-                        html.Br(),
-
-                        html.Label("Sexo"),
-                        dcc.Dropdown(
-                            id="input-sexo",
-                            options=SEXO_OPCIONES,
-                            value="Hombre",
-                        ),
-                        html.Br(),
-
-                        html.Label("Distrito de Madrid"),
-                        dcc.Dropdown(
-                            id="input-distrito",
-                            options=DISTRITOS,
-                            value="CENTRO",
-                        ),
-                        html.Br(),
-
-                        html.Label("Día de la semana"),
-                        dcc.Dropdown(
-                            id="input-dia",
-                            options=DIAS_SEMANA,
-                            value="Lunes",
-                        ),
-                        html.Br(),
-
-                        html.Label("Franja horaria"),
-                        dcc.Dropdown(
-                            id="input-franja",
-                            options=FRANJAS_HORARIAS,
-                            value="Tarde_punta",
-                        ),
-                        html.Br(),
-
-                        html.Label("Estado meteorológico"),
-                        dcc.Dropdown(
-                            id="input-meteo",
-                            options=METEOROLOGIA,
-                            value="Despejado",
-                        ),
-                    ],
-                    style={
-                        "display": "inline-block",
-                        "verticalAlign": "top",
-                        "width": "30%",
-                        "padding": "20px 40px",
-                        "boxSizing": "border-box",
-                        "borderRight": "1px solid #eee",
-                    },
-                ),
+# Modo del formulario: "inmediato" (se recalcula con cada cambio) o
+# "boton" (solo al pulsar "Calcular riesgo", con el escenario final)
+MODO_FORMULARIO = os.environ.get("MADLY_MODO_FORMULARIO", "inmediato")
+if MODO_FORMULARIO not in ("inmediato", "boton"):
+    raise ValueError(
+        f"MADLY_MODO_FORMULARIO no válido: {MODO_FORMULARIO!r} (usa 'inmediato' o 'boton')."
+    )
 
-                # Columna derecha: resultados
-                html.Div(
-                    children=[
-                        html.H4("2. Riesgo estimado y franjas alternativas"),
-                        html.Div(
-                            id="card-riesgo",
-                            style={
-                                "padding": "15px 20px",
-                                "borderRadius": "10px",
-                                "backgroundColor": "#fff3cd",
-                                "border": "1px solid #ffeeba",
-                                "marginBottom": "20px",
-                            },
-                        ),
-                        dcc.Graph(
-                            id="grafico-franjas",
-                            style={"height": "380px"},
-                        ),
-                        html.Div(
-                            id="explicacion",
-                            style={"marginTop": "15px", "color": "#555"},
-                        ),
-                    ],
-                    style={
-                        "display": "inline-block",
-                        "verticalAlign": "top",
-                        "width": "70%",
-                        "padding": "20px 40px",
-                        "boxSizing": "border-box",
-                    },
-                ),
-            ]
-        ),
-    ]
+# Con MADLY_MICROLOTES=1 los escenarios de los callbacks que llegan a la
+# vez (workers con varios hilos) se puntúan juntos (src/microlotes.py)
+_CALCULAR_RIESGO = (
+    microlotes.calcular_riesgo_microlote if microlotes.ACTIVOS else calcular_riesgo
 )
 
-# ----- Función auxiliar para figura vacía -----
-
+# Cada cuánto comprueba la página si ha terminado la carga del modelo
+# cuando se ha servido antes de tenerlo listo (ver construir_layout)
+ESPERA_CARGA_MS = 500
+
+# Ids de los desplegables, en el orden de los argumentos de calcular_riesgo
+IDS_FORMULARIO = [
+    "input-tipo-persona",
+    "input-tipo-vehiculo",
+    "input-rango-edad",
+    "input-sexo",
+    "input-distrito",
+    "input-dia",
+    "input-franja",
+    "input-meteo",
+]
 
-def figura_vacia():
-    fig = go.Figure()
-    fig.update_layout(
-        title="Franjas alternativas",
-        xaxis_title="Franja",
-        yaxis_title="Probabilidad de lesión grave",
-    )
-    return fig
+# ----- Salidas para un escenario -----
 
 
-# ----- Callback -----
+def aviso_carga():
+    """Contenido de las salidas mientras el proceso carga el modelo."""
+    return html.Div(
+        "Cargando el modelo… Los resultados aparecerán en unos segundos.",
+        style={"fontWeight": "bold"},
+    )
 
 
-@app.callback(
-    Output("card-riesgo", "children"),
-    Output("grafico-franjas", "figure"),
-    Output("explicacion", "children"),
-    Input("input-tipo-persona", "value"),
-    Input("input-tipo-vehiculo", "value"),
-    Input("input-rango-edad", "value"),
-    Input("input-sexo", "value"),
-    Input("input-distrito", "value"),
-    Input("input-dia", "value"),
-    Input("input-franja", "value"),
-    Input("input-meteo", "value"),
-)
-def actualizar_salida(tipo_persona, tipo_vehiculo, rango_edad, sexo,
-                      distrito, dia, franja, meteo):
+def salidas_escenario(tipo_persona, tipo_vehiculo, rango_edad, sexo,
+                      distrito, dia, franja, meteo, origen: str = "dash"):
+    """
+    Tarjeta de riesgo, datos del gráfico y texto explicativo de un escenario.
+    `origen` es la etiqueta con la que se cuenta en las métricas.
+    """
 
     try:
-        riesgo, alternativas = calcular_riesgo(
+        riesgo, alternativas = _CALCULAR_RIESGO(
             tipo_persona, tipo_vehiculo, rango_edad, sexo,
             distrito, dia, franja, meteo
         )
@@ -273,79 +138,631 @@ def actualizar_salida(tipo_persona, tipo_vehiculo, rango_edad, sexo,
                 ),
             ]
         )
-        figura = figura_vacia()
         explicacion = f"Detalle técnico del error (solo para depuración): {e}"
-        return card, figura, explicacion
+        contar_escenario(origen, "error")
+        respuestas.no_cachear()
+        return card, None, explicacion
 
     if riesgo is None or alternativas is None:
         card = html.Div(
             "Completa los campos de la izquierda para ver la estimación de riesgo.",
             style={"fontWeight": "bold"},
         )
-        figura = figura_vacia()
         explicacion = ""
-        return card, figura, explicacion
+        contar_escenario(origen, "incompleto")
+        return card, None, explicacion
+
+    # Intervalo del conjunto bootstrap, si el modelo lo tiene (src/bootstrap.py)
+    intervalo = calcular_intervalo(tipo_persona, tipo_vehiculo, rango_edad, sexo,
+                                   distrito, dia, franja, meteo)
+
+    with etapa("componentes"):
+        # Tarjeta de riesgo
+        riesgo_pct = round(riesgo * 100, 2)
+        linea_intervalo = []
+        if intervalo is not None:
+            _, inferior, superior = intervalo
+            linea_intervalo = [
+                html.Div(
+                    f"Intervalo del 90 % (conjunto bootstrap): {inferior * 100:.2f} % – {superior * 100:.2f} %",
+                    style={"fontSize": "13px", "color": "#555"},
+                )
+            ]
+        card = html.Div(
+            [
+                html.Div("Escenario seleccionado", style={"fontSize": "14px", "color": "#777"}),
+                html.Div(
+                    f"{riesgo_pct} %",
+                    style={"fontSize": "34px", "fontWeight": "bold"},
+                ),
+                *linea_intervalo,
+                html.Div(
+                    "Probabilidad estimada de lesión grave o fallecimiento "
+                    "condicionada a que ocurra un accidente.",
+                    style={"fontSize": "13px"},
+                ),
+                html.Div(
+                    "Modelo actual: Regresión Logística (class_weight='balanced').",
+                    style={"fontSize": "12px", "color": "#666", "marginTop": "4px"},
+                ),
+            ]
+        )
+
+        # Texto explicativo
+        nombres_alternativas = [alt[0] for alt in alternativas]
+        alternativas_texto = ", ".join(nombres_alternativas)
+
+        explicacion = (
+            "Con el perfil seleccionado, la franja actual presenta un riesgo aproximado "
+            f"del {riesgo_pct} %. "
+            "Las franjas alternativas sugeridas son: "
+            f"{alternativas_texto}. "
+            "En todos los casos se mantiene fijo el resto del escenario "
+            "(perfil, distrito, día de la semana y meteorología). "
+            "Esta estimación se basa en un modelo estadístico entrenado con datos históricos "
+            "de la ciudad de Madrid y debe interpretarse solo con fines informativos."
+        )
+
+    contar_escenario(origen, "ok")
+    return card, datos_franjas(riesgo, alternativas), explicacion
+
 
-    # Tarjeta de riesgo
-    riesgo_pct = round(riesgo * 100, 2)
-    card = html.Div(
-        [
-            html.Div("Escenario seleccionado", style={"fontSize": "14px", "color": "#777"}),
+# ----- Planificador de la semana -----
+
+# Campos del perfil que usa el planificador (orden de planificar_franjas)
+IDS_PERFIL_PLAN = [
+    "input-tipo-persona",
+    "input-tipo-vehiculo",
+    "input-rango-edad",
+    "input-sexo",
+    "input-meteo",
+]
+
+ETIQUETAS_DISTRITO = {opt["value"]: opt["label"] for opt in DISTRITOS}
+
+
+def salidas_plan(tipo_persona, tipo_vehiculo, rango_edad, sexo, meteo,
+                 distritos=None, k=5):
+    """
+    Tabla con las k combinaciones de día, franja y distrito más seguras
+    para el perfil (ver model.planificar_franjas).
+    """
+    if not distritos:
+        return html.Div("Elige al menos un distrito.", style={"fontWeight": "bold"})
+
+    try:
+        mejores = planificar_franjas(tipo_persona, tipo_vehiculo, rango_edad, sexo, meteo,
+                                     distritos=distritos, k=int(k or 5))
+    except Exception as e:
+        respuestas.no_cachear()
+        return html.Div(f"No se ha podido calcular el plan: {e}", style={"color": "#a00"})
+
+    if mejores is None:
+        return html.Div(
+            "Completa el perfil de la izquierda para buscar las franjas más seguras.",
+            style={"fontWeight": "bold"},
+        )
+
+    with etapa("componentes"):
+        celda = {"padding": "4px 12px", "borderBottom": "1px solid #eee", "textAlign": "left"}
+        cabecera = html.Tr([html.Th(t, style=celda) for t in ("#", "Día", "Franja", "Distrito", "Riesgo")])
+        filas = [
+            html.Tr([
+                html.Td(i, style=celda),
+                html.Td(dia, style=celda),
+                html.Td(FRANJA_LABELS.get(franja, franja), style=celda),
+                html.Td(ETIQUETAS_DISTRITO.get(distrito, distrito), style=celda),
+                html.Td(f"{riesgo * 100:.2f} %", style=celda),
+            ])
+            for i, (dia, franja, distrito, riesgo) in enumerate(mejores, start=1)
+        ]
+        return html.Table([html.Thead(cabecera), html.Tbody(filas)],
+                          style={"borderCollapse": "collapse"})
+
+
+def construir_panel_plan(listo: bool = True):
+    """
+    Panel "¿Cuándo y dónde es más seguro?" bajo el escenario. Sin el
+    modelo listo, la tabla sale con un aviso y la rellena el callback.
+    """
+    perfil = [ESCENARIO_POR_DEFECTO[campo] for campo in
+              ("tipo_persona", "tipo_vehiculo", "rango_edad", "sexo", "meteo")]
+    distritos = valores(DISTRITOS)
+
+    return html.Div(
+        children=[
+            html.H4("3. ¿Cuándo y dónde es más seguro esta semana?"),
+            html.P(
+                "Con tu perfil y la meteorología elegida, busca entre todos los días, "
+                "franjas y distritos seleccionados las combinaciones con menor riesgo estimado.",
+                style={"color": "#555"},
+            ),
             html.Div(
-                f"{riesgo_pct} %",
-                style={"fontSize": "34px", "fontWeight": "bold"},
+                [
+                    html.Label("Distritos"),
+                    dcc.Dropdown(id="plan-distritos", options=DISTRITOS, value=distritos, multi=True),
+                ],
+                style={"width": "50%", "display": "inline-block", "marginRight": "20px"},
             ),
             html.Div(
-                "Probabilidad estimada de lesión grave o fallecimiento "
-                "condicionada a que ocurra un accidente.",
-                style={"fontSize": "13px"},
+                [
+                    html.Label("Opciones"),
+                    dcc.Dropdown(
+                        id="plan-k",
+                        options=[{"label": str(n), "value": n} for n in (3, 5, 10, 20)],
+                        value=5,
+                        clearable=False,
+                    ),
+                ],
+                style={"width": "10%", "display": "inline-block", "marginRight": "20px"},
             ),
+            html.Button("Buscar", id="boton-planificar", n_clicks=0),
             html.Div(
-                "Modelo actual: Regresión Logística (class_weight='balanced').",
-                style={"fontSize": "12px", "color": "#666", "marginTop": "4px"},
+                salidas_plan(*perfil, distritos) if listo else aviso_carga(),
+                id="tabla-plan",
+                style={"marginTop": "15px"},
             ),
-        ]
+        ],
+        style={"padding": "10px 40px 30px 40px", "borderTop": "1px solid #eee"},
     )
 
-    # Figura construida directamente aquí usando los nombres de alternativas
-    nombres = ["Franja seleccionada"] + [alt[0] for alt in alternativas]
-    valores = [riesgo] + [alt[1] for alt in alternativas]
-    porcentajes = [v * 100 for v in valores]
-
-    fig = go.Figure()
-    fig.add_bar(
-        x=nombres,
-        y=valores,
-        text=[f"{p:.1f} %" for p in porcentajes],
-        textposition="auto",
+
+# ----- Mapa de la ciudad -----
+
+# Valor de los desplegables del mapa para no filtrar por día o franja
+TODOS = "todos"
+
+
+@lru_cache(maxsize=128)
+def figuras_mapa(dia: str = TODOS, franja: str = TODOS, metrica: str = "tasa_grave"):
+    """
+    Mapas de calor por distrito × franja y por celda de la rejilla, como
+    cortes del cubo de src/agregados.py. Hay pocas combinaciones de
+    filtros, así que cada figura se construye una sola vez por proceso.
+    """
+    # src/agregados.py importa pandas: solo cuando se pide el mapa
+    from .agregados import cargar_cubo
+
+    cubo = cargar_cubo()
+    if cubo is None:
+        return figura_vacia(), figura_vacia()
+
+    dia = None if dia == TODOS else dia
+    franja = None if franja == TODOS else franja
+    with etapa("mapa"):
+        distritos = figura_mapa_distritos(
+            cubo.distritos,
+            [FRANJA_LABELS[fr] for fr in cubo.franjas],
+            cubo.distritos_franjas(dia, metrica),
+            metrica,
+        )
+        x, y = cubo.centros_rejilla()
+        rejilla = figura_mapa_rejilla(x, y, cubo.rejilla(franja, dia, metrica), metrica)
+    return distritos, rejilla
+
+
+def construir_pestana_mapa(listo: bool = True):
+    """
+    Controles y mapas de la pestaña "Mapa de la ciudad". Sin la carga
+    terminada, los mapas salen vacíos y los rellena el callback.
+    """
+    if not listo:
+        return _pestana_mapa(figura_vacia(), figura_vacia(), [])
+
+    from .agregados import cargar_cubo
+
+    figura_distritos, figura_rejilla = figuras_mapa()
+    nota = []
+    if cargar_cubo() is None:
+        nota = [html.P("No hay datos de accidentalidad en data/ para construir el mapa.",
+                       style={"color": "#a00"})]
+    return _pestana_mapa(figura_distritos, figura_rejilla, nota)
+
+
+def _pestana_mapa(figura_distritos, figura_rejilla, nota):
+    return html.Div(
+        children=[
+            html.H4("Accidentes históricos de 2025 en la ciudad"),
+            html.P(
+                "Proporción de personas con lesión grave (entre las que tienen la lesividad "
+                "registrada) o número de accidentes y de personas implicadas, por distrito y "
+                "franja horaria y sobre una rejilla de 500 m.",
+                style={"maxWidth": "900px", "color": "#555"},
+            ),
+            *nota,
+            html.Div(
+                children=[
+                    html.Div(
+                        [
+                            html.Label("Día de la semana"),
+                            dcc.Dropdown(
+                                id="mapa-dia",
+                                options=[{"label": "Toda la semana", "value": TODOS}] + DIAS_SEMANA,
+                                value=TODOS,
+                                clearable=False,
+                            ),
+                        ],
+                        style={"width": "25%", "display": "inline-block", "marginRight": "20px"},
+                    ),
+                    html.Div(
+                        [
+                            html.Label("Franja horaria (mapa por celdas)"),
+                            dcc.Dropdown(
+                                id="mapa-franja",
+                                options=[{"label": "Todo el día", "value": TODOS}] + FRANJAS_HORARIAS,
+                                value=TODOS,
+                                clearable=False,
+                            ),
+                        ],
+                        style={"width": "25%", "display": "inline-block", "marginRight": "20px"},
+                    ),
+                    html.Div(
+                        [
+                            html.Label("Métrica"),
+                            dcc.RadioItems(
+                                id="mapa-metrica",
+                                options=[{"label": titulo, "value": clave}
+                                         for clave, titulo in TITULOS_METRICA.items()],
+                                value="tasa_grave",
+                                inline=True,
+                            ),
+                        ],
+                        style={"display": "inline-block", "verticalAlign": "top"},
+                    ),
+                ]
+            ),
+            html.Div(
+                [
+                    dcc.Graph(id="mapa-distritos", figure=figura_distritos,
+                              style={"height": "620px"}),
+                ],
+                style={"width": "50%", "display": "inline-block", "verticalAlign": "top"},
+            ),
+            html.Div(
+                [
+                    dcc.Graph(id="mapa-rejilla", figure=figura_rejilla,
+                              style={"height": "620px"}),
+                ],
+                style={"width": "50%", "display": "inline-block", "verticalAlign": "top"},
+            ),
+        ],
+        style={"padding": "20px 40px"},
     )
-    fig.update_layout(
-        title="Comparación de franjas horarias",
-        yaxis=dict(
-            title="Probabilidad de lesión grave",
-            tickformat=".0%",
-            range=[0, max(valores) * 1.2],
-        ),
-        xaxis_title="Franja",
-        bargap=0.3,
+
+
+# ----- Layout de la app -----
+
+# Layout de las figuras para el navegador (no cambia entre páginas)
+LAYOUTS_CLIENTE = layouts_cliente()
+
+
+def construir_layout():
+    """
+    Layout de la app. Las salidas del escenario por defecto van ya
+    rellenas, así que la carga inicial no necesita llamar al callback
+    (el cálculo sale de la caché de escenarios tras la primera vez).
+
+    Si el proceso todavía no ha cargado el modelo (arranque en frío), la
+    página no lo espera: sale con avisos en las salidas, lanza la carga en
+    segundo plano (src/precarga.py) y se rellena cuando termina
+    (callback comprobar_carga).
+    """
+    listo = estado_precarga()["listo"]
+    if listo:
+        card, datos, explicacion = salidas_escenario(*ESCENARIO_POR_DEFECTO.values(), origen="layout")
+    else:
+        # Dash también construye el layout al importar la app, para validarlo:
+        # ahí no se lanza nada (con gunicorn, el maestro no debe tener hilos)
+        if has_request_context():
+            precalentar_en_fondo()
+            esperar_importaciones()
+            respuestas.no_cachear()
+        card, datos, explicacion = aviso_carga(), None, ""
+
+    boton = []
+    if MODO_FORMULARIO == "boton":
+        boton = [
+            html.Br(),
+            html.Button("Calcular riesgo", id="boton-calcular", n_clicks=0),
+        ]
+
+    return html.Div(
+        children=[
+            # Cabecera
+            html.Div(
+                children=[
+                    html.H1("MADly Safe", style={"marginBottom": "5px"}),
+                    html.H3(
+                        "Recomendador de franjas más seguras según perfil y contexto en Madrid",
+                        style={"fontWeight": "normal", "color": "#444"},
+                    ),
+                    html.P(
+                        "Selecciona tu perfil y condiciones de desplazamiento. "
+                        "La aplicación estima la probabilidad de lesión grave "
+                        "(condicionada a que ocurra un accidente) y sugiere franjas alternativas.",
+                        style={"maxWidth": "900px"},
+                    ),
+                ],
+                style={
+                    "textAlign": "left",
+                    "padding": "20px 40px 10px 40px",
+                    "backgroundColor": "#f8f9fa",
+                    "borderBottom": "1px solid #ddd",
+                },
+            ),
+
+            dcc.Tabs(
+                id="pestanas",
+                value="escenario",
+                children=[
+                    dcc.Tab(
+                        label="Tu escenario",
+                        value="escenario",
+                        children=[construir_pestana_escenario(card, datos, explicacion, boton, listo)],
+                    ),
+                    dcc.Tab(
+                        label="Mapa de la ciudad",
+                        value="mapa",
+                        children=[construir_pestana_mapa(listo)],
+                    ),
+                ],
+            ),
+
+            # Fin de la carga del modelo (si la página sale antes de tenerlo)
+            dcc.Store(id="carga-lista", data=listo),
+            dcc.Interval(id="espera-carga", interval=ESPERA_CARGA_MS, disabled=listo),
+        ]
     )
 
-    # Texto explicativo
-    nombres_alternativas = [alt[0] for alt in alternativas]
-    alternativas_texto = ", ".join(nombres_alternativas)
-
-    explicacion = (
-        "Con el perfil seleccionado, la franja actual presenta un riesgo aproximado "
-        f"del {riesgo_pct} %. "
-        "Las franjas alternativas sugeridas son: "
-        f"{alternativas_texto}. "
-        "En todos los casos se mantiene fijo el resto del escenario "
-        "(perfil, distrito, día de la semana y meteorología). "
-        "Esta estimación se basa en un modelo estadístico entrenado con datos históricos "
-        "de la ciudad de Madrid y debe interpretarse solo con fines informativos."
+
+def construir_pestana_escenario(card, datos, explicacion, boton, listo: bool = True):
+    """Formulario y resultados del escenario (pestaña "Tu escenario")."""
+    return html.Div(
+        children=[
+            # Columna izquierda: formulario
+            html.Div(
+                children=[
+                    html.H4("1. Define tu escenario"),
+
+                    html.Label("Tipo de persona"),
+                    dcc.Dropdown(
+                        id="input-tipo-persona",
+                        options=TIPOS_PERSONA,
+                        value=ESCENARIO_POR_DEFECTO["tipo_persona"],
+                    ),
+                    html.Br(),
+
+                    html.Label("Tipo de vehículo"),
+                    dcc.Dropdown(
+                        id="input-tipo-vehiculo",
+                        options=TIPOS_VEHICULO,
+                        value=ESCENARIO_POR_DEFECTO["tipo_vehiculo"],
+                    ),
+                    html.Br(),
+
+                    html.Label("Rango de edad"),
+                    dcc.Dropdown(
+                        id="input-rango-edad",
+                        options=RANGOS_EDAD,
+                        value=ESCENARIO_POR_DEFECTO["rango_edad"],
+                    ),
+                    html.Br(),
+
+                    html.Label("Sexo"),
+                    dcc.Dropdown(
+                        id="input-sexo",
+                        options=SEXO_OPCIONES,
+                        value=ESCENARIO_POR_DEFECTO["sexo"],
+                    ),
+                    html.Br(),
+
+                    html.Label("Distrito de Madrid"),
+                    dcc.Dropdown(
+                        id="input-distrito",
+                        options=DISTRITOS,
+                        value=ESCENARIO_POR_DEFECTO["distrito"],
+                    ),
+                    html.Br(),
+
+                    html.Label("Día de la semana"),
+                    dcc.Dropdown(
+                        id="input-dia",
+                        options=DIAS_SEMANA,
+                        value=ESCENARIO_POR_DEFECTO["dia"],
+                    ),
+                    html.Br(),
+
+                    html.Label("Franja horaria"),
+                    dcc.Dropdown(
+                        id="input-franja",
+                        options=FRANJAS_HORARIAS,
+                        value=ESCENARIO_POR_DEFECTO["franja"],
+                    ),
+                    html.Br(),
+
+                    html.Label("Estado meteorológico"),
+                    dcc.Dropdown(
+                        id="input-meteo",
+                        options=METEOROLOGIA,
+                        value=ESCENARIO_POR_DEFECTO["meteo"],
+                    ),
+                    *boton,
+                ],
+                style={
+                    "display": "inline-block",
+                    "verticalAlign": "top",
+                    "width": "30%",
+                    "padding": "20px 40px",
+                    "boxSizing": "border-box",
+                    "borderRight": "1px solid #eee",
+                },
+            ),
+
+            # Columna derecha: resultados
+            html.Div(
+                children=[
+                    html.H4("2. Riesgo estimado y franjas alternativas"),
+                    html.Div(
+                        card,
+                        id="card-riesgo",
+                        style={
+                            "padding": "15px 20px",
+                            "borderRadius": "10px",
+                            "backgroundColor": "#fff3cd",
+                            "border": "1px solid #ffeeba",
+                            "marginBottom": "20px",
+                        },
+                    ),
+                    dcc.Graph(
+                        id="grafico-franjas",
+                        style={"height": "380px"},
+                    ),
+                    # Datos del gráfico (los rellena el callback) y layout
+                    # de las figuras, que se envía una sola vez con la página
+                    dcc.Store(id="datos-franjas", data=datos),
+                    dcc.Store(id="layouts-franjas", data=LAYOUTS_CLIENTE),
+                    html.Div(
+                        explicacion,
+                        id="explicacion",
+                        style={"marginTop": "15px", "color": "#555"},
+                    ),
+                ],
+                style={
+                    "display": "inline-block",
+                    "verticalAlign": "top",
+                    "width": "70%",
+                    "padding": "20px 40px",
+                    "boxSizing": "border-box",
+                },
+            ),
+
+            # Debajo: planificador de la semana para el mismo perfil
+            construir_panel_plan(listo),
+        ]
     )
 
-    return card, fig, explicacion
+
+app.layout = construir_layout
+
+# Dash manda el layout de validación (el que construye al importar) dentro
+# de cada página y lo vuelve a serializar en cada visita. Para validar los
+# callbacks solo le hacen falta los ids, así que se quitan figuras y datos
+if app.validation_layout is not None:
+    for _componente in app.validation_layout._traverse():
+        if isinstance(_componente, dcc.Graph):
+            _componente.figure = {}
+        elif isinstance(_componente, dcc.Store):
+            _componente.data = None
+
+
+# ----- Callbacks -----
+
+_SALIDAS = [
+    Output("card-riesgo", "children"),
+    Output("datos-franjas", "data"),
+    Output("explicacion", "children"),
+]
+
+
+@app.callback(
+    Output("carga-lista", "data"),
+    Output("espera-carga", "disabled"),
+    Input("espera-carga", "n_intervals"),
+    prevent_initial_call=True,
+)
+def comprobar_carga(n_intervals):
+    # Al terminar (o fallar) la carga, "carga-lista" dispara los callbacks
+    # de las salidas, que se calculan con los valores que haya en la página
+    estado = estado_precarga()
+    if not (estado["listo"] or estado["error"]):
+        raise PreventUpdate
+    return True, True
+
+
+if MODO_FORMULARIO == "boton":
+    # Un único cálculo por envío, con los valores que haya en ese momento
+    @app.callback(
+        *_SALIDAS,
+        Input("boton-calcular", "n_clicks"),
+        Input("carga-lista", "data"),
+        *[State(id_, "value") for id_ in IDS_FORMULARIO],
+        prevent_initial_call=True,
+    )
+    def actualizar_salida(n_clicks, carga_lista, *valores):
+        return salidas_escenario(*valores)
+
+else:
+    @app.callback(
+        *_SALIDAS,
+        Input("carga-lista", "data"),
+        *[Input(id_, "value") for id_ in IDS_FORMULARIO],
+        prevent_initial_call=True,
+    )
+    def actualizar_salida(carga_lista, *valores):
+        return salidas_escenario(*valores)
+
+
+@app.callback(
+    Output("tabla-plan", "children"),
+    Input("boton-planificar", "n_clicks"),
+    Input("carga-lista", "data"),
+    *[State(id_, "value") for id_ in IDS_PERFIL_PLAN],
+    State("plan-distritos", "value"),
+    State("plan-k", "value"),
+    prevent_initial_call=True,
+)
+def actualizar_plan(n_clicks, carga_lista, *valores_plan):
+    return salidas_plan(*valores_plan)
+
+
+@app.callback(
+    Output("mapa-distritos", "figure"),
+    Output("mapa-rejilla", "figure"),
+    Input("mapa-dia", "value"),
+    Input("mapa-franja", "value"),
+    Input("mapa-metrica", "value"),
+    Input("carga-lista", "data"),
+    prevent_initial_call=True,
+)
+def actualizar_mapa(dia, franja, metrica, carga_lista):
+    return figuras_mapa(dia or TODOS, franja or TODOS, metrica or "tasa_grave")
+
+
+# El gráfico se dibuja en el navegador a partir de los datos (src/assets/franjas.js)
+app.clientside_callback(
+    ClientsideFunction(namespace="madly", function_name="figura_franjas"),
+    Output("grafico-franjas", "figure"),
+    Input("datos-franjas", "data"),
+    State("layouts-franjas", "data"),
+)
+
+
+def _firma_mapa():
+    # Datos del cubo que pinta el layout: sin la carga terminada el layout
+    # no lleva mapa (ni se guarda), y no se importa src/agregados.py
+    if not estado_precarga()["listo"]:
+        return None
+    from .agregados import firma_cubo
+
+    return firma_cubo()
+
+
+# Compresión, cabeceras de caché y caché de respuestas compartida por los
+# workers (src/respuestas.py). El escenario y el plan solo dependen de los
+# valores del formulario y del modelo; el callback del mapa no se guarda
+# porque sale del cubo de agregados, que no va ligado a la versión del
+# modelo, y el layout, que lo incluye, lleva la firma del cubo en la clave
+respuestas.registrar(
+    app,
+    callbacks={
+        respuestas.id_callback(*_SALIDAS): {"boton-calcular.n_clicks", "carga-lista.data"},
+        respuestas.id_callback(Output("tabla-plan", "children")): {
+            "boton-planificar.n_clicks", "carga-lista.data",
+        },
+    },
+    huella=MODO_FORMULARIO,
+    firma_layout=_firma_mapa,
+)
 
 
 if __name__ == "__main__":
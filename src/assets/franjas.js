@@ -0,0 +1,39 @@
+// franjas.js
+// Dibuja en el navegador el gráfico de franjas de MADly Safe.
+// El callback del servidor solo envía {nombres, valores} (ver
+// graphics.datos_franjas) y el layout llega una vez con la página
+// (graphics.layouts_cliente), así que la figura equivale a
+// graphics.figura_franjas sin serializarla en cada interacción.
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    madly: {
+        figura_franjas: function (datos, layouts) {
+            if (!layouts) {
+                return window.dash_clientside.no_update;
+            }
+
+            if (!datos) {
+                return {
+                    data: [],
+                    layout: Object.assign({template: layouts.plantilla}, layouts.vacia),
+                };
+            }
+
+            var valores = datos.valores;
+            var maximo = Math.max.apply(null, valores);
+            var layout = Object.assign({template: layouts.plantilla}, layouts.franjas);
+            layout.yaxis = Object.assign({}, layouts.franjas.yaxis, {range: [0, maximo * 1.2]});
+
+            return {
+                data: [{
+                    type: "bar",
+                    x: datos.nombres,
+                    y: valores,
+                    text: valores.map(function (v) { return (v * 100).toFixed(1) + " %"; }),
+                    textposition: "auto",
+                }],
+                layout: layout,
+            };
+        },
+    },
+});
@@ -0,0 +1,369 @@
+# bootstrap.py
+"""
+Conjunto bootstrap del modelo lineal de MADly Safe, para dar intervalos
+de confianza junto a la probabilidad estimada.
+
+- entrenar_conjunto(modelo) reajusta el pipeline (misma estructura e
+  hiperparámetros) sobre n_miembros remuestreos con reemplazo de los
+  datos de src.etl.cargar_y_preparar_2025. Los ajustes se reparten entre
+  procesos con el backend "loky" de joblib, varios miembros por tarea
+  para no enviar los datos una vez por miembro.
+- Los coeficientes de todos los miembros se apilan en una sola matriz
+  (variables one-hot + intercepto) × miembros, así que
+  ConjuntoBootstrap.puntuar(filas) calcula los n_miembros modelos con una
+  única multiplicación de matrices, sin pasar por predict_proba.
+- guardar_conjunto / cargar_conjunto la guardan como .npy (más un .json
+  con las categorías y la huella del modelo) junto al fichero de modelo,
+  igual que la tabla de riesgos.
+- construir_tabla_intervalos precalcula la media y los percentiles de
+  todos los escenarios de la app en una tabla con los mismos ejes que la
+  tabla de riesgos (src/tabla_riesgo.py) y una última dimensión de 3
+  valores, así que el intervalo de un escenario se lee con un indexado,
+  igual que su riesgo.
+
+Solo se aplica a la regresión logística sobre one-hot (la misma forma
+que src/scorer_lineal.py). Las categorías que no aparecen en un
+remuestreo tienen coeficiente 0 en ese miembro, como handle_unknown="ignore".
+
+Para generarlo para el modelo en uso (conjunto y tabla de intervalos),
+desde la raíz del proyecto:
+
+    python -m src.bootstrap [--miembros 100] [--n-jobs -1] [--solo-intervalos]
+"""
+
+import argparse
+import json
+import time
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from .model import COLUMNAS_MODELO, MODEL_PATH
+from .scorer_lineal import exportar_pesos
+from .utilidades import es_nulo, huella_fichero
+
+CONJUNTO_PATH = MODEL_PATH.parent / "conjunto_bootstrap_2025.npy"
+INTERVALOS_PATH = MODEL_PATH.parent / "tabla_intervalos_2025.npy"
+
+N_MIEMBROS = 100
+
+# Percentiles del intervalo por defecto (intervalo central del 90 %)
+PERCENTILES = (5.0, 95.0)
+
+# Filas por lote al construir la tabla de intervalos
+TAMAÑO_LOTE = 50_000
+
+
+def _ruta_meta(ruta_conjunto: Path) -> Path:
+    return ruta_conjunto.with_suffix(".json")
+
+
+@lru_cache(maxsize=16)
+def _interpolacion(n_miembros: int, percentiles: tuple):
+    # Posiciones de los percentiles entre los miembros ordenados, con
+    # interpolación lineal (como np.percentile)
+    posiciones = np.asarray(percentiles, dtype=float) / 100 * (n_miembros - 1)
+    abajo = np.floor(posiciones).astype(np.intp)
+    arriba = np.minimum(abajo + 1, n_miembros - 1)
+    return abajo, arriba, posiciones - abajo
+
+
+class ConjuntoBootstrap:
+    """
+    Regresiones logísticas de un conjunto bootstrap, apiladas.
+
+    Parameters
+    ----------
+    columnas : list of str
+        Columnas de entrada, en el orden en que se pasan los valores.
+    categorias : list of list
+        Categorías de cada columna (unión de las de todos los miembros).
+    coeficientes : numpy.ndarray
+        Matriz (n_categorias_total + 1, n_miembros): un coeficiente por
+        categoría de cada columna, en orden, y los interceptos en la
+        última fila.
+    imputacion : list
+        Valor con el que se sustituyen los nulos en cada columna.
+    """
+
+    def __init__(self, columnas: List[str], categorias: List[list],
+                 coeficientes: np.ndarray, imputacion: list):
+        self.columnas = list(columnas)
+        self.categorias = [list(c) for c in categorias]
+        # Vista ndarray (si es un memmap, sigue leyendo las páginas del
+        # fichero pero sin el coste por operación de la subclase)
+        self.coeficientes = np.asarray(coeficientes)
+        self.imputacion = list(imputacion)
+
+        self._indices = [{cat: i for i, cat in enumerate(c)} for c in self.categorias]
+        self._inicios = np.cumsum([0] + [len(c) for c in self.categorias])
+        self.n_variables = int(self._inicios[-1])
+        if coeficientes.shape[0] != self.n_variables + 1:
+            raise ValueError(
+                f"La matriz de coeficientes tiene {coeficientes.shape[0]} filas "
+                f"y se esperaban {self.n_variables + 1}."
+            )
+
+    @property
+    def n_miembros(self) -> int:
+        return int(self.coeficientes.shape[1])
+
+    def _diseño(self, filas: Sequence[Sequence]) -> np.ndarray:
+        # One-hot denso de las filas, con una columna de unos al final
+        # para el intercepto; las categorías desconocidas quedan a 0
+        X = np.zeros((len(filas), self.n_variables + 1))
+        X[:, -1] = 1.0
+        columnas = list(zip(*filas)) if len(filas) else []
+        for j, valores in enumerate(columnas):
+            indice, imputado = self._indices[j], self.imputacion[j]
+            for i, v in enumerate(valores):
+                codigo = indice.get(imputado if es_nulo(v) else v)
+                if codigo is not None:
+                    X[i, self._inicios[j] + codigo] = 1.0
+        return X
+
+    def puntuar(self, filas: Sequence[Sequence]) -> np.ndarray:
+        """
+        Probabilidad de la clase positiva de cada miembro para cada fila.
+
+        Returns
+        -------
+        probas : numpy.ndarray
+            Matriz (n_filas, n_miembros).
+        """
+        z = self._diseño(filas) @ self.coeficientes
+        return 1.0 / (1.0 + np.exp(-z))
+
+    def intervalos(self, filas: Sequence[Sequence], percentiles: Sequence[float] = PERCENTILES):
+        """
+        Media de los miembros y percentiles para cada fila.
+
+        Returns
+        -------
+        media : numpy.ndarray
+            Array (n_filas,).
+        bandas : numpy.ndarray
+            Array (len(percentiles), n_filas).
+        """
+        probas = self.puntuar(filas)
+        # Mismo resultado que np.percentile, pero con pocas filas (el caso
+        # de la app) ordenar e interpolar cuesta mucho menos
+        abajo, arriba, fraccion = _interpolacion(self.n_miembros, tuple(percentiles))
+        ordenadas = np.sort(probas, axis=1)
+        bandas = ordenadas[:, abajo] * (1 - fraccion) + ordenadas[:, arriba] * fraccion
+        return probas.sum(axis=1) / self.n_miembros, bandas.T
+
+
+def _ajustar_miembros(base, X, y, semillas: Sequence[int]) -> list:
+    """Ajusta un clon de `base` por semilla, cada uno sobre un remuestreo."""
+    from sklearn.base import clone
+
+    n = len(X)
+    pesos = []
+    for semilla in semillas:
+        idx = np.random.default_rng(semilla).integers(0, n, size=n)
+        miembro = clone(base).fit(X.iloc[idx], y.iloc[idx])
+        pesos.append(exportar_pesos(miembro))
+    return pesos
+
+
+def entrenar_conjunto(modelo, n_miembros: int = N_MIEMBROS, n_jobs: int = -1,
+                      random_state: int = 42) -> ConjuntoBootstrap:
+    """
+    Ajusta el conjunto bootstrap de un pipeline de regresión logística.
+
+    Parameters
+    ----------
+    modelo : sklearn.pipeline.Pipeline
+        Modelo de referencia (se clona con sus hiperparámetros).
+    n_miembros : int
+        Número de remuestreos.
+    n_jobs : int
+        Procesos para los ajustes (-1: todos los núcleos).
+
+    Raises
+    ------
+    ValueError
+        Si el modelo no es una regresión logística sobre one-hot.
+    """
+    import joblib
+
+    from .etl import cargar_y_preparar_2025
+
+    if exportar_pesos(modelo) is None:
+        raise ValueError("El conjunto bootstrap solo se puede construir para la regresión logística sobre one-hot.")
+    if n_miembros < 2:
+        raise ValueError("El conjunto necesita al menos 2 miembros.")
+
+    _, df_target = cargar_y_preparar_2025()
+    # Valores como texto, igual que en src/train.py
+    X = df_target[COLUMNAS_MODELO].astype(object)
+    y = df_target["grave"].astype(int)
+
+    semillas = np.random.SeedSequence(random_state).generate_state(n_miembros).tolist()
+    n_tareas = min(n_miembros, joblib.effective_n_jobs(n_jobs) * 4)
+    with joblib.parallel_backend("loky", n_jobs=n_jobs):
+        partes = joblib.Parallel()(
+            joblib.delayed(_ajustar_miembros)(modelo, X, y, lote)
+            for lote in np.array_split(semillas, n_tareas)
+        )
+    miembros = [scorer for parte in partes for scorer in parte]
+
+    columnas = miembros[0].columnas
+    categorias = []
+    for j in range(len(columnas)):
+        vistas = {}
+        for scorer in miembros:
+            vistas.update(dict.fromkeys(scorer.pesos[j]))
+        categorias.append(list(vistas))
+
+    coeficientes = np.zeros((sum(len(c) for c in categorias) + 1, n_miembros))
+    for m, scorer in enumerate(miembros):
+        fila = 0
+        for j, cats in enumerate(categorias):
+            pesos = scorer.pesos[j]
+            coeficientes[fila:fila + len(cats), m] = [pesos.get(c, 0.0) for c in cats]
+            fila += len(cats)
+        coeficientes[-1, m] = scorer.intercepto
+
+    # Nulos: el valor de imputación más frecuente entre los miembros
+    imputacion = [Counter(s.imputacion[j] for s in miembros).most_common(1)[0][0]
+                  for j in range(len(columnas))]
+
+    return ConjuntoBootstrap(columnas, categorias, coeficientes, imputacion)
+
+
+def guardar_conjunto(conjunto: ConjuntoBootstrap, modelo_path: Path = MODEL_PATH,
+                     ruta_conjunto: Path = CONJUNTO_PATH) -> Path:
+    """Guarda la matriz de coeficientes (.npy) y sus metadatos (.json)."""
+    ruta_conjunto = Path(ruta_conjunto)
+    np.save(ruta_conjunto, conjunto.coeficientes)
+    meta = {
+        "columnas": conjunto.columnas,
+        "categorias": conjunto.categorias,
+        "imputacion": conjunto.imputacion,
+        "n_miembros": conjunto.n_miembros,
+        "modelo": Path(modelo_path).name,
+        "huella_modelo": huella_fichero(modelo_path),
+    }
+    _ruta_meta(ruta_conjunto).write_text(json.dumps(meta, ensure_ascii=False, indent=1), encoding="utf-8")
+    return ruta_conjunto
+
+
+def cargar_conjunto(modelo_path: Path = MODEL_PATH,
+                    ruta_conjunto: Path = CONJUNTO_PATH) -> Optional[ConjuntoBootstrap]:
+    """
+    Lee el conjunto guardado (la matriz con memoria mapeada). Devuelve None
+    si no existe o se generó para otro fichero de modelo.
+    """
+    ruta_conjunto = Path(ruta_conjunto)
+    ruta_meta = _ruta_meta(ruta_conjunto)
+    if not ruta_conjunto.exists() or not ruta_meta.exists():
+        return None
+    meta = json.loads(ruta_meta.read_text(encoding="utf-8"))
+    if meta.get("huella_modelo") != huella_fichero(modelo_path):
+        return None
+    coeficientes = np.load(ruta_conjunto, mmap_mode="r")
+    return ConjuntoBootstrap(meta["columnas"], meta["categorias"], coeficientes, meta["imputacion"])
+
+
+def construir_tabla_intervalos(conjunto: ConjuntoBootstrap, modelo_path: Path = MODEL_PATH,
+                               ruta_conjunto: Path = CONJUNTO_PATH,
+                               ruta_tabla: Path = INTERVALOS_PATH,
+                               tamaño_lote: int = TAMAÑO_LOTE) -> Path:
+    """
+    Evalúa el conjunto en todos los escenarios de la app y guarda, por
+    escenario, (media, percentil inferior, percentil superior) en float32.
+
+    La tabla tiene los ejes de tabla_riesgo.ejes_por_defecto() y una
+    dimensión final de 3; su .json lleva la huella del modelo y la del
+    conjunto con el que se generó.
+    """
+    from .tabla_riesgo import ejes_por_defecto
+
+    ejes = ejes_por_defecto()
+    forma = tuple(len(vals) for _, vals in ejes)
+    total = int(np.prod(forma))
+    valores_eje = [np.asarray(vals, dtype=object) for _, vals in ejes]
+    # Los ejes van en el orden de la tabla (meteorología antes que la
+    # franja) y las filas del conjunto en el de COLUMNAS_MODELO
+    orden = [[col for col, _ in ejes].index(col) for col in COLUMNAS_MODELO]
+
+    tabla = np.empty((total, 3), dtype=np.float32)
+    for inicio in range(0, total, tamaño_lote):
+        fin = min(inicio + tamaño_lote, total)
+        codigos = np.unravel_index(np.arange(inicio, fin), forma)
+        columnas = [valores_eje[j][codigos[j]] for j in orden]
+        media, (inferior, superior) = conjunto.intervalos(list(zip(*columnas)))
+        tabla[inicio:fin] = np.column_stack([media, inferior, superior])
+
+    ruta_tabla = Path(ruta_tabla)
+    np.save(ruta_tabla, tabla.reshape(forma + (3,)))
+    meta = {
+        "ejes": [[col, vals] for col, vals in ejes],
+        "forma": list(forma),
+        "valores": ["media", *(f"p{p:g}" for p in PERCENTILES)],
+        "modelo": Path(modelo_path).name,
+        "huella_modelo": huella_fichero(modelo_path),
+        "huella_conjunto": huella_fichero(ruta_conjunto),
+    }
+    _ruta_meta(ruta_tabla).write_text(json.dumps(meta, ensure_ascii=False, indent=1), encoding="utf-8")
+    return ruta_tabla
+
+
+def cargar_tabla_intervalos(modelo_path: Path = MODEL_PATH,
+                            ruta_conjunto: Path = CONJUNTO_PATH,
+                            ruta_tabla: Path = INTERVALOS_PATH):
+    """
+    Tabla de intervalos (una TablaRiesgo con memoria mapeada), o None si
+    no existe o se generó para otro modelo u otro conjunto.
+    """
+    from .tabla_riesgo import cargar_tabla
+
+    ruta_tabla = Path(ruta_tabla)
+    ruta_meta = _ruta_meta(ruta_tabla)
+    if not ruta_meta.exists() or not Path(ruta_conjunto).exists():
+        return None
+    meta = json.loads(ruta_meta.read_text(encoding="utf-8"))
+    if meta.get("huella_conjunto") != huella_fichero(ruta_conjunto):
+        return None
+    return cargar_tabla(modelo_path, ruta_tabla)
+
+
+def main(argv=None):
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Conjunto bootstrap del modelo de MADly Safe")
+    parser.add_argument("--modelo", default=str(MODEL_PATH), help="Fichero .joblib de referencia")
+    parser.add_argument("--miembros", type=int, default=N_MIEMBROS)
+    parser.add_argument("--n-jobs", type=int, default=-1,
+                        help="Procesos para los ajustes (-1: todos los núcleos)")
+    parser.add_argument("--solo-intervalos", action="store_true",
+                        help="Solo rehace la tabla de intervalos con el conjunto ya guardado")
+    args = parser.parse_args(argv)
+
+    modelo_path = Path(args.modelo)
+    ruta = modelo_path.parent / CONJUNTO_PATH.name
+    inicio = time.perf_counter()
+    if args.solo_intervalos:
+        conjunto = cargar_conjunto(modelo_path, ruta)
+        if conjunto is None:
+            raise SystemExit(f"No hay conjunto bootstrap para {modelo_path.name}: "
+                             "python -m src.bootstrap")
+    else:
+        conjunto = entrenar_conjunto(joblib.load(modelo_path), args.miembros, args.n_jobs)
+        guardar_conjunto(conjunto, modelo_path, ruta)
+        print(f"Conjunto de {conjunto.n_miembros} miembros guardado en: {ruta} "
+              f"({time.perf_counter() - inicio:.1f} s)")
+
+    inicio = time.perf_counter()
+    ruta_tabla = construir_tabla_intervalos(conjunto, modelo_path, ruta,
+                                            modelo_path.parent / INTERVALOS_PATH.name)
+    print(f"Tabla de intervalos guardada en: {ruta_tabla} ({time.perf_counter() - inicio:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# cache.py
+"""
+Caché acotada y segura entre hilos para los resultados de MADly Safe.
+
+El tráfico de la app está muy concentrado en unos pocos escenarios (los
+valores por defecto del formulario y variantes cercanas), así que guardar
+los últimos resultados evita repetir el cálculo completo del riesgo.
+
+Políticas de desalojo disponibles:
+- "lru": se expulsa la entrada usada hace más tiempo.
+- "fifo": se expulsa la entrada insertada hace más tiempo.
+"""
+
+import threading
+from collections import OrderedDict
+
+POLITICAS = ("lru", "fifo")
+
+
+class CacheEscenarios:
+    """
+    Diccionario acotado con contadores de aciertos, fallos y desalojos.
+
+    Parameters
+    ----------
+    capacidad : int
+        Número máximo de entradas. Con 0 la caché queda desactivada.
+    politica : str
+        "lru" o "fifo".
+    """
+
+    def __init__(self, capacidad: int = 1024, politica: str = "lru"):
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.configurar(capacidad, politica)
+        self._reiniciar_contadores()
+
+    def _reiniciar_contadores(self):
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    def configurar(self, capacidad: int = None, politica: str = None):
+        """Cambia capacidad y/o política; recorta si hace falta."""
+        with self._lock:
+            if politica is not None:
+                if politica not in POLITICAS:
+                    raise ValueError(
+                        f"Política de caché no válida: {politica!r}. "
+                        f"Opciones: {', '.join(POLITICAS)}."
+                    )
+                self.politica = politica
+            if capacidad is not None:
+                if capacidad < 0:
+                    raise ValueError("La capacidad de la caché no puede ser negativa.")
+                self.capacidad = int(capacidad)
+                self._recortar()
+
+    def _recortar(self):
+        # Debe llamarse con el lock adquirido
+        while len(self._datos) > self.capacidad:
+            self._datos.popitem(last=False)
+            self.desalojos += 1
+
+    def obtener(self, clave):
+        """Devuelve el valor guardado o None si no está."""
+        with self._lock:
+            try:
+                valor = self._datos[clave]
+            except KeyError:
+                self.fallos += 1
+                return None
+            if self.politica == "lru":
+                self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return valor
+
+    def guardar(self, clave, valor):
+        with self._lock:
+            if self.capacidad == 0:
+                return
+            self._datos[clave] = valor
+            if self.politica == "lru":
+                self._datos.move_to_end(clave)
+            self._recortar()
+
+    def limpiar(self):
+        """Vacía la caché (p.ej. al cambiar de modelo). Mantiene los contadores."""
+        with self._lock:
+            self._datos.clear()
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "capacidad": self.capacidad,
+                "politica": self.politica,
+                "entradas": len(self._datos),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "desalojos": self.desalojos,
+                "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+            }
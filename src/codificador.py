@@ -0,0 +1,226 @@
+# codificador.py
+"""
+Codificador compilado de las variables categóricas de MADly Safe.
+
+Cuando el modelo no es lineal (Random Forest, HistGradientBoosting...)
+cada puntuación pasaba por construir un DataFrame de pandas y por el
+SimpleImputer y el OneHotEncoder/OrdinalEncoder del pipeline, que
+comparan cadenas fila a fila. Aquí, una sola vez por modelo:
+
+- compilar_codificador(modelo) lee del pipeline ya entrenado las
+  categorías de cada columna y los valores de imputación y arma, por
+  columna, una tabla {valor: código} que incluye los valores tal como
+  llegan de la app (los alias de model.ALIAS_VALORES, como
+  "Lluvia debil" → "Lluvia débil", apuntan al código de su categoría);
+- CodificadorCategorias.transformar(filas) convierte las filas en lo que
+  espera el clasificador del pipeline: una matriz CSR de índices one-hot
+  o, con OrdinalEncoder, una matriz densa de códigos. Las categorías
+  desconocidas se tratan como hoy: fila sin ningún 1 en esa variable
+  (handle_unknown="ignore") o NaN (unknown_value=np.nan).
+
+Antes de usarlo se comprueba que da exactamente la misma matriz que el
+preprocesado del pipeline; si el pipeline tiene otra forma, no se compila
+y se sigue usando el DataFrame.
+"""
+
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .model import ALIAS_VALORES, COLUMNAS_MODELO
+from .utilidades import es_nulo
+
+
+class CodificadorCategorias:
+    """
+    Tablas {valor: código} de cada columna del modelo.
+
+    Parameters
+    ----------
+    columnas : list of str
+        Columnas de entrada, en el orden en que se pasan los valores.
+    categorias : list of list
+        Categorías de cada columna, en el orden del encoder del pipeline.
+    imputacion : list
+        Valor con el que se sustituyen los nulos en cada columna (None si
+        el pipeline no imputa y los nulos son desconocidos).
+    one_hot : bool
+        True: la salida es el one-hot. False: códigos ordinales densos con
+        NaN para nulos y desconocidos.
+    disperso : bool
+        Con one-hot, True para devolver una matriz CSR y False para un
+        array denso (como el OneHotEncoder con sparse_output=False).
+    """
+
+    def __init__(self, columnas: List[str], categorias: List[list], imputacion: list,
+                 one_hot: bool = True, disperso: bool = True):
+        self.columnas = list(columnas)
+        self.categorias = [list(c) for c in categorias]
+        self.imputacion = list(imputacion)
+        self.one_hot = one_hot
+        self.disperso = one_hot and disperso
+        self.n_salidas = sum(len(c) for c in self.categorias)
+
+        # Con one-hot el código ya es la columna de salida (desplazado por
+        # las categorías de las columnas anteriores)
+        inicios = np.cumsum([0] + [len(c) for c in self.categorias])
+        self._tablas = []
+        self._nulos = []
+        for j, (columna, cats) in enumerate(zip(self.columnas, self.categorias)):
+            base = int(inicios[j]) if one_hot else 0
+            tabla = {cat: base + i for i, cat in enumerate(cats) if not es_nulo(cat)}
+            for alias, valor in ALIAS_VALORES.get(columna, {}).items():
+                if valor in tabla and alias not in tabla:
+                    tabla[alias] = tabla[valor]
+            self._tablas.append(tabla)
+
+            # Código de los nulos: el del valor imputado; sin imputer, la
+            # categoría nula del one-hot si la hay (con OrdinalEncoder los
+            # nulos son NaN, como los desconocidos)
+            imputado = self.imputacion[j]
+            if imputado is not None:
+                nulo = tabla.get(imputado)
+            else:
+                nulos = [base + i for i, cat in enumerate(cats) if es_nulo(cat)]
+                nulo = nulos[0] if nulos and one_hot else None
+            self._nulos.append(nulo)
+
+    def codigos(self, filas: Sequence[Sequence]) -> np.ndarray:
+        """
+        Códigos (n_filas, n_columnas); -1 para las categorías desconocidas.
+        """
+        codigos = np.empty((len(filas), len(self.columnas)), dtype=np.intp)
+        for j, tabla in enumerate(self._tablas):
+            nulo = self._nulos[j]
+            for i, fila in enumerate(filas):
+                v = fila[j]
+                codigo = tabla.get(v)
+                if codigo is None and es_nulo(v):
+                    codigo = nulo
+                codigos[i, j] = -1 if codigo is None else codigo
+        return codigos
+
+    def transformar(self, filas: Sequence[Sequence]):
+        """
+        Entrada del clasificador del pipeline para las filas (valores en el
+        orden de `columnas`, con o sin normalizar).
+
+        Returns
+        -------
+        X : scipy.sparse.csr_matrix or numpy.ndarray
+            One-hot (n_filas, n_salidas), disperso o denso, o códigos
+            ordinales (n_filas, n_columnas) según el encoder del pipeline.
+        """
+        codigos = self.codigos(filas)
+        if not self.one_hot:
+            X = codigos.astype(float)
+            X[codigos < 0] = np.nan
+            return X
+
+        conocidos = codigos >= 0
+        if not self.disperso:
+            X = np.zeros((len(filas), self.n_salidas))
+            X[np.nonzero(conocidos)[0], codigos[conocidos]] = 1.0
+            return X
+
+        from scipy import sparse
+
+        indptr = np.concatenate(([0], np.cumsum(conocidos.sum(axis=1))))
+        indices = codigos[conocidos]
+        datos = np.ones(len(indices))
+        return sparse.csr_matrix((datos, indices, indptr), shape=(len(filas), self.n_salidas))
+
+
+def _pasos_encoder(transformador):
+    # (imputer o None, encoder) de un transformador del ColumnTransformer
+    pasos = getattr(transformador, "named_steps", None)
+    if pasos is None:
+        return None, transformador
+    if list(pasos) == ["imputer", "onehot"] or list(pasos) == ["imputer", "ordinal"]:
+        return pasos["imputer"], list(pasos.values())[1]
+    if len(pasos) == 1:
+        return None, list(pasos.values())[0]
+    raise ValueError("Pipeline de preprocesado no reconocido.")
+
+
+def compilar_codificador(modelo, filas_prueba: Sequence[Sequence] = None) -> Optional[CodificadorCategorias]:
+    """
+    Compila el codificador de un pipeline preprocess → clf entrenado.
+
+    Devuelve None si el preprocesado no es un único OneHotEncoder
+    (handle_unknown="ignore", sin drop ni categorías infrecuentes) u
+    OrdinalEncoder (desconocidos y nulos como NaN) sobre COLUMNAS_MODELO,
+    con o sin SimpleImputer delante, si su salida no coincide (en valores
+    y en formato, disperso o denso) con la del pipeline para
+    `filas_prueba`, o si el clasificador no la acepta.
+    """
+    from scipy import sparse
+    from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder
+
+    try:
+        preprocess = modelo.named_steps["preprocess"]
+        (_, transformador, columnas), = [
+            t for t in preprocess.transformers_ if t[0] != "remainder" or t[1] != "drop"
+        ]
+        imputer, encoder = _pasos_encoder(transformador)
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+    if [str(c) for c in columnas] != COLUMNAS_MODELO:
+        return None
+
+    if isinstance(encoder, OneHotEncoder):
+        if encoder.drop is not None or encoder.handle_unknown != "ignore":
+            return None
+        if getattr(encoder, "infrequent_categories_", None) and any(
+                c is not None for c in encoder.infrequent_categories_):
+            return None
+        one_hot = True
+        # sparse_output desde scikit-learn 1.2 (antes, sparse)
+        disperso = bool(getattr(encoder, "sparse_output", getattr(encoder, "sparse", True)))
+    elif isinstance(encoder, OrdinalEncoder):
+        if encoder.handle_unknown != "use_encoded_value" or not np.isnan(encoder.unknown_value) \
+                or not np.isnan(encoder.encoded_missing_value):
+            return None
+        one_hot = False
+        disperso = False
+    else:
+        return None
+
+    if imputer is not None:
+        if getattr(imputer, "add_indicator", False):
+            return None
+        imputacion = list(imputer.statistics_)
+    else:
+        imputacion = [None] * len(columnas)
+
+    codificador = CodificadorCategorias(
+        COLUMNAS_MODELO, [list(c) for c in encoder.categories_], imputacion, one_hot, disperso,
+    )
+
+    # Comprobación: misma matriz que el preprocesado del pipeline
+    if filas_prueba is None:
+        # Todas las categorías de cada columna (incluida la nula, si la hay),
+        # una fila de nulos y una de valores desconocidos
+        filas_prueba = [tuple(cats[i % len(cats)] for cats in codificador.categorias)
+                        for i in range(max(len(c) for c in codificador.categorias))]
+        filas_prueba.append(tuple(None for _ in COLUMNAS_MODELO))
+        filas_prueba.append(tuple("__desconocido__" for _ in COLUMNAS_MODELO))
+    esperado = preprocess.transform(pd.DataFrame(list(filas_prueba), columns=COLUMNAS_MODELO))
+    obtenido = codificador.transformar(filas_prueba)
+    # El ColumnTransformer puede densificar la salida (sparse_threshold):
+    # el clasificador se entrenó con el formato que él devuelve
+    if sparse.issparse(esperado) != sparse.issparse(obtenido):
+        return None
+    denso_esperado = esperado.toarray() if sparse.issparse(esperado) else np.asarray(esperado, dtype=float)
+    denso_obtenido = obtenido.toarray() if sparse.issparse(obtenido) else obtenido
+    if denso_esperado.shape != denso_obtenido.shape \
+            or not np.array_equal(denso_esperado, denso_obtenido, equal_nan=True):
+        return None
+
+    # Y el clasificador debe aceptarla tal cual (es lo que hará _puntuar_filas)
+    try:
+        modelo.named_steps["clf"].predict_proba(obtenido)
+    except Exception:
+        return None
+    return codificador
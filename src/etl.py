@@ -3,20 +3,102 @@
 Módulo de ETL para MADly Safe.
 
 Aquí centralizamos la carga y preparación de los datos de accidentalidad
-(de momento, solo 2025). La idea es que cualquier parte del proyecto
-(app, notebooks, etc.) use estas funciones en lugar de repetir código.
+(2025 y, con cargar_y_preparar(años=[...]), varios años). La idea es que
+cualquier parte del proyecto (app, notebooks, etc.) use estas funciones en
+lugar de repetir código.
+
+Leer el Excel con openpyxl es lento (varios segundos), así que la primera
+carga guarda una copia columnar (Parquet o Feather, con tipos compactos)
+junto al fichero original y las siguientes cargas leen de ahí. La copia se
+invalida automáticamente si cambia el Excel.
 """
 
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Tuple
+from typing import Dict, Iterator, Optional, Sequence, Tuple
 
 import numpy as np
 import pandas as pd
 
+from .opciones import DIAS_SEMANA as _OPCIONES_DIAS
+from .opciones import FRANJAS_HORARIAS as _OPCIONES_FRANJAS
+from .opciones import SEXO_OPCIONES, valores
 
 # Nombre del fichero de datos de 2025 (relativo a la carpeta data/)
 DATA_FILE_2025 = "2025_Accidentalidad.xlsx"
 
+# Formatos admitidos para la caché columnar (requieren pyarrow)
+FORMATOS_CACHE = ("parquet", "feather")
+
+# Columnas de texto con pocos valores distintos: se guardan como category
+COLUMNAS_CATEGORICAS = [
+    "distrito",
+    "tipo_accidente",
+    "estado_meteorológico",
+    "tipo_vehiculo",
+    "tipo_persona",
+    "rango_edad",
+    "sexo",
+    "lesividad",
+    "positiva_alcohol",
+]
+
+# Tipo de la columna 'numero' (texto con pd.NA para los vacíos) en todas
+# las rutas de carga
+TIPO_TEXTO = pd.StringDtype()
+
+# Días de la semana en el orden de dayofweek (0=Lunes,...,6=Domingo),
+# los mismos valores que el desplegable de la app
+DIAS_SEMANA = valores(_OPCIONES_DIAS)
+
+# Franjas horarias de la app (00:00–05:59, 06:00–09:59, 10:00–13:59,
+# 14:00–17:59, 18:00–21:59, 22:00–23:59) y hora de inicio de cada una
+FRANJAS_HORARIAS = valores(_OPCIONES_FRANJAS)
+INICIO_FRANJAS = np.array([0, 6, 10, 14, 18, 22])
+
+# Vocabulario fijo de las categóricas que comparten valores con la app.
+# Los valores que no estén en la lista se añaden detrás (no se pierden).
+VOCABULARIO_CATEGORIAS = {
+    "dia_semana": DIAS_SEMANA,
+    "franja_horaria": FRANJAS_HORARIAS + ["Desconocida"],
+    "sexo": valores(SEXO_OPCIONES),
+}
+
+# Ficheros anuales del portal: data/<año>_Accidentalidad.xlsx|csv
+PATRON_FICHERO_ANUAL = re.compile(r"^(\d{4})_Accidentalidad\.(xlsx|csv)$", re.IGNORECASE)
+
+# Filas por bloque al procesar los ficheros anuales
+TAMAÑO_BLOQUE = 100_000
+
+# Nombres de columna de referencia (los del fichero de 2025)
+COLUMNAS_REFERENCIA = [
+    "num_expediente", "fecha", "hora", "localizacion", "numero",
+    "cod_distrito", "distrito", "tipo_accidente", "estado_meteorológico",
+    "tipo_vehiculo", "tipo_persona", "rango_edad", "sexo",
+    "cod_lesividad", "lesividad", "coordenada_x_utm", "coordenada_y_utm",
+    "positiva_alcohol", "positiva_droga",
+]
+
+# Cambios de nombre entre años que no se resuelven solo con quitar
+# tildes y mayúsculas (clave ya simplificada -> nombre de referencia)
+ALIAS_COLUMNAS = {
+    "estado_meteorologico": "estado_meteorológico",
+    "tipo_vehículo": "tipo_vehiculo",
+    "lesividad*": "lesividad",
+    "coordenada_x": "coordenada_x_utm",
+    "coordenada_y": "coordenada_y_utm",
+    "positivo_alcohol": "positiva_alcohol",
+    "positivo_droga": "positiva_droga",
+}
+
 
 def _ruta_data() -> Path:
     """
@@ -30,78 +112,262 @@ def _ruta_data() -> Path:
     return Path(__file__).resolve().parents[1] / "data"
 
 
-def cargar_datos_brutos_2025() -> pd.DataFrame:
+def _tipo_categorico(col: str, serie: pd.Series) -> pd.CategoricalDtype:
+    """
+    Tipo category de una columna: el vocabulario fijo (si lo tiene) seguido
+    de los demás valores observados, ordenados.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        observados = serie.cat.categories
+    else:
+        observados = pd.Index(serie.dropna().unique())
+    fijo = VOCABULARIO_CATEGORIAS.get(col)
+    if fijo is None:
+        return pd.CategoricalDtype(observados.sort_values())
+    extra = observados.difference(fijo)
+    return pd.CategoricalDtype(list(fijo) + list(extra.sort_values()))
+
+
+def _a_categorica(serie: pd.Series, categorias) -> pd.Series:
+    # astype no reordena una categórica sin orden (los tipos se consideran
+    # iguales), así que en ese caso se usa set_categories
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.set_categories(categorias)
+    return serie.astype(pd.CategoricalDtype(categorias))
+
+
+def _fijar_categorias(df: pd.DataFrame) -> pd.DataFrame:
+    """Convierte COLUMNAS_CATEGORICAS a category con su vocabulario."""
+    for col in COLUMNAS_CATEGORICAS:
+        if col in df.columns:
+            df[col] = _a_categorica(df[col], _tipo_categorico(col, df[col]).categories)
+    return df
+
+
+def _fijar_texto(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convierte 'numero' (mezcla de enteros y textos en el Excel) a texto.
+
+    Siempre al mismo StringDtype: al releer un Parquet o Feather, pandas
+    devuelve otro tipo de texto (con NaN en vez de NA) y las distintas
+    rutas de carga no darían el mismo DataFrame.
+    """
+    if "numero" in df.columns:
+        df["numero"] = df["numero"].astype(TIPO_TEXTO)
+    return df
+
+
+def _tipar_datos_brutos(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aplica tipos compactos y homogéneos a los datos brutos:
+    - columnas de texto de baja cardinalidad como category,
+    - 'numero' (mezcla de enteros y textos en el Excel) como texto.
+    """
+    return _fijar_texto(_fijar_categorias(df))
+
+
+def _ruta_cache(ruta_fichero: Path, formato: str) -> Path:
+    return ruta_fichero.with_suffix(f".{formato}")
+
+
+def _ruta_meta_cache(ruta_cache: Path) -> Path:
+    return ruta_cache.with_name(ruta_cache.name + ".json")
+
+
+def _firma_fichero(ruta: Path) -> dict:
+    info = ruta.stat()
+    return {"mtime_ns": info.st_mtime_ns, "tamaño": info.st_size}
+
+
+def _hash_fichero(ruta: Path) -> str:
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _cache_valida(ruta_fichero: Path, ruta_cache: Path) -> bool:
+    """
+    Comprueba si la caché corresponde al fichero original.
+
+    Primero se compara fecha de modificación y tamaño (barato). Si la fecha
+    ha cambiado pero el contenido es el mismo (p.ej. tras copiar el fichero),
+    se acepta la caché comparando el hash y se actualizan los metadatos.
+    """
+    ruta_meta = _ruta_meta_cache(ruta_cache)
+    if not ruta_cache.exists() or not ruta_meta.exists():
+        return False
+
+    meta = json.loads(ruta_meta.read_text(encoding="utf-8"))
+    firma = _firma_fichero(ruta_fichero)
+    if all(meta.get(k) == v for k, v in firma.items()):
+        return True
+
+    if firma["tamaño"] == meta.get("tamaño") and meta.get("sha256") == _hash_fichero(ruta_fichero):
+        meta.update(firma)
+        ruta_meta.write_text(json.dumps(meta), encoding="utf-8")
+        return True
+
+    return False
+
+
+def _escribir_cache(df: pd.DataFrame, ruta_fichero: Path, ruta_cache: Path, formato: str):
+    """
+    Guarda df en formato columnar junto a sus metadatos. Se escribe en un
+    fichero temporal y se renombra, para que otro proceso nunca lea una
+    caché a medio escribir.
+    """
+    ruta_tmp = ruta_cache.with_name(ruta_cache.name + f".{os.getpid()}.tmp")
+    if formato == "parquet":
+        df.to_parquet(ruta_tmp, index=False)
+    else:
+        df.reset_index(drop=True).to_feather(ruta_tmp)
+    os.replace(ruta_tmp, ruta_cache)
+
+    meta = {**_firma_fichero(ruta_fichero), "sha256": _hash_fichero(ruta_fichero), "formato": formato}
+    _ruta_meta_cache(ruta_cache).write_text(json.dumps(meta), encoding="utf-8")
+
+
+def _leer_cache(ruta_cache: Path, formato: str, columnas: Optional[list]) -> pd.DataFrame:
+    if formato == "parquet":
+        df = pd.read_parquet(ruta_cache, columns=columnas)
+    else:
+        df = pd.read_feather(ruta_cache, columns=columnas)
+    # Las categorías y el texto se fijan al leer, por si la caché es de
+    # otra versión
+    return _fijar_texto(_fijar_categorias(df))
+
+
+def cargar_datos_brutos_2025(columnas: Optional[Sequence[str]] = None,
+                             usar_cache: bool = True,
+                             formato_cache: str = "parquet") -> pd.DataFrame:
     """
     Carga el fichero Excel de 2025 tal cual viene del portal.
 
+    Parameters
+    ----------
+    columnas : list of str, optional
+        Si se indica, solo se devuelven esas columnas (y, con caché, solo
+        esas columnas se leen de disco).
+    usar_cache : bool
+        Si es True, se lee de la caché columnar cuando es válida y se crea
+        en la primera carga. Sin pyarrow instalado se lee siempre el Excel.
+    formato_cache : {"parquet", "feather"}
+        Formato de la caché.
+
     Returns
     -------
     df : pandas.DataFrame
-        Datos originales sin transformar.
+        Datos originales sin transformar (con tipos compactos).
     """
     ruta_fichero = _ruta_data() / DATA_FILE_2025
     if not ruta_fichero.exists():
         raise FileNotFoundError(f"No se ha encontrado el fichero {ruta_fichero}")
 
-    df = pd.read_excel(ruta_fichero)
+    if formato_cache not in FORMATOS_CACHE:
+        raise ValueError(
+            f"Formato de caché no válido: {formato_cache!r}. "
+            f"Opciones: {', '.join(FORMATOS_CACHE)}."
+        )
+
+    columnas = list(columnas) if columnas is not None else None
+    ruta_cache = _ruta_cache(ruta_fichero, formato_cache)
+
+    if usar_cache:
+        try:
+            if _cache_valida(ruta_fichero, ruta_cache):
+                return _leer_cache(ruta_cache, formato_cache, columnas)
+        except ImportError:
+            # Sin pyarrow no hay caché columnar: leemos el Excel sin más
+            usar_cache = False
+
+    df = _tipar_datos_brutos(pd.read_excel(ruta_fichero))
+
+    if usar_cache:
+        try:
+            _escribir_cache(df, ruta_fichero, ruta_cache, formato_cache)
+            # Releemos la caché para que la primera carga devuelva
+            # exactamente los mismos tipos que las siguientes
+            return _leer_cache(ruta_cache, formato_cache, columnas)
+        except (ImportError, OSError):
+            # Sin pyarrow o sin permisos de escritura: seguimos sin caché
+            pass
+
+    if columnas is not None:
+        df = df[columnas]
     return df
 
 
+def _hora_a_numero(hora: pd.Series) -> np.ndarray:
+    """
+    Extrae la hora (0–23) de la columna 'hora' como float (NaN si no se
+    puede interpretar).
+
+    Admite horas timedelta, datetime, objetos time o textos "HH:MM:SS".
+    En estos dos últimos casos solo se interpretan los valores distintos
+    (como mucho 1.440 en un día) y el resultado se propaga con sus códigos,
+    en lugar de parsear fila a fila.
+    """
+    if pd.api.types.is_timedelta64_dtype(hora):
+        return (hora.dt.total_seconds() // 3600).to_numpy(dtype=float)
+    if pd.api.types.is_datetime64_any_dtype(hora):
+        return hora.dt.hour.to_numpy(dtype=float)
+
+    codigos, unicos = pd.factorize(hora)
+    partes = pd.Index(unicos).astype(str).str.extract(r"^(\d{1,2}):(\d{1,2}):(\d{1,2})$")
+    h, m, sg = (pd.to_numeric(partes[i]).to_numpy(dtype=float, copy=True) for i in range(3))
+
+    # Igual que el antiguo pd.to_datetime(format="%H:%M:%S", errors="coerce")
+    h[(h > 23) | (m > 59) | (sg > 59)] = np.nan
+
+    return np.where(codigos >= 0, h[codigos], np.nan)
+
+
 def _añadir_variables_tiempo(df: pd.DataFrame) -> pd.DataFrame:
     """
     Añade columnas relacionadas con fecha y hora:
     - fecha (datetime)
     - hora_num (0–23)
     - dia_semana_num (0=Lunes,...,6=Domingo)
-    - dia_semana (nombre en castellano)
+    - dia_semana (nombre en castellano, categórica)
     - es_fin_semana (bool)
     - franja_horaria (categoría acorde a la app)
+
+    hora_num y dia_semana_num son int8 (float32 si hay valores
+    desconocidos) y las categóricas usan VOCABULARIO_CATEGORIAS.
+
+    Todas las columnas se calculan con operaciones vectorizadas. No se
+    copian los datos: df se copia de forma superficial para no modificar
+    el DataFrame de entrada.
     """
-    df = df.copy()
+    df = df.copy(deep=False)
 
     # Aseguramos tipo datetime
     df["fecha"] = pd.to_datetime(df["fecha"])
 
-    # Hora como entero (0–23). errors='coerce' por si alguna fila viene mal.
-    df["hora_num"] = pd.to_datetime(df["hora"], format="%H:%M:%S", errors="coerce").dt.hour
+    # Hora como número (0–23); NaN si alguna fila viene mal
+    hora_num = _hora_a_numero(df["hora"])
+    # int8 si no hay horas desconocidas; si no, float32 con NaN
+    df["hora_num"] = hora_num.astype(np.float32 if np.isnan(hora_num).any() else np.int8)
 
     # Día de la semana
-    df["dia_semana_num"] = df["fecha"].dt.dayofweek
-    map_dia = {
-        0: "Lunes",
-        1: "Martes",
-        2: "Miércoles",
-        3: "Jueves",
-        4: "Viernes",
-        5: "Sábado",
-        6: "Domingo",
-    }
-    df["dia_semana"] = df["dia_semana_num"].map(map_dia)
+    dia_num = df["fecha"].dt.dayofweek
+    df["dia_semana_num"] = dia_num.astype(np.float32 if dia_num.isna().any() else np.int8)
+    df["dia_semana"] = pd.Categorical.from_codes(
+        dia_num.fillna(-1).to_numpy(dtype=np.int8), categories=VOCABULARIO_CATEGORIAS["dia_semana"]
+    )
 
     # Fin de semana
-    df["es_fin_semana"] = df["dia_semana"].isin(["Sábado", "Domingo"])
-
-    # Franja horaria alineada con la app
-    def asignar_franja(hora):
-        if pd.isna(hora):
-            return "Desconocida"
-        hora = int(hora)
-        if 0 <= hora <= 5:
-            return "Noche_madrugada"
-        elif 6 <= hora <= 9:
-            return "Manana_punta"
-        elif 10 <= hora <= 13:
-            return "Manana_media"
-        elif 14 <= hora <= 17:
-            return "Tarde"
-        elif 18 <= hora <= 21:
-            return "Tarde_punta"
-        elif 22 <= hora <= 23:
-            return "Noche"
-        else:
-            return "Desconocida"
+    df["es_fin_semana"] = (dia_num >= 5).to_numpy()
 
-    df["franja_horaria"] = df["hora_num"].apply(asignar_franja)
+    # Franja horaria alineada con la app: buscamos en qué tramo cae cada
+    # hora; las horas desconocidas van a la última categoría
+    codigos_franja = np.searchsorted(INICIO_FRANJAS, np.nan_to_num(hora_num, nan=0), side="right") - 1
+    codigos_franja[np.isnan(hora_num)] = len(FRANJAS_HORARIAS)
+    df["franja_horaria"] = pd.Categorical.from_codes(
+        codigos_franja, categories=VOCABULARIO_CATEGORIAS["franja_horaria"]
+    )
 
     return df
 
@@ -112,22 +378,16 @@ def _añadir_objetivo_grave(df: pd.DataFrame) -> pd.DataFrame:
 
     grave = 1 si cod_lesividad en {3,4}
     grave = 0 si cod_lesividad en {1,2,5,6,7,14}
-    NaN  en el resto de casos (sin info de lesividad)
+    <NA> en el resto de casos (sin info de lesividad)
 
-    Además, la columna grave se deja como entero (0/1) donde se conoce.
+    Se guarda como entero nullable "Int8".
     """
-    df = df.copy()
-
-    df["grave"] = np.nan
+    df = df.copy(deep=False)
 
-    cond_grave = df["cod_lesividad"].isin([3, 4])
-    cond_no_grave = df["cod_lesividad"].isin([1, 2, 5, 6, 7, 14])
+    cond_grave = df["cod_lesividad"].isin([3, 4]).to_numpy()
+    cond_no_grave = df["cod_lesividad"].isin([1, 2, 5, 6, 7, 14]).to_numpy()
 
-    df.loc[cond_grave, "grave"] = 1
-    df.loc[cond_no_grave, "grave"] = 0
-
-    # Convertimos a entero donde no es NaN
-    df.loc[df["grave"].notna(), "grave"] = df.loc[df["grave"].notna(), "grave"].astype(int)
+    df["grave"] = pd.arrays.IntegerArray(cond_grave.astype(np.int8), ~(cond_grave | cond_no_grave))
 
     return df
 
@@ -146,14 +406,27 @@ def preparar_datos_2025(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
     df_completo : pandas.DataFrame
         DataFrame con columnas adicionales (tiempo, franja, objetivo, etc.).
     df_target : pandas.DataFrame
-        Subconjunto de df_completo donde la variable 'grave' está definida (0/1).
+        Subconjunto de df_completo donde la variable 'grave' está definida,
+        con 'grave' como int8 (0/1).
     """
     df_proc = _añadir_variables_tiempo(df)
     df_proc = _añadir_objetivo_grave(df_proc)
 
-    df_target = df_proc.dropna(subset=["grave"]).copy()
+    return df_proc, _filas_objetivo(df_proc)
 
-    return df_proc, df_target
+
+def _filas_objetivo(df_proc: pd.DataFrame) -> pd.DataFrame:
+    """
+    Filas de df_proc con 'grave' definido, en una sola selección y con el
+    objetivo como int8.
+
+    La selección booleana ya copia las filas; el copy(deep=False) deja
+    claro que df_target es un DataFrame propio (no una vista de df_proc)
+    antes de cambiarle la columna, sin volver a copiar los datos.
+    """
+    df_target = df_proc.loc[df_proc["grave"].notna().to_numpy()].copy(deep=False)
+    df_target["grave"] = df_target["grave"].to_numpy(dtype=np.int8)
+    return df_target
 
 
 def cargar_y_preparar_2025() -> Tuple[pd.DataFrame, pd.DataFrame]:
@@ -173,3 +446,504 @@ def cargar_y_preparar_2025() -> Tuple[pd.DataFrame, pd.DataFrame]:
     df_raw = cargar_datos_brutos_2025()
     df_proc, df_target = preparar_datos_2025(df_raw)
     return df_proc, df_target
+
+
+# --- Varios años: carga por bloques ---
+
+
+def _simplificar_nombre(nombre) -> str:
+    """Minúsculas, sin tildes y con '_' en lugar de espacios."""
+    texto = unicodedata.normalize("NFKD", str(nombre).strip().lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return re.sub(r"\s+", "_", texto)
+
+
+_NOMBRES_REFERENCIA = {_simplificar_nombre(col): col for col in COLUMNAS_REFERENCIA}
+_NOMBRES_REFERENCIA.update({_simplificar_nombre(k): v for k, v in ALIAS_COLUMNAS.items()})
+
+
+def _armonizar_columnas(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Renombra las columnas de un fichero anual a los nombres de referencia
+    (p.ej. 'Estado_meteorologico' -> 'estado_meteorológico') y asegura que
+    'fecha' es datetime (en los CSV viene como texto dd/mm/aaaa).
+    """
+    df = df.rename(
+        columns=lambda col: _NOMBRES_REFERENCIA.get(_simplificar_nombre(col), col)
+    )
+    if "fecha" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["fecha"]):
+        df["fecha"] = pd.to_datetime(df["fecha"], dayfirst=True, errors="coerce")
+    return df
+
+
+def descubrir_ficheros(años: Optional[Sequence[int]] = None,
+                       carpeta: Optional[Path] = None) -> Dict[int, Path]:
+    """
+    Busca en data/ los ficheros anuales '<año>_Accidentalidad.xlsx|csv'.
+
+    Si hay CSV y Excel del mismo año se usa el CSV (se lee más rápido).
+
+    Returns
+    -------
+    ficheros : dict
+        {año: ruta}, ordenado por año.
+    """
+    carpeta = Path(carpeta) if carpeta is not None else _ruta_data()
+
+    ficheros = {}
+    for ruta in carpeta.iterdir():
+        encontrado = PATRON_FICHERO_ANUAL.match(ruta.name)
+        if encontrado is None:
+            continue
+        año = int(encontrado.group(1))
+        if año not in ficheros or ruta.suffix.lower() == ".csv":
+            ficheros[año] = ruta
+
+    if años is not None:
+        faltan = sorted(set(años) - set(ficheros))
+        if faltan:
+            raise FileNotFoundError(
+                f"No se han encontrado ficheros de accidentalidad para: {faltan} en {carpeta}"
+            )
+        ficheros = {año: ficheros[año] for año in años}
+
+    return dict(sorted(ficheros.items()))
+
+
+def _formato_csv(ruta: Path) -> Tuple[str, str]:
+    """Detecta codificación y separador mirando el inicio del CSV."""
+    with open(ruta, "rb") as f:
+        inicio = f.read(1 << 16)
+    try:
+        inicio.decode("utf-8")
+        codificacion = "utf-8-sig"
+    except UnicodeDecodeError:
+        codificacion = "latin-1"
+    cabecera = inicio.split(b"\n", 1)[0]
+    separador = ";" if cabecera.count(b";") > cabecera.count(b",") else ","
+    return codificacion, separador
+
+
+def _leer_bloques_csv(ruta: Path, tamaño_bloque: int) -> Iterator[pd.DataFrame]:
+    codificacion, separador = _formato_csv(ruta)
+    yield from pd.read_csv(
+        ruta, sep=separador, encoding=codificacion,
+        chunksize=tamaño_bloque, low_memory=False,
+    )
+
+
+def _leer_bloques_xlsx(ruta: Path, tamaño_bloque: int) -> Iterator[pd.DataFrame]:
+    # Todas las hojas, en orden y cada una con su cabecera: las mismas
+    # filas que la carga en paralelo (una tarea por hoja)
+    from openpyxl import load_workbook
+
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        for hoja in libro.worksheets:
+            filas = hoja.iter_rows(values_only=True)
+            cabecera = next(filas, None)
+            if cabecera is None:
+                continue
+            cabecera = list(cabecera)
+            bloque = []
+            for fila in filas:
+                bloque.append(fila)
+                if len(bloque) == tamaño_bloque:
+                    yield pd.DataFrame(bloque, columns=cabecera)
+                    bloque = []
+            if bloque:
+                yield pd.DataFrame(bloque, columns=cabecera)
+    finally:
+        libro.close()
+
+
+def leer_bloques(ruta: Path, tamaño_bloque: int = TAMAÑO_BLOQUE) -> Iterator[pd.DataFrame]:
+    """Lee un fichero anual (CSV o Excel, todas sus hojas) en bloques de filas."""
+    ruta = Path(ruta)
+    if ruta.suffix.lower() == ".csv":
+        return _leer_bloques_csv(ruta, tamaño_bloque)
+    return _leer_bloques_xlsx(ruta, tamaño_bloque)
+
+
+def _preparar_bloque(df: pd.DataFrame) -> pd.DataFrame:
+    """Armoniza, tipa y añade variables derivadas a un bloque de filas."""
+    df = _tipar_datos_brutos(_armonizar_columnas(df))
+    df = _añadir_variables_tiempo(df)
+    return _añadir_objetivo_grave(df)
+
+
+def _concatenar_bloques(bloques: list) -> pd.DataFrame:
+    """
+    Concatena bloques ya preparados. Las columnas categóricas se llevan
+    antes a un mismo tipo (unión de categorías, conservando el orden del
+    vocabulario fijo), para que el resultado siga siendo categórico y no
+    se convierta a texto; 'numero' queda con el tipo de _fijar_texto.
+    """
+    categoricas = {}
+    for bloque in bloques:
+        for col in bloque.columns:
+            if isinstance(bloque[col].dtype, pd.CategoricalDtype):
+                categoricas.setdefault(col, []).append(bloque[col].cat.categories)
+
+    for col, lista in categoricas.items():
+        union = lista[0]
+        for categorias in lista[1:]:
+            union = union.append(categorias.difference(union))
+        for bloque in bloques:
+            if col in bloque.columns:
+                bloque[col] = _a_categorica(bloque[col], union)
+
+    return _fijar_texto(pd.concat(bloques, ignore_index=True))
+
+
+def cargar_y_preparar(años: Optional[Sequence[int]] = None,
+                      tamaño_bloque: int = TAMAÑO_BLOQUE,
+                      carpeta: Optional[Path] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Carga y prepara varios años de accidentalidad procesando cada fichero
+    por bloques de filas.
+
+    Cada bloque se armoniza (nombres de columna que cambian entre años),
+    se tipa de forma compacta y pasa por _añadir_variables_tiempo y
+    _añadir_objetivo_grave antes de leer el siguiente, así que nunca se
+    tienen en memoria los datos brutos completos de todos los años.
+
+    Parameters
+    ----------
+    años : list of int, optional
+        Años a cargar. Por defecto, todos los que haya en data/.
+    tamaño_bloque : int
+        Filas por bloque.
+    carpeta : pathlib.Path, optional
+        Carpeta con los ficheros anuales (por defecto, data/).
+
+    Returns
+    -------
+    df_proc : pandas.DataFrame
+        Datos de todos los años con columnas derivadas.
+    df_target : pandas.DataFrame
+        Solo filas con objetivo 'grave' definido (0/1).
+    """
+    ficheros = descubrir_ficheros(años, carpeta)
+    if not ficheros:
+        raise FileNotFoundError("No se ha encontrado ningún fichero de accidentalidad en data/")
+
+    bloques = [
+        _preparar_bloque(bloque)
+        for ruta in ficheros.values()
+        for bloque in leer_bloques(ruta, tamaño_bloque)
+    ]
+    df_proc = _concatenar_bloques(bloques)
+
+    return df_proc, _filas_objetivo(df_proc)
+
+
+# --- Varios años: carga en paralelo ---
+
+
+def _tareas_ingesta(ficheros: Dict[int, Path]) -> list:
+    """Una tarea por fichero CSV y una por hoja en los Excel: (ruta, hoja)."""
+    from openpyxl import load_workbook
+
+    tareas = []
+    for ruta in ficheros.values():
+        if ruta.suffix.lower() == ".csv":
+            tareas.append((ruta, None))
+            continue
+        libro = load_workbook(ruta, read_only=True)
+        try:
+            tareas.extend((ruta, hoja) for hoja in libro.sheetnames)
+        finally:
+            libro.close()
+    return tareas
+
+
+def _parsear_a_parquet(ruta: Path, hoja: Optional[str], ruta_salida: Path) -> Path:
+    """
+    Trabajo de cada proceso: lee un fichero (u hoja), armoniza y tipa las
+    columnas y lo deja en Parquet. Al proceso principal solo vuelve la
+    ruta, no el DataFrame, para no pagar la copia entre procesos.
+    """
+    if ruta.suffix.lower() == ".csv":
+        codificacion, separador = _formato_csv(ruta)
+        df = pd.read_csv(ruta, sep=separador, encoding=codificacion, low_memory=False)
+    else:
+        df = pd.read_excel(ruta, sheet_name=hoja)
+
+    df = _tipar_datos_brutos(_armonizar_columnas(df))
+    df.to_parquet(ruta_salida, index=False)
+    return ruta_salida
+
+
+def cargar_y_preparar_paralelo(años: Optional[Sequence[int]] = None,
+                               n_workers: Optional[int] = None,
+                               carpeta: Optional[Path] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Como cargar_y_preparar, pero leyendo los ficheros anuales (o cada hoja
+    de los Excel) en paralelo con un ProcessPoolExecutor.
+
+    Cada proceso escribe su resultado en un Parquet temporal; el proceso
+    principal los lee en orden, los concatena y aplica preparar_datos_2025,
+    de modo que el resultado es el mismo que con la ruta en serie.
+
+    Parameters
+    ----------
+    años : list of int, optional
+        Años a cargar. Por defecto, todos los que haya en data/.
+    n_workers : int, optional
+        Número de procesos. Por defecto, uno por núcleo (sin superar el
+        número de ficheros/hojas).
+    carpeta : pathlib.Path, optional
+        Carpeta con los ficheros anuales (por defecto, data/).
+
+    Returns
+    -------
+    df_proc : pandas.DataFrame
+        Datos de todos los años con columnas derivadas.
+    df_target : pandas.DataFrame
+        Solo filas con objetivo 'grave' definido (0/1).
+    """
+    ficheros = descubrir_ficheros(años, carpeta)
+    if not ficheros:
+        raise FileNotFoundError("No se ha encontrado ningún fichero de accidentalidad en data/")
+
+    tareas = _tareas_ingesta(ficheros)
+    n_workers = min(n_workers or os.cpu_count() or 1, len(tareas))
+
+    with tempfile.TemporaryDirectory(prefix="madly_ingesta_") as tmp:
+        salidas = [Path(tmp) / f"parte_{i:03d}.parquet" for i in range(len(tareas))]
+
+        if n_workers == 1:
+            for (ruta, hoja), salida in zip(tareas, salidas):
+                _parsear_a_parquet(ruta, hoja, salida)
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers) as ejecutor:
+                futuros = [
+                    ejecutor.submit(_parsear_a_parquet, ruta, hoja, salida)
+                    for (ruta, hoja), salida in zip(tareas, salidas)
+                ]
+                for futuro in futuros:
+                    futuro.result()
+
+        df_raw = _concatenar_bloques([pd.read_parquet(salida) for salida in salidas])
+
+    return preparar_datos_2025(df_raw)
+
+
+# --- Carga incremental ---
+
+# Versión del formato del almacén incremental (si cambia, se reconstruye)
+VERSION_ALMACEN = 1
+
+
+def _ruta_almacen(ruta_fichero: Path) -> Path:
+    """Carpeta del almacén incremental: data/<nombre>.incremental/"""
+    return ruta_fichero.with_name(ruta_fichero.stem + ".incremental")
+
+
+def _hash_prefijo(ruta: Path, n_bytes: int) -> str:
+    """SHA-256 de los primeros n_bytes del fichero."""
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        pendientes = n_bytes
+        while pendientes > 0:
+            trozo = f.read(min(1 << 20, pendientes))
+            if not trozo:
+                break
+            h.update(trozo)
+            pendientes -= len(trozo)
+    return h.hexdigest()
+
+
+def _huellas_filas(df: pd.DataFrame) -> np.ndarray:
+    """Hash (uint64) de cada fila bruta, sobre las columnas de referencia."""
+    columnas = [col for col in COLUMNAS_REFERENCIA if col in df.columns]
+    return pd.util.hash_pandas_object(df[columnas], index=False).to_numpy()
+
+
+def _leer_meta_almacen(almacen: Path) -> Optional[dict]:
+    ruta_meta = almacen / "meta.json"
+    if not ruta_meta.exists():
+        return None
+    meta = json.loads(ruta_meta.read_text(encoding="utf-8"))
+    if meta.get("version") != VERSION_ALMACEN:
+        return None
+    return meta
+
+
+def _filas_nuevas_csv(ruta: Path, meta: dict) -> Optional[pd.DataFrame]:
+    """
+    Filas añadidas al final de un CSV desde la última actualización,
+    leyendo solo los bytes nuevos. None si el contenido ya procesado ha
+    cambiado (o no se puede saber) y hay que reconstruir.
+    """
+    n_bytes = meta.get("bytes")
+    if n_bytes is None or ruta.stat().st_size < n_bytes:
+        return None
+    if _hash_prefijo(ruta, n_bytes) != meta["sha256_prefijo"]:
+        return None
+
+    codificacion, separador = _formato_csv(ruta)
+    with open(ruta, "rb") as f:
+        cabecera = f.readline()
+        f.seek(n_bytes - 1)
+        resto = f.read()
+    # Si lo ya procesado no acababa en salto de línea, la última fila puede
+    # haber crecido: no se sabe qué es nuevo
+    if resto[:1] != b"\n" and len(resto) > 1:
+        return None
+    return _armonizar_columnas(pd.read_csv(io.BytesIO(cabecera + resto[1:]), sep=separador,
+                                           encoding=codificacion, low_memory=False))
+
+
+def _escribir_parte(almacen: Path, n_parte: int, df: pd.DataFrame):
+    ruta = almacen / f"parte_{n_parte:05d}.parquet"
+    ruta_tmp = ruta.with_name(ruta.name + ".tmp")
+    df.to_parquet(ruta_tmp, index=False)
+    os.replace(ruta_tmp, ruta)
+
+
+def _escribir_meta_almacen(almacen: Path, meta: dict):
+    ruta_tmp = almacen / "meta.json.tmp"
+    ruta_tmp.write_text(json.dumps(meta, ensure_ascii=False, indent=1), encoding="utf-8")
+    os.replace(ruta_tmp, almacen / "meta.json")
+
+
+def _marca_de_agua(df_proc: pd.DataFrame, meta: dict) -> dict:
+    """Actualiza la fecha máxima procesada."""
+    meta.pop("ultimo_expediente", None)  # almacenes anteriores
+    if len(df_proc) == 0 or "fecha" not in df_proc.columns:
+        return meta
+    fecha_max = df_proc["fecha"].max()
+    if pd.notna(fecha_max) and (meta.get("fecha_max") is None
+                                or fecha_max > pd.Timestamp(meta["fecha_max"])):
+        meta["fecha_max"] = fecha_max.isoformat()
+    return meta
+
+
+def _anteriores_a_la_marca(nuevas: pd.DataFrame, meta: dict) -> bool:
+    """
+    True si alguna fila añadida tiene fecha anterior a la fecha máxima ya
+    procesada. El portal publica en orden de fecha, así que una fila así
+    no es una novedad sino un fichero reescrito (correcciones o filas
+    reordenadas), y hay que reconstruir. Las del mismo día que la marca
+    sí se aceptan: son accidentes publicados después.
+    """
+    if meta.get("fecha_max") is None or "fecha" not in nuevas.columns:
+        return False
+    return bool((nuevas["fecha"] < pd.Timestamp(meta["fecha_max"])).any())
+
+
+def actualizar_almacen(año: int = 2025, carpeta: Optional[Path] = None,
+                       reconstruir: bool = False) -> dict:
+    """
+    Lleva el almacén incremental de un año al día con su fichero.
+
+    El almacén (data/<año>_Accidentalidad.incremental/) guarda las filas ya
+    preparadas en partes Parquet, más una marca de agua: filas procesadas
+    y fecha máxima. También guarda, para detectar cambios en lo ya
+    procesado, los bytes leídos y su SHA-256 (CSV) o un hash por fila
+    (Excel).
+
+    - Si solo hay filas nuevas al final, se preparan solo esas y se
+      escriben en una parte nueva. En un CSV ni siquiera se vuelve a leer
+      lo ya procesado; en un Excel hay que leerlo, pero no transformarlo.
+    - Si cambia o desaparece alguna fila ya procesada, si alguna fila
+      nueva tiene fecha anterior a la fecha máxima ya procesada (ver
+      _anteriores_a_la_marca) o con reconstruir=True, se reconstruye el
+      almacén completo.
+
+    Returns
+    -------
+    resumen : dict
+        modo ("completa", "incremental" o "sin_cambios"), filas nuevas,
+        filas totales y segundos.
+    """
+    inicio = time.perf_counter()
+    ruta = descubrir_ficheros([año], carpeta)[año]
+    almacen = _ruta_almacen(ruta)
+    es_csv = ruta.suffix.lower() == ".csv"
+
+    meta = None if reconstruir else _leer_meta_almacen(almacen)
+    if meta is not None and meta.get("fichero") != ruta.name:
+        meta = None
+
+    nuevas = None
+    huellas = None
+    if meta is not None and es_csv:
+        nuevas = _filas_nuevas_csv(ruta, meta)
+    elif meta is not None:
+        bruto = pd.concat(
+            [_armonizar_columnas(b) for b in leer_bloques(ruta)], ignore_index=True
+        )
+        huellas = _huellas_filas(bruto)
+        previas = np.load(almacen / "huellas.npy")
+        if len(huellas) >= len(previas) and np.array_equal(huellas[:len(previas)], previas):
+            nuevas = bruto.iloc[len(previas):]
+    if nuevas is not None and _anteriores_a_la_marca(nuevas, meta):
+        nuevas = None
+
+    if nuevas is None:
+        # Reconstrucción completa
+        if almacen.exists():
+            for parte in almacen.glob("parte_*.parquet"):
+                parte.unlink()
+        almacen.mkdir(parents=True, exist_ok=True)
+
+        bruto = pd.concat([_armonizar_columnas(b) for b in leer_bloques(ruta)], ignore_index=True)
+        df_proc = _preparar_bloque(bruto)
+        _escribir_parte(almacen, 0, df_proc)
+        meta = _marca_de_agua(df_proc, {
+            "version": VERSION_ALMACEN, "fichero": ruta.name,
+            "filas": len(df_proc), "partes": 1,
+        })
+        if not es_csv:
+            np.save(almacen / "huellas.npy", _huellas_filas(bruto))
+        modo, n_nuevas = "completa", len(df_proc)
+
+    elif len(nuevas) == 0:
+        modo, n_nuevas = "sin_cambios", 0
+
+    else:
+        df_nuevo = _preparar_bloque(nuevas.reset_index(drop=True))
+        _escribir_parte(almacen, meta["partes"], df_nuevo)
+        meta["partes"] += 1
+        meta["filas"] += len(df_nuevo)
+        meta = _marca_de_agua(df_nuevo, meta)
+        if huellas is not None:
+            np.save(almacen / "huellas.npy", huellas)
+        modo, n_nuevas = "incremental", len(df_nuevo)
+
+    if es_csv:
+        meta["bytes"] = ruta.stat().st_size
+        meta["sha256_prefijo"] = _hash_prefijo(ruta, meta["bytes"])
+    _escribir_meta_almacen(almacen, meta)
+
+    return {
+        "modo": modo,
+        "filas_nuevas": n_nuevas,
+        "filas": meta["filas"],
+        "segundos": round(time.perf_counter() - inicio, 3),
+    }
+
+
+def cargar_y_preparar_incremental(año: int = 2025, carpeta: Optional[Path] = None,
+                                  reconstruir: bool = False) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Como cargar_y_preparar para un año, pero manteniendo un almacén local
+    con las filas ya preparadas (ver actualizar_almacen): en cada llamada
+    solo se transforman las filas publicadas desde la anterior.
+
+    Returns
+    -------
+    df_proc : pandas.DataFrame
+        Datos del año con columnas derivadas.
+    df_target : pandas.DataFrame
+        Solo filas con objetivo 'grave' definido (0/1).
+    """
+    actualizar_almacen(año, carpeta, reconstruir)
+    almacen = _ruta_almacen(descubrir_ficheros([año], carpeta)[año])
+
+    partes = sorted(almacen.glob("parte_*.parquet"))
+    df_proc = _concatenar_bloques([pd.read_parquet(parte) for parte in partes])
+    return df_proc, _filas_objetivo(df_proc)
@@ -1,9 +1,61 @@
-
 # graphics.py
-"""Funciones que devuelven figuras de Plotly utilizadas en la app."""
+"""
+Funciones que devuelven figuras de Plotly utilizadas en la app.
+
+El gráfico de franjas se dibuja en el navegador (src/assets/franjas.js):
+el callback de la app solo envía datos_franjas(...) y el layout de
+layouts_cliente() viaja una única vez con la página. figura_franjas(...)
+construye la misma figura en Python (notebooks, pruebas, exportación).
+
+Los mapas de calor de la pestaña "Mapa de la ciudad" se construyen en
+Python a partir de los cortes del cubo de src/agregados.py.
+"""
 
 import plotly.graph_objects as go
 
+# Layout del gráfico de franjas; el rango del eje Y se fija con los datos
+LAYOUT_FRANJAS = dict(
+    title="Comparación de franjas horarias",
+    yaxis=dict(
+        title="Probabilidad de lesión grave",
+        tickformat=".0%",
+    ),
+    xaxis_title="Franja",
+    bargap=0.3,
+)
+
+# Layout de la figura vacía (escenario incompleto o error)
+LAYOUT_VACIA = dict(
+    title="Franjas alternativas",
+    xaxis_title="Franja",
+    yaxis_title="Probabilidad de lesión grave",
+)
+
+
+def datos_franjas(riesgo_principal, alternativas):
+    """Datos mínimos del gráfico de franjas.
+
+    Parameters
+    ----------
+    riesgo_principal : float
+        Probabilidad para la franja seleccionada (0–1).
+    alternativas : list of (str, float)
+        Lista de pares (nombre_franja_legible, riesgo).
+
+    Returns
+    -------
+    datos : dict or None
+        {"nombres": [...], "valores": [...]}, con la franja seleccionada
+        en primer lugar. None si no hay escenario completo.
+    """
+    if riesgo_principal is None or alternativas is None:
+        return None
+
+    return {
+        "nombres": ["Franja seleccionada"] + [alt[0] for alt in alternativas],
+        "valores": [riesgo_principal] + [alt[1] for alt in alternativas],
+    }
+
 
 def figura_franjas(riesgo_principal, alternativas):
     """Construye un gráfico de barras con la franja seleccionada
@@ -20,11 +72,12 @@ def figura_franjas(riesgo_principal, alternativas):
     -------
     fig : plotly.graph_objects.Figure
     """
-    if riesgo_principal is None or alternativas is None:
+    datos = datos_franjas(riesgo_principal, alternativas)
+    if datos is None:
         return figura_vacia()
 
-    nombres = ["Franja seleccionada"] + [alt[0] for alt in alternativas]
-    valores = [riesgo_principal] + [alt[1] for alt in alternativas]
+    nombres = datos["nombres"]
+    valores = datos["valores"]
     porcentajes = [v * 100 for v in valores]
 
     fig = go.Figure()
@@ -34,16 +87,8 @@ def figura_franjas(riesgo_principal, alternativas):
         text=[f"{p:.1f} %" for p in porcentajes],
         textposition="auto",
     )
-    fig.update_layout(
-        title="Comparación de franjas horarias",
-        yaxis=dict(
-            title="Probabilidad de lesión grave",
-            tickformat=".0%",
-            range=[0, max(valores) * 1.2],
-        ),
-        xaxis_title="Franja",
-        bargap=0.3,
-    )
+    fig.update_layout(LAYOUT_FRANJAS)
+    fig.update_layout(yaxis_range=[0, max(valores) * 1.2])
 
     return fig
 
@@ -51,9 +96,96 @@ def figura_franjas(riesgo_principal, alternativas):
 def figura_vacia():
     """Figura vacía para cuando aún no hay escenario completo."""
     fig = go.Figure()
+    fig.update_layout(LAYOUT_VACIA)
+    return fig
+
+
+def layouts_cliente():
+    """Layouts de las figuras en JSON, para dibujarlas en el navegador.
+
+    Returns
+    -------
+    layouts : dict
+        {"plantilla": ..., "franjas": ..., "vacia": ...}. La plantilla de
+        Plotly (colores, fuentes, rejilla) va aparte y una sola vez.
+    """
+    franjas = go.Figure(layout=LAYOUT_FRANJAS).to_plotly_json()["layout"]
+    vacia = go.Figure(layout=LAYOUT_VACIA).to_plotly_json()["layout"]
+    plantilla = franjas.pop("template", None)
+    vacia.pop("template", None)
+    return {"plantilla": plantilla, "franjas": franjas, "vacia": vacia}
+
+
+# Títulos de las métricas del mapa (ver src/agregados.py)
+TITULOS_METRICA = {
+    "tasa_grave": "Proporción de lesión grave",
+    "accidentes": "Accidentes",
+    "personas": "Personas implicadas",
+}
+
+
+def _heatmap(x, y, valores, metrica, etiqueta="%{y} · %{x}"):
+    # Los NaN (celdas sin datos) quedan en blanco
+    es_tasa = metrica == "tasa_grave"
+    return go.Heatmap(
+        z=valores,
+        x=x,
+        y=y,
+        colorscale="Reds",
+        zmin=0,
+        colorbar=dict(title=TITULOS_METRICA[metrica], tickformat=".0%" if es_tasa else ","),
+        hovertemplate=etiqueta + "<br>%{z" + (":.1%" if es_tasa else ":,.0f") + "}<extra></extra>",
+    )
+
+
+def figura_mapa_distritos(distritos, franjas, valores, metrica):
+    """Mapa de calor distrito × franja horaria.
+
+    Parameters
+    ----------
+    distritos : list of str
+        Filas del mapa.
+    franjas : list of str
+        Etiquetas legibles de las columnas.
+    valores : numpy.ndarray
+        Matriz (distrito, franja) de la métrica.
+    metrica : str
+        Clave de TITULOS_METRICA.
+
+    Returns
+    -------
+    fig : plotly.graph_objects.Figure
+    """
+    fig = go.Figure(_heatmap(franjas, distritos, valores, metrica))
     fig.update_layout(
-        title="Franjas alternativas",
+        title=f"{TITULOS_METRICA[metrica]} por distrito y franja",
         xaxis_title="Franja",
-        yaxis_title="Probabilidad de lesión grave",
+        yaxis=dict(autorange="reversed"),
+        margin=dict(l=160),
+    )
+    return fig
+
+
+def figura_mapa_rejilla(x, y, valores, metrica):
+    """Mapa de calor sobre la rejilla de coordenadas UTM.
+
+    Parameters
+    ----------
+    x, y : numpy.ndarray
+        Coordenadas UTM de los centros de columnas y filas (metros).
+    valores : numpy.ndarray
+        Matriz (fila, columna) de la métrica, con las filas de sur a norte.
+    metrica : str
+        Clave de TITULOS_METRICA.
+
+    Returns
+    -------
+    fig : plotly.graph_objects.Figure
+    """
+    fig = go.Figure(_heatmap(x, y, valores, metrica, etiqueta="x=%{x:.0f} · y=%{y:.0f}"))
+    fig.update_layout(
+        title=f"{TITULOS_METRICA[metrica]} por celda del mapa",
+        xaxis=dict(title="UTM X (m)", showgrid=False),
+        yaxis=dict(title="UTM Y (m)", showgrid=False, scaleanchor="x"),
     )
     return fig
@@ -0,0 +1,232 @@
+# metricas.py
+"""
+Métricas de MADly Safe en formato de texto de Prometheus.
+
+- etapa(nombre): cronómetro para usar con `with`, que acumula la duración
+  de cada etapa del cálculo (carga del modelo, tabla, scorer,
+  predict_proba, alternativas, componentes de la app...) en un histograma.
+- contar_escenario(origen, resultado): peticiones por origen ("dash",
+  "api") y resultado ("ok", "incompleto", "invalido", "error").
+- registrar(server): añade /metrics al servidor Flask y mide la duración
+  de cada petición HTTP (incluida la serialización de la respuesta).
+- exportar(): texto para Prometheus, con las estadísticas de la caché de
+  escenarios incluidas.
+
+Las métricas son por proceso: con varios workers de gunicorn cada uno
+expone las suyas. Se desactivan con MADLY_METRICAS=0 (o activar(False));
+desactivadas, etapa() devuelve un cronómetro vacío y no se mide nada.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Límites superiores (segundos) de los intervalos de los histogramas
+LIMITES = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+           0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_ACTIVAS = os.environ.get("MADLY_METRICAS", "1") != "0"
+
+
+class Histograma:
+    """
+    Histograma acumulado al estilo de Prometheus.
+
+    Parameters
+    ----------
+    limites : tuple of float
+        Límites superiores de los intervalos, en orden creciente.
+    """
+
+    __slots__ = ("limites", "conteos", "suma", "_lock")
+
+    def __init__(self, limites=LIMITES):
+        self.limites = tuple(limites)
+        self.conteos = [0] * (len(self.limites) + 1)  # el último es +Inf
+        self.suma = 0.0
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float):
+        i = bisect_left(self.limites, valor)
+        with self._lock:
+            self.conteos[i] += 1
+            self.suma += valor
+
+    def instantanea(self):
+        """(conteos acumulados por límite, total, suma)."""
+        with self._lock:
+            conteos = list(self.conteos)
+            suma = self.suma
+        acumulados = []
+        total = 0
+        for c in conteos:
+            total += c
+            acumulados.append(total)
+        return acumulados, total, suma
+
+
+class _Cronometro:
+    __slots__ = ("_histograma", "_inicio")
+
+    def __init__(self, histograma: Histograma):
+        self._histograma = histograma
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._histograma.observar(time.perf_counter() - self._inicio)
+        return False
+
+
+class _CronometroNulo:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULO = _CronometroNulo()
+
+# Histogramas por etapa y por ruta HTTP, y contadores de escenarios
+_ETAPAS = {}
+_PETICIONES = {}
+_ESCENARIOS = {}
+_LOCK = threading.Lock()
+
+
+def _histograma(registro: dict, clave: str) -> Histograma:
+    histograma = registro.get(clave)
+    if histograma is None:
+        with _LOCK:
+            histograma = registro.setdefault(clave, Histograma())
+    return histograma
+
+
+def activar(activas: bool = True):
+    """Activa o desactiva la recogida de métricas en este proceso."""
+    global _ACTIVAS
+    _ACTIVAS = bool(activas)
+
+
+def activas() -> bool:
+    return _ACTIVAS
+
+
+def etapa(nombre: str):
+    """
+    Cronómetro de una etapa, para usar como `with etapa("tabla"): ...`.
+    La duración se registra aunque el bloque lance una excepción.
+    """
+    if not _ACTIVAS:
+        return _NULO
+    return _Cronometro(_histograma(_ETAPAS, nombre))
+
+
+def contar_escenario(origen: str, resultado: str, n: int = 1):
+    """Suma n escenarios atendidos con ese origen y resultado."""
+    if not _ACTIVAS:
+        return
+    clave = (origen, resultado)
+    with _LOCK:
+        _ESCENARIOS[clave] = _ESCENARIOS.get(clave, 0) + n
+
+
+def reiniciar():
+    """Borra todas las métricas acumuladas."""
+    with _LOCK:
+        _ETAPAS.clear()
+        _PETICIONES.clear()
+        _ESCENARIOS.clear()
+
+
+# --- Exportación ---
+
+
+def _formatear(valor: float) -> str:
+    return repr(float(valor)) if valor != int(valor) else str(int(valor))
+
+
+def _lineas_histograma(nombre: str, etiqueta: str, registro: dict) -> list:
+    lineas = []
+    for clave, histograma in sorted(registro.items()):
+        acumulados, total, suma = histograma.instantanea()
+        for limite, n in zip(histograma.limites + (float("inf"),), acumulados):
+            le = "+Inf" if limite == float("inf") else repr(limite)
+            lineas.append(f'{nombre}_bucket{{{etiqueta}="{clave}",le="{le}"}} {n}')
+        lineas.append(f'{nombre}_sum{{{etiqueta}="{clave}"}} {suma!r}')
+        lineas.append(f'{nombre}_count{{{etiqueta}="{clave}"}} {total}')
+    return lineas
+
+
+def exportar() -> str:
+    """Todas las métricas en formato de texto de Prometheus."""
+    from .model import estadisticas_cache
+    from .respuestas import estadisticas_respuestas
+
+    lineas = [
+        "# HELP madly_etapa_segundos Duración de cada etapa del cálculo del riesgo.",
+        "# TYPE madly_etapa_segundos histogram",
+        *_lineas_histograma("madly_etapa_segundos", "etapa", _ETAPAS),
+        "# HELP madly_peticion_segundos Duración de las peticiones HTTP por ruta.",
+        "# TYPE madly_peticion_segundos histogram",
+        *_lineas_histograma("madly_peticion_segundos", "ruta", _PETICIONES),
+        "# HELP madly_escenarios_total Escenarios atendidos por origen y resultado.",
+        "# TYPE madly_escenarios_total counter",
+    ]
+    with _LOCK:
+        escenarios = sorted(_ESCENARIOS.items())
+    for (origen, resultado), n in escenarios:
+        lineas.append(f'madly_escenarios_total{{origen="{origen}",resultado="{resultado}"}} {n}')
+
+    for cache, sufijo, descripcion in [
+        (estadisticas_cache(), "escenarios", "de escenarios"),
+        (estadisticas_respuestas(), "respuestas", "de respuestas HTTP (compartida por los workers)"),
+    ]:
+        for clave, tipo, ayuda in [
+            ("aciertos", "counter", "Aciertos de la caché"),
+            ("fallos", "counter", "Fallos de la caché"),
+            ("desalojos", "counter", "Entradas desalojadas de la caché"),
+            ("entradas", "gauge", "Entradas en la caché"),
+            ("capacidad", "gauge", "Capacidad de la caché"),
+            ("tasa_aciertos", "gauge", "Proporción de aciertos de la caché"),
+        ]:
+            nombre = f"madly_cache_{sufijo}_{clave}" + ("_total" if tipo == "counter" else "")
+            lineas += [f"# HELP {nombre} {ayuda} {descripcion}.", f"# TYPE {nombre} {tipo}",
+                       f"{nombre} {_formatear(cache[clave])}"]
+
+    lineas += ["# HELP madly_metricas_activas 1 si se están recogiendo métricas.",
+               "# TYPE madly_metricas_activas gauge",
+               f"madly_metricas_activas {int(_ACTIVAS)}"]
+    return "\n".join(lineas) + "\n"
+
+
+def registrar(server):
+    """
+    Añade GET /metrics al servidor Flask y mide la duración de cada
+    petición, etiquetada con la regla de la ruta (p. ej.
+    /_dash-update-component o /api/v1/riesgo).
+    """
+    from flask import Response, g, request
+
+    @server.before_request
+    def _inicio_peticion():
+        if _ACTIVAS:
+            g.madly_inicio = time.perf_counter()
+
+    @server.after_request
+    def _fin_peticion(respuesta):
+        inicio = g.pop("madly_inicio", None)
+        if inicio is not None:
+            regla = request.url_rule.rule if request.url_rule is not None else "desconocida"
+            _histograma(_PETICIONES, regla).observar(time.perf_counter() - inicio)
+        return respuesta
+
+    @server.route("/metrics")
+    def metrics():
+        return Response(exportar(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,272 @@
+# microlotes.py
+"""
+Cola de microlotes para puntuar escenarios de MADly Safe.
+
+Con workers de gunicorn con varios hilos, cada petición llamaría al
+modelo por su cuenta con un lote diminuto (las seis franjas de un
+escenario), y casi todo el tiempo se iría en el coste fijo de cada
+llamada. La cola junta los escenarios que llegan a la vez y los puntúa
+con una sola llamada a calcular_riesgo_lote:
+
+- un hilo de la cola toma el primer escenario pendiente y espera hasta
+  `ventana_ms` milisegundos, o hasta reunir `max_lote` escenarios, a que
+  lleguen más;
+- con ventana_ms=0 no espera: puntúa lo que haya en la cola y, mientras
+  tanto, los escenarios que llegan se acumulan para el lote siguiente
+  (sin latencia añadida con poca carga);
+- cada llamante recibe un concurrent.futures.Future con su resultado.
+
+Cada escenario se valida y normaliza antes de encolarse (uno mal formado
+recibe su error en el Future sin llegar al lote) y, si aun así falla la
+puntuación de un lote, sus escenarios se repiten uno a uno, de modo que
+solo falla el Future del escenario culpable.
+
+Los escenarios que ya están en la caché de escenarios se responden sin
+pasar por la cola, y los resultados de cada lote se guardan en ella. Si
+el modelo activo tiene tabla precalculada tampoco se encola nada: leer de
+la tabla cuesta microsegundos y la cola solo añadiría espera (ver
+benchmarks/bench_microlotes.py).
+
+calcular_riesgo_microlote(...) es la versión que bloquea (para los
+hilos de gunicorn) y calcular_riesgo_async(...) la de asyncio. La app la
+usa con MADLY_MICROLOTES=1 (ver gunicorn.conf.py para los hilos);
+MADLY_MICROLOTES_VENTANA_MS y MADLY_MICROLOTES_MAX ajustan la cola.
+"""
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from .metricas import etapa
+from .model import (
+    CAMPOS_ESCENARIO,
+    _normalizar_dia_semana,
+    _normalizar_meteo,
+    calcular_riesgo,
+    calcular_riesgo_lote,
+    consultar_cache,
+    version_activa,
+)
+
+ACTIVOS = os.environ.get("MADLY_MICROLOTES", "0") == "1"
+VENTANA_MS = float(os.environ.get("MADLY_MICROLOTES_VENTANA_MS", "0"))
+MAX_LOTE = int(os.environ.get("MADLY_MICROLOTES_MAX", "256"))
+
+
+def _normalizar_escenario(escenario) -> tuple:
+    """
+    Escenario (orden de CAMPOS_ESCENARIO) con el día y la meteorología ya
+    normalizados.
+
+    Raises
+    ------
+    ValueError
+        Si no tiene un valor por campo o algún valor no es texto (o None,
+        para un escenario incompleto).
+    """
+    try:
+        escenario = tuple(escenario)
+    except TypeError:
+        raise ValueError(f"El escenario debe ser una secuencia, no {type(escenario).__name__}.") from None
+    if len(escenario) != len(CAMPOS_ESCENARIO):
+        raise ValueError(f"El escenario debe tener {len(CAMPOS_ESCENARIO)} valores, no {len(escenario)}.")
+    malos = [campo for campo, valor in zip(CAMPOS_ESCENARIO, escenario)
+             if valor is not None and not isinstance(valor, str)]
+    if malos:
+        raise ValueError(f"Valores no válidos para: {', '.join(malos)}.")
+    tipo_persona, tipo_vehiculo, rango_edad, sexo, distrito, dia, franja, meteo = escenario
+    return (tipo_persona, tipo_vehiculo, rango_edad, sexo, distrito,
+            _normalizar_dia_semana(dia), franja, _normalizar_meteo(meteo))
+
+
+def _futuro_resuelto(resultado=None, error: Exception = None) -> Future:
+    futuro = Future()
+    if error is not None:
+        futuro.set_exception(error)
+    else:
+        futuro.set_result(resultado)
+    return futuro
+
+
+class ColaMicrolotes:
+    """
+    Cola que agrupa escenarios y los puntúa por lotes en un hilo propio.
+
+    Parameters
+    ----------
+    ventana_ms : float
+        Espera máxima (milisegundos) desde el primer escenario del lote.
+    max_lote : int
+        Escenarios por lote como máximo.
+    """
+
+    def __init__(self, ventana_ms: float = VENTANA_MS, max_lote: int = MAX_LOTE):
+        if ventana_ms < 0 or max_lote < 1:
+            raise ValueError("La ventana no puede ser negativa y el lote debe admitir al menos 1 escenario.")
+        self.ventana_ms = float(ventana_ms)
+        self.max_lote = int(max_lote)
+        self._cola = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._pid = None
+        self.lotes = 0
+        self.escenarios = 0
+
+    def _arrancar(self):
+        # El hilo se crea en el primer envío de cada proceso (no sobrevive
+        # al fork de los workers de gunicorn)
+        with self._lock:
+            if self._pid == os.getpid() and self._hilo.is_alive():
+                return
+            self._cola = queue.SimpleQueue()
+            self._hilo = threading.Thread(target=self._bucle, name="madly-microlotes", daemon=True)
+            self._pid = os.getpid()
+            self._hilo.start()
+
+    def enviar(self, escenario) -> Future:
+        """
+        Encola un escenario (orden de CAMPOS_ESCENARIO) y devuelve su
+        Future. Si el escenario no es válido, el Future ya trae el
+        ValueError y no se encola.
+        """
+        try:
+            escenario = _normalizar_escenario(escenario)
+        except ValueError as e:
+            return _futuro_resuelto(error=e)
+        if self._pid != os.getpid() or not self._hilo.is_alive():
+            self._arrancar()
+        futuro = Future()
+        self._cola.put((escenario, futuro))
+        return futuro
+
+    def _reunir(self) -> list:
+        lote = [self._cola.get()]
+        if self.ventana_ms == 0:
+            while len(lote) < self.max_lote:
+                try:
+                    lote.append(self._cola.get_nowait())
+                except queue.Empty:
+                    break
+            return lote
+
+        limite = time.monotonic() + self.ventana_ms / 1000
+        while len(lote) < self.max_lote:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                lote.append(self._cola.get(timeout=restante))
+            except queue.Empty:
+                break
+        return lote
+
+    def _bucle(self):
+        while True:
+            # Los Future cancelados por el llamante se descartan
+            lote = [(esc, futuro) for esc, futuro in self._reunir()
+                    if futuro.set_running_or_notify_cancel()]
+            if not lote:
+                continue
+            escenarios = [esc for esc, _ in lote]
+            futuros = [futuro for _, futuro in lote]
+            try:
+                with etapa("microlote"):
+                    resultados = calcular_riesgo_lote(escenarios, guardar_en_cache=True)
+            except Exception as e:
+                if len(lote) == 1:
+                    futuros[0].set_exception(e)
+                else:
+                    self._uno_a_uno(lote)
+                continue
+            for futuro, resultado in zip(futuros, resultados):
+                futuro.set_result(resultado)
+            self.lotes += 1
+            self.escenarios += len(escenarios)
+
+    def _uno_a_uno(self, lote: list):
+        # El lote ha fallado: cada escenario por separado, para que el
+        # error solo llegue al Future del que lo provoca
+        for esc, futuro in lote:
+            try:
+                resultado = calcular_riesgo_lote([esc], guardar_en_cache=True)[0]
+            except Exception as e:
+                futuro.set_exception(e)
+            else:
+                futuro.set_result(resultado)
+                self.lotes += 1
+                self.escenarios += 1
+
+    def estadisticas(self) -> dict:
+        """Lotes puntuados, escenarios y tamaño medio de lote."""
+        return {
+            "lotes": self.lotes,
+            "escenarios": self.escenarios,
+            "tamaño_medio": self.escenarios / self.lotes if self.lotes else 0.0,
+            "ventana_ms": self.ventana_ms,
+            "max_lote": self.max_lote,
+        }
+
+
+# Cola compartida por todos los hilos del proceso
+_COLA = ColaMicrolotes()
+
+
+def configurar_cola(ventana_ms: float = None, max_lote: int = None):
+    """Cambia la ventana y/o el tamaño máximo de lote de la cola compartida."""
+    if ventana_ms is not None:
+        if ventana_ms < 0:
+            raise ValueError("La ventana no puede ser negativa.")
+        _COLA.ventana_ms = float(ventana_ms)
+    if max_lote is not None:
+        if max_lote < 1:
+            raise ValueError("El lote debe admitir al menos 1 escenario.")
+        _COLA.max_lote = int(max_lote)
+
+
+def estadisticas_cola() -> dict:
+    return _COLA.estadisticas()
+
+
+def enviar(tipo_persona, tipo_vehiculo, rango_edad, sexo,
+           distrito, dia, franja, meteo) -> Future:
+    """
+    Future con el resultado de calcular_riesgo para el escenario. Ya está
+    resuelto si el escenario está incompleto, no es válido (con el
+    ValueError) o está en la caché, o si hay tabla precalculada.
+    """
+    try:
+        escenario = _normalizar_escenario(
+            (tipo_persona, tipo_vehiculo, rango_edad, sexo, distrito, dia, franja, meteo)
+        )
+    except ValueError as e:
+        return _futuro_resuelto(error=e)
+    if None in escenario:
+        resultado = (None, None)
+    elif version_activa().tabla() is not None:
+        resultado = calcular_riesgo(*escenario)
+    else:
+        resultado = consultar_cache(*escenario)
+    if resultado is None:
+        return _COLA.enviar(escenario)
+    return _futuro_resuelto(resultado)
+
+
+def calcular_riesgo_microlote(tipo_persona, tipo_vehiculo, rango_edad, sexo,
+                              distrito, dia, franja, meteo):
+    """
+    Como calcular_riesgo, pero puntuando el escenario en la cola de
+    microlotes junto con los de otros hilos. Bloquea hasta tener el
+    resultado.
+    """
+    return enviar(tipo_persona, tipo_vehiculo, rango_edad, sexo,
+                  distrito, dia, franja, meteo).result()
+
+
+async def calcular_riesgo_async(tipo_persona, tipo_vehiculo, rango_edad, sexo,
+                                distrito, dia, franja, meteo):
+    """Versión de calcular_riesgo_microlote para asyncio (no bloquea el bucle)."""
+    return await asyncio.wrap_future(enviar(tipo_persona, tipo_vehiculo, rango_edad, sexo,
+                                            distrito, dia, franja, meteo))
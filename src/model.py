@@ -7,22 +7,66 @@ Funciones relacionadas con el modelo de riesgo de MADly Safe.
     * probabilidad estimada de lesión grave (0–1)
     * lista de 3 franjas alternativas con menor riesgo estimado,
       evaluadas con el propio modelo.
+- Función calcular_riesgo_franjas(...) que puntúa las seis franjas
+  horarias de un escenario en una sola llamada al modelo, o las lee de
+  la tabla precalculada (src/tabla_riesgo.py) si está disponible (la
+  tabla es float32: hasta ~3e-8 de diferencia con predict_proba).
+- Caché de escenarios (src/cache.py) para no repetir el cálculo de los
+  escenarios más frecuentes.
+- Función calcular_riesgo_lote(...) que puntúa muchos escenarios a la vez
+  (lo usan la API JSON de src/api.py y la cola de microlotes de
+  src/microlotes.py).
+- Función planificar_franjas(...) que, para un perfil, puntúa de una vez
+  todas las combinaciones de día × franja × distrito y devuelve las k
+  más seguras (ranking con np.argpartition).
+- Función calcular_intervalo(...) con la media y los percentiles del
+  conjunto bootstrap del modelo (src/bootstrap.py), si se ha generado.
+- Si el modelo es una regresión logística, las predicciones se calculan
+  con los pesos exportados (src/scorer_lineal.py) sin pasar por el
+  pipeline de scikit-learn. Con cualquier otro modelo, las filas se
+  codifican con el codificador compilado (src/codificador.py) y van
+  directas al clasificador, sin DataFrame ni encoders del pipeline.
+- El modelo en uso, su tabla y su scorer forman una VersionModelo que se
+  sustituye entera al recargar (src/recarga.py): cada petición toma la
+  versión activa al empezar y termina con ella aunque se cambie a mitad.
+- joblib, pandas y scikit-learn no se importan con el módulo: el pipeline
+  se lee del fichero solo cuando hace falta (sin tabla ni scorer lineal,
+  o para validar una versión), así que el camino rápido arranca sin ellos.
 
 Las franjas alternativas se devuelven con una etiqueta legible,
 por ejemplo: "18:00–21:59 (Opción A)".
 """
 
+import itertools
+import os
+import threading
 from pathlib import Path
-from typing import Tuple
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple
 
-import joblib
-import pandas as pd
+import numpy as np
+
+from .cache import CacheEscenarios
+from .metricas import etapa
+from .opciones import DIAS_SEMANA, DISTRITOS, valores
+from .registro import nombre_version, ruta_version_activa
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 # Ruta al modelo entrenado que has elegido como final
 MODEL_PATH = Path(__file__).resolve().parents[1] / "models" / "modelo_mejor_2025.joblib"
 
-# Caché en memoria del modelo para no recargarlo en cada predicción
-_MODELO_CACHE = None
+# Versión del modelo en uso (modelo, tabla y scorer), para no recargarlo
+# en cada predicción. Se sustituye de una vez con activar_version().
+_ACTIVA = None
+_LOCK_ACTIVA = threading.Lock()
+
+# Caché de resultados por escenario normalizado. Tamaño y política se
+# pueden ajustar con MADLY_CACHE_ESCENARIOS y MADLY_CACHE_POLITICA.
+_CACHE_ESCENARIOS = CacheEscenarios(
+    capacidad=int(os.environ.get("MADLY_CACHE_ESCENARIOS", "1024")),
+    politica=os.environ.get("MADLY_CACHE_POLITICA", "lru"),
+)
 
 # Lista de franjas horarias que usaremos para evaluar alternativas
 FRANJAS_VALIDAS = [
@@ -34,6 +78,41 @@ FRANJAS_VALIDAS = [
     "Noche",
 ]
 
+# Columnas de entrada del modelo, en orden
+COLUMNAS_MODELO = [
+    "tipo_persona",
+    "tipo_vehiculo",
+    "rango_edad",
+    "sexo",
+    "distrito",
+    "dia_semana",
+    "franja_horaria",
+    "estado_meteorológico",
+]
+
+# Campos de un escenario, en el orden de los argumentos de calcular_riesgo
+CAMPOS_ESCENARIO = [
+    "tipo_persona",
+    "tipo_vehiculo",
+    "rango_edad",
+    "sexo",
+    "distrito",
+    "dia",
+    "franja",
+    "meteo",
+]
+
+# Valores de la app que en los datos (y en el modelo) se escriben de otra
+# forma, por columna del modelo
+ALIAS_VALORES = {
+    "dia_semana": {"Miercoles": "Miércoles"},
+    "estado_meteorológico": {
+        "Lluvia debil": "Lluvia débil",
+        "Lluvia intensa": "LLuvia intensa",  # como aparece en algunos datos
+        "Desconocido": "Se desconoce",
+    },
+}
+
 # Etiquetas legibles para cada franja
 FRANJA_LABELS = {
     "Noche_madrugada": "00:00–05:59",
@@ -45,44 +124,249 @@ FRANJA_LABELS = {
 }
 
 
-def cargar_modelo(path: Path = MODEL_PATH):
+class VersionModelo:
+    """
+    Un modelo cargado y lo que depende de él: la tabla de riesgos
+    precalculada, el scorer lineal, el codificador compilado y el
+    conjunto bootstrap, que se preparan la primera vez que se piden (los
+    ficheros, de la misma carpeta que el fichero de modelo). El propio
+    pipeline también se lee del fichero la primera vez que se pide.
+
+    Parameters
+    ----------
+    version : str
+        Nombre de la versión (ver src/registro.py).
+    ruta : pathlib.Path
+        Fichero de modelo.
+    modelo : sklearn.pipeline.Pipeline, optional
+        Pipeline ya cargado; si no se pasa, se carga de `ruta` al pedirlo.
+    """
+
+    def __init__(self, version: str, ruta: Path, modelo=None):
+        self.version = version
+        self.ruta = Path(ruta)
+        self._modelo = modelo
+        self._lock_modelo = threading.Lock()
+        self._tabla = None
+        self._tabla_cargada = False
+        self._scorer = None
+        self._scorer_cargado = False
+        self._conjunto = None
+        self._conjunto_cargado = False
+        self._intervalos = None
+        self._intervalos_cargados = False
+        self._codificador = None
+        self._codificador_cargado = False
+
+    @property
+    def modelo(self):
+        """
+        Pipeline de scikit-learn. Se lee del fichero la primera vez que se
+        pide; con tabla de riesgos y scorer lineal no hace falta para
+        puntuar, y así no se importa scikit-learn.
+        """
+        if self._modelo is None:
+            with self._lock_modelo:
+                if self._modelo is None:
+                    import joblib
+
+                    # Con mmap_mode los arrays del pipeline se leen del
+                    # fichero sin copiarlos, y sus páginas se comparten
+                    # entre workers de gunicorn
+                    with etapa("cargar_modelo"):
+                        self._modelo = joblib.load(self.ruta, mmap_mode="r")
+        return self._modelo
+
+    def tabla(self):
+        """
+        Tabla de riesgos precalculada, o None si no hay o no corresponde a
+        este modelo; en ese caso calcular_riesgo usa directamente el modelo.
+        """
+        if not self._tabla_cargada:
+            from .tabla_riesgo import TABLA_PATH, cargar_tabla
+
+            with etapa("cargar_tabla"):
+                self._tabla = cargar_tabla(self.ruta, self.ruta.parent / TABLA_PATH.name)
+            self._tabla_cargada = True
+        return self._tabla
+
+    def scorer(self):
+        """
+        Scorer lineal del modelo, o None si no es una regresión logística.
+
+        Se leen los pesos exportados junto al modelo si le corresponden; si
+        no, se extraen del propio pipeline.
+        """
+        if not self._scorer_cargado:
+            from .scorer_lineal import PESOS_PATH, cargar_pesos, exportar_pesos
+
+            with etapa("cargar_scorer"):
+                scorer = cargar_pesos(self.ruta, self.ruta.parent / PESOS_PATH.name)
+                if scorer is None:
+                    scorer = exportar_pesos(self.modelo)
+            # Solo se usa si espera las columnas en el mismo orden que el pipeline
+            self._scorer = scorer if scorer is not None and scorer.columnas == COLUMNAS_MODELO else None
+            self._scorer_cargado = True
+        return self._scorer
+
+    def codificador(self):
+        """
+        Codificador compilado de las categorías del pipeline, o None si su
+        preprocesado no tiene una forma conocida (ver src/codificador.py).
+        """
+        if not self._codificador_cargado:
+            from .codificador import compilar_codificador
+
+            with etapa("compilar_codificador"):
+                self._codificador = compilar_codificador(self.modelo)
+            self._codificador_cargado = True
+        return self._codificador
+
+    def conjunto(self):
+        """
+        Conjunto bootstrap del modelo (src/bootstrap.py), o None si no se
+        ha generado para este fichero de modelo.
+        """
+        if not self._conjunto_cargado:
+            from .bootstrap import CONJUNTO_PATH, cargar_conjunto
+
+            with etapa("cargar_conjunto"):
+                conjunto = cargar_conjunto(self.ruta, self.ruta.parent / CONJUNTO_PATH.name)
+            self._conjunto = conjunto if conjunto is not None and conjunto.columnas == COLUMNAS_MODELO else None
+            self._conjunto_cargado = True
+        return self._conjunto
+
+    def intervalos(self):
+        """
+        Tabla de intervalos precalculada del conjunto bootstrap, o None si
+        no hay o no corresponde a este modelo y su conjunto.
+        """
+        if not self._intervalos_cargados:
+            from .bootstrap import CONJUNTO_PATH, INTERVALOS_PATH, cargar_tabla_intervalos
+
+            with etapa("cargar_intervalos"):
+                self._intervalos = cargar_tabla_intervalos(
+                    self.ruta, self.ruta.parent / CONJUNTO_PATH.name,
+                    self.ruta.parent / INTERVALOS_PATH.name,
+                )
+            self._intervalos_cargados = True
+        return self._intervalos
+
+
+def abrir_version(path: Path, version: str = None) -> VersionModelo:
+    """
+    Abre un fichero de modelo como VersionModelo, sin activarlo. El
+    pipeline no se lee hasta que se usa (ver VersionModelo.modelo).
+    """
+    path = Path(path).resolve()
+    if not path.exists():
+        raise FileNotFoundError(
+            "No se ha encontrado el fichero de modelo en: "
+            f"{path}. Asegúrate de haber guardado el modelo final "
+            "como 'models/modelo_mejor_2025.joblib'."
+        )
+    return VersionModelo(version or nombre_version(path), path)
+
+
+def activar_version(nueva: VersionModelo) -> Optional[VersionModelo]:
+    """
+    Sustituye la versión activa por `nueva` y vacía la caché de escenarios.
+
+    Las peticiones en curso terminan con la versión que tomaron al empezar
+    (y las claves de la caché llevan la versión, así que no se mezclan).
+
+    Returns
+    -------
+    anterior : VersionModelo or None
+    """
+    global _ACTIVA
+
+    with _LOCK_ACTIVA:
+        anterior, _ACTIVA = _ACTIVA, nueva
+    _CACHE_ESCENARIOS.limpiar()
+    return anterior
+
+
+def version_activa() -> VersionModelo:
+    """
+    Versión del modelo en uso. La primera vez se carga la versión activa
+    del registro (src/registro.py) o, si no hay registro, MODEL_PATH.
+    """
+    global _ACTIVA
+
+    activa = _ACTIVA
+    if activa is None:
+        with _LOCK_ACTIVA:
+            if _ACTIVA is None:
+                _ACTIVA = abrir_version(ruta_version_activa() or MODEL_PATH)
+            activa = _ACTIVA
+    return activa
+
+
+def version_cargada() -> Optional[VersionModelo]:
+    """Versión en uso, o None si todavía no se ha cargado ninguna."""
+    return _ACTIVA
+
+
+def cargar_modelo(path: Path = None):
     """
     Carga el modelo entrenado desde disco (solo la primera vez).
+
+    Sin argumentos devuelve el modelo en uso. Si se pide un fichero distinto
+    al activo, se carga y se activa en su lugar, con su propia tabla y
+    scorer, y se vacía la caché de escenarios.
     """
-    global _MODELO_CACHE
+    if path is None:
+        return version_activa().modelo
 
-    if _MODELO_CACHE is None:
-        if not path.exists():
-            raise FileNotFoundError(
-                "No se ha encontrado el fichero de modelo en: "
-                f"{path}. Asegúrate de haber guardado el modelo final "
-                "como 'models/modelo_mejor_2025.joblib'."
-            )
-        _MODELO_CACHE = joblib.load(path)
+    path = Path(path).resolve()
+    activa = _ACTIVA
+    if activa is None or activa.ruta != path:
+        activa = abrir_version(path)
+        activar_version(activa)
+    return activa.modelo
+
+
+def cargar_tabla_riesgo():
+    """Tabla de riesgos de la versión activa (ver VersionModelo.tabla)."""
+    return version_activa().tabla()
+
+
+def cargar_scorer_lineal():
+    """Scorer lineal de la versión activa (ver VersionModelo.scorer)."""
+    return version_activa().scorer()
+
+
+def cargar_conjunto_bootstrap():
+    """Conjunto bootstrap de la versión activa (ver VersionModelo.conjunto)."""
+    return version_activa().conjunto()
 
-    return _MODELO_CACHE
+
+def configurar_cache(capacidad: int = None, politica: str = None):
+    """
+    Ajusta la caché de escenarios (capacidad máxima y/o política de
+    desalojo: "lru" o "fifo").
+    """
+    _CACHE_ESCENARIOS.configurar(capacidad, politica)
+
+
+def estadisticas_cache() -> dict:
+    """
+    Devuelve los contadores de la caché de escenarios: aciertos, fallos,
+    desalojos, tasa de aciertos y ocupación.
+    """
+    return _CACHE_ESCENARIOS.estadisticas()
 
 
 # --- Normalización de valores desde la app ---
 
 
 def _normalizar_dia_semana(dia: str) -> str:
-    if dia == "Miercoles":
-        return "Miércoles"
-    return dia
+    return ALIAS_VALORES["dia_semana"].get(dia, dia)
 
 
 def _normalizar_meteo(meteo: str) -> str:
-    if meteo is None:
-        return meteo
-
-    if meteo == "Lluvia debil":
-        return "Lluvia débil"
-    if meteo == "Lluvia intensa":
-        return "LLuvia intensa"  # como aparece en algunos datos
-    if meteo == "Desconocido":
-        return "Se desconoce"
-    return meteo
+    return ALIAS_VALORES["estado_meteorológico"].get(meteo, meteo)
 
 
 def _df_para_escenario(tipo_persona: str,
@@ -92,10 +376,12 @@ def _df_para_escenario(tipo_persona: str,
                        distrito: str,
                        dia_norm: str,
                        franja: str,
-                       meteo_norm: str) -> pd.DataFrame:
+                       meteo_norm: str) -> "pd.DataFrame":
     """
     Construye un DataFrame de una fila con el formato que espera el modelo.
     """
+    import pandas as pd
+
     return pd.DataFrame(
         [
             {
@@ -112,6 +398,36 @@ def _df_para_escenario(tipo_persona: str,
     )
 
 
+def _puntuar_filas(filas: List[tuple], activa: VersionModelo):
+    """
+    Probabilidad de lesión grave para cada fila (valores en el orden de
+    COLUMNAS_MODELO), en una única llamada.
+
+    Con un modelo lineal se usa el scorer de NumPy. Con cualquier otro,
+    el codificador compilado pasa las filas a la matriz que espera el
+    clasificador del pipeline; solo si no hay codificador se construye un
+    DataFrame y se llama a predict_proba del pipeline completo.
+    """
+    scorer = activa.scorer()
+    if scorer is not None:
+        with etapa("scorer_lineal"):
+            return scorer.puntuar(filas)
+
+    codificador = activa.codificador()
+    if codificador is not None:
+        with etapa("codificar"):
+            X = codificador.transformar(filas)
+        with etapa("predict_proba"):
+            return activa.modelo.named_steps["clf"].predict_proba(X)[:, 1]
+
+    import pandas as pd
+
+    with etapa("dataframe"):
+        X = pd.DataFrame(filas, columns=COLUMNAS_MODELO)
+    with etapa("predict_proba"):
+        return activa.modelo.predict_proba(X)[:, 1]
+
+
 # --- Dummy antiguo (por si necesitas pruebas rápidas) ---
 
 
@@ -137,39 +453,65 @@ def calcular_riesgo_dummy(tipo_persona, tipo_vehiculo, rango_edad, sexo,
 # --- Versión REAL: usa el modelo entrenado ---
 
 
-def calcular_riesgo(tipo_persona, tipo_vehiculo, rango_edad, sexo,
-                    distrito, dia, franja, meteo) -> Tuple[float, list]:
+def calcular_riesgo_franjas(tipo_persona, tipo_vehiculo, rango_edad, sexo,
+                            distrito, dia, meteo,
+                            franjas: Sequence[str] = FRANJAS_VALIDAS,
+                            activa: VersionModelo = None) -> List[Tuple[str, float]]:
     """
-    Calcula el riesgo de lesión grave usando el modelo entrenado y
-    genera hasta tres franjas alternativas más seguras.
+    Calcula el riesgo de lesión grave para cada franja horaria con el resto
+    del escenario fijo.
+
+    Si el escenario está en la tabla precalculada, los riesgos se leen de
+    ahí sin pasar por el modelo. Si no (valores que no ofrece la app),
+    todas las franjas se evalúan en un único lote (ver _puntuar_filas),
+    de modo que el coste del preprocesado se paga una vez por petición y
+    no una vez por franja. Con `activa` se usa esa versión del modelo en
+    lugar de la activa.
+
+    Returns
+    -------
+    riesgos : list of (str, float)
+        Pares (código_franja, probabilidad) en el mismo orden que `franjas`.
+        None si falta algún campo del escenario.
     """
     if None in [tipo_persona, tipo_vehiculo, rango_edad, sexo,
-                distrito, dia, franja, meteo]:
-        return None, None
+                distrito, dia, meteo]:
+        return None
 
+    activa = activa or version_activa()
     dia_norm = _normalizar_dia_semana(dia)
     meteo_norm = _normalizar_meteo(meteo)
 
-    modelo = cargar_modelo()
+    tabla = activa.tabla()
+    if tabla is not None:
+        with etapa("tabla"):
+            riesgos = tabla.riesgos_franjas(
+                tipo_persona, tipo_vehiculo, rango_edad, sexo,
+                distrito, dia_norm, meteo_norm, franjas
+            )
+        if riesgos is not None:
+            return riesgos
 
-    # Riesgo franja actual
-    df_actual = _df_para_escenario(
-        tipo_persona, tipo_vehiculo, rango_edad, sexo,
-        distrito, dia_norm, franja, meteo_norm
-    )
-    proba_actual = modelo.predict_proba(df_actual)[0, 1]
-    riesgo_principal = float(proba_actual)
-
-    # Riesgo para todas las franjas
-    riesgos_franjas = []
-    for fr_opt in FRANJAS_VALIDAS:
-        df_opt = _df_para_escenario(
-            tipo_persona, tipo_vehiculo, rango_edad, sexo,
-            distrito, dia_norm, fr_opt, meteo_norm
-        )
-        proba_opt = modelo.predict_proba(df_opt)[0, 1]
-        riesgos_franjas.append((fr_opt, float(proba_opt)))
+    filas = [
+        (tipo_persona, tipo_vehiculo, rango_edad, sexo, distrito, dia_norm, fr, meteo_norm)
+        for fr in franjas
+    ]
+    probas = _puntuar_filas(filas, activa)
+
+    return [(fr, float(p)) for fr, p in zip(franjas, probas)]
+
+
+def _nombre_opcion(idx: int) -> str:
+    return f"Opción {chr(ord('A') + idx)}"
 
+
+def _seleccionar_alternativas(riesgo_principal: float,
+                              riesgos_franjas: List[Tuple[str, float]],
+                              franja: str) -> list:
+    """
+    Elige hasta tres franjas alternativas a partir de los riesgos de todas
+    las franjas, priorizando las que mejoran el riesgo de la franja actual.
+    """
     # Filtramos la franja actual
     candidatos = [item for item in riesgos_franjas if item[0] != franja]
     candidatos_ordenados = sorted(candidatos, key=lambda x: x[1])  # menor riesgo primero
@@ -178,13 +520,328 @@ def calcular_riesgo(tipo_persona, tipo_vehiculo, rango_edad, sexo,
     menores = [c for c in candidatos_ordenados if c[1] < riesgo_principal]
     fusion = menores + [c for c in candidatos_ordenados if c not in menores]
 
-    def _nombre_opcion(idx: int) -> str:
-        return f"Opción {chr(ord('A') + idx)}"
-
     alternativas = []
     for idx, (fr_code, proba_alt) in enumerate(fusion[:3]):
         fr_label = FRANJA_LABELS.get(fr_code, fr_code)
         display = f"{fr_label} ({_nombre_opcion(idx)})"
         alternativas.append((display, float(proba_alt)))
 
+    return alternativas
+
+
+def _franjas_a_evaluar(franja: str) -> list:
+    # Si la franja no es una de las estándar, se añade como fila extra del lote
+    return FRANJAS_VALIDAS if franja in FRANJAS_VALIDAS else FRANJAS_VALIDAS + [franja]
+
+
+def _clave_cache(activa: VersionModelo, normalizado: tuple) -> tuple:
+    return (activa.version,) + normalizado
+
+
+def consultar_cache(tipo_persona, tipo_vehiculo, rango_edad, sexo,
+                    distrito, dia, franja, meteo):
+    """
+    Resultado de calcular_riesgo para el escenario si está en la caché de
+    escenarios (con la versión activa), o None si no está.
+    """
+    clave = _clave_cache(version_activa(), (tipo_persona, tipo_vehiculo, rango_edad, sexo, distrito,
+                                            _normalizar_dia_semana(dia), franja, _normalizar_meteo(meteo)))
+    en_cache = _CACHE_ESCENARIOS.obtener(clave)
+    if en_cache is None:
+        return None
+    riesgo_principal, alternativas = en_cache
+    return riesgo_principal, list(alternativas)
+
+
+def calcular_riesgo(tipo_persona, tipo_vehiculo, rango_edad, sexo,
+                    distrito, dia, franja, meteo, con_intervalo: bool = False) -> Tuple[float, list]:
+    """
+    Calcula el riesgo de lesión grave usando el modelo entrenado y
+    genera hasta tres franjas alternativas más seguras.
+
+    La franja seleccionada se puntúa en el mismo lote que el resto de
+    franjas (ver calcular_riesgo_franjas), así que no se evalúa dos veces.
+    Los resultados se guardan en la caché de escenarios, con la versión
+    del modelo y el escenario ya normalizado como clave.
+
+    Con con_intervalo=True se devuelve además, como tercer elemento, el
+    resultado de calcular_intervalo para el escenario.
+    """
+    with etapa("calcular_riesgo"):
+        resultado = _calcular_riesgo(tipo_persona, tipo_vehiculo, rango_edad, sexo,
+                                     distrito, dia, franja, meteo)
+    if not con_intervalo:
+        return resultado
+    return resultado + (calcular_intervalo(tipo_persona, tipo_vehiculo, rango_edad, sexo,
+                                           distrito, dia, franja, meteo),)
+
+
+def _calcular_riesgo(tipo_persona, tipo_vehiculo, rango_edad, sexo,
+                     distrito, dia, franja, meteo) -> Tuple[float, list]:
+    if None in [tipo_persona, tipo_vehiculo, rango_edad, sexo,
+                distrito, dia, franja, meteo]:
+        return None, None
+
+    activa = version_activa()
+    clave = _clave_cache(activa, (tipo_persona, tipo_vehiculo, rango_edad, sexo, distrito,
+                                  _normalizar_dia_semana(dia), franja, _normalizar_meteo(meteo)))
+    en_cache = _CACHE_ESCENARIOS.obtener(clave)
+    if en_cache is not None:
+        riesgo_principal, alternativas = en_cache
+        return riesgo_principal, list(alternativas)
+
+    franjas = _franjas_a_evaluar(franja)
+
+    riesgos_franjas = calcular_riesgo_franjas(
+        tipo_persona, tipo_vehiculo, rango_edad, sexo,
+        distrito, dia, meteo, franjas=franjas, activa=activa
+    )
+    riesgo_principal = dict(riesgos_franjas)[franja]
+
+    with etapa("alternativas"):
+        alternativas = _seleccionar_alternativas(riesgo_principal, riesgos_franjas, franja)
+
+    _CACHE_ESCENARIOS.guardar(clave, (riesgo_principal, tuple(alternativas)))
+
     return riesgo_principal, alternativas
+
+
+def calcular_intervalo(tipo_persona, tipo_vehiculo, rango_edad, sexo,
+                       distrito, dia, franja, meteo,
+                       activa: VersionModelo = None) -> Optional[Tuple[float, float, float]]:
+    """
+    Intervalo de la probabilidad de lesión grave según el conjunto
+    bootstrap del modelo. Se lee de la tabla de intervalos precalculada
+    si la hay; si no, los n miembros se evalúan con una sola
+    multiplicación de matrices (ver src/bootstrap.py).
+
+    Returns
+    -------
+    intervalo : (float, float, float)
+        Media de los miembros y percentiles inferior y superior
+        (bootstrap.PERCENTILES, el intervalo central del 90 %). None si
+        falta algún campo o la versión no tiene conjunto bootstrap.
+    """
+    if None in [tipo_persona, tipo_vehiculo, rango_edad, sexo,
+                distrito, dia, franja, meteo]:
+        return None
+
+    activa = activa or version_activa()
+    dia_norm, meteo_norm = _normalizar_dia_semana(dia), _normalizar_meteo(meteo)
+    # La tabla solo se carga si corresponde al conjunto guardado
+    tabla = activa.intervalos()
+    if tabla is not None:
+        with etapa("tabla_intervalos"):
+            celda = tabla.celda(tipo_persona, tipo_vehiculo, rango_edad, sexo,
+                                distrito, dia_norm, meteo_norm, franja)
+        if celda is not None:
+            return tuple(celda.tolist())
+
+    conjunto = activa.conjunto()
+    if conjunto is None:
+        return None
+
+    normalizado = (tipo_persona, tipo_vehiculo, rango_edad, sexo, distrito,
+                   dia_norm, franja, meteo_norm)
+    # Mismo escenario que en calcular_riesgo, en otra entrada de la caché
+    clave = _clave_cache(activa, ("intervalo",) + normalizado)
+    intervalo = _CACHE_ESCENARIOS.obtener(clave)
+    if intervalo is None:
+        with etapa("bootstrap"):
+            media, (inferior, superior) = conjunto.intervalos([normalizado])
+        intervalo = (float(media[0]), float(inferior[0]), float(superior[0]))
+        _CACHE_ESCENARIOS.guardar(clave, intervalo)
+    return intervalo
+
+
+def calcular_riesgo_lote(escenarios: Sequence[Sequence],
+                         activa: VersionModelo = None,
+                         guardar_en_cache: bool = False) -> List[Tuple[float, list]]:
+    """
+    Calcula riesgo principal y alternativas para muchos escenarios a la vez.
+
+    Los escenarios que están en la tabla precalculada se leen de ahí; el
+    resto se puntúan juntos (todas sus franjas) en una única llamada al
+    modelo.
+
+    Parameters
+    ----------
+    escenarios : list of tuple
+        Cada escenario con los valores en el orden de CAMPOS_ESCENARIO
+        (los mismos argumentos que calcular_riesgo).
+    activa : VersionModelo, optional
+        Versión del modelo con la que puntuar (por defecto, la activa).
+    guardar_en_cache : bool
+        Si True, los resultados se guardan en la caché de escenarios, como
+        hace calcular_riesgo.
+
+    Returns
+    -------
+    resultados : list of (float, list)
+        (riesgo_principal, alternativas) por escenario, en el mismo orden.
+        (None, None) para escenarios incompletos.
+    """
+    with etapa("calcular_riesgo_lote"):
+        return _calcular_riesgo_lote(escenarios, activa or version_activa(), guardar_en_cache)
+
+
+def _calcular_riesgo_lote(escenarios: Sequence[Sequence], activa: VersionModelo,
+                          guardar_en_cache: bool = False) -> List[Tuple[float, list]]:
+    normalizados = []
+    for tipo_persona, tipo_vehiculo, rango_edad, sexo, distrito, dia, franja, meteo in escenarios:
+        normalizados.append((tipo_persona, tipo_vehiculo, rango_edad, sexo, distrito,
+                             _normalizar_dia_semana(dia), franja, _normalizar_meteo(meteo)))
+
+    riesgos = [None] * len(normalizados)
+    pendientes = []
+
+    tabla = activa.tabla()
+    for i, esc in enumerate(normalizados):
+        if None in esc:
+            continue
+        if tabla is not None:
+            riesgos[i] = tabla.riesgos_franjas(*esc[:6], esc[7], _franjas_a_evaluar(esc[6]))
+        if riesgos[i] is None:
+            pendientes.append(i)
+
+    if pendientes:
+        filas = []
+        for i in pendientes:
+            esc = normalizados[i]
+            filas.extend(esc[:6] + (fr, esc[7]) for fr in _franjas_a_evaluar(esc[6]))
+        probas = _puntuar_filas(filas, activa)
+
+        inicio = 0
+        for i in pendientes:
+            franjas = _franjas_a_evaluar(normalizados[i][6])
+            fin = inicio + len(franjas)
+            riesgos[i] = [(fr, float(p)) for fr, p in zip(franjas, probas[inicio:fin])]
+            inicio = fin
+
+    resultados = []
+    for esc, riesgos_franjas in zip(normalizados, riesgos):
+        if riesgos_franjas is None:
+            resultados.append((None, None))
+            continue
+        franja = esc[6]
+        riesgo_principal = dict(riesgos_franjas)[franja]
+        alternativas = _seleccionar_alternativas(riesgo_principal, riesgos_franjas, franja)
+        resultados.append((riesgo_principal, alternativas))
+        if guardar_en_cache:
+            _CACHE_ESCENARIOS.guardar(_clave_cache(activa, esc), (riesgo_principal, tuple(alternativas)))
+
+    return resultados
+
+
+# --- Planificador: combinaciones más seguras de día, franja y distrito ---
+
+
+def riesgos_rejilla(tipo_persona, tipo_vehiculo, rango_edad, sexo, meteo,
+                    distritos: Sequence[str] = None,
+                    dias: Sequence[str] = None,
+                    franjas: Sequence[str] = FRANJAS_VALIDAS,
+                    activa: VersionModelo = None) -> Optional[np.ndarray]:
+    """
+    Riesgo de lesión grave de un perfil para cada combinación de día,
+    franja y distrito, con la meteorología fija.
+
+    Con tabla precalculada es un único indexado del array; si no, todas
+    las combinaciones se puntúan en una sola llamada (ver _puntuar_filas).
+
+    Returns
+    -------
+    riesgos : numpy.ndarray
+        Array (día, franja, distrito) en el orden de `dias`, `franjas` y
+        `distritos` (por defecto, todos los de la app). None si falta
+        algún campo del perfil.
+    """
+    if None in [tipo_persona, tipo_vehiculo, rango_edad, sexo, meteo]:
+        return None
+
+    activa = activa or version_activa()
+    distritos = list(distritos) if distritos is not None else valores(DISTRITOS)
+    dias_norm = [_normalizar_dia_semana(d) for d in
+                 (dias if dias is not None else valores(DIAS_SEMANA))]
+    meteo_norm = _normalizar_meteo(meteo)
+
+    tabla = activa.tabla()
+    if tabla is not None:
+        with etapa("tabla"):
+            riesgos = tabla.subrejilla(tipo_persona, tipo_vehiculo, rango_edad, sexo,
+                                       meteo_norm, distritos, dias_norm, franjas)
+        if riesgos is not None:
+            return riesgos
+
+    perfil = (tipo_persona, tipo_vehiculo, rango_edad, sexo)
+    filas = [
+        perfil + (distrito, dia, fr, meteo_norm)
+        for dia, fr, distrito in itertools.product(dias_norm, franjas, distritos)
+    ]
+    probas = _puntuar_filas(filas, activa)
+    return np.asarray(probas, dtype=np.float64).reshape(len(dias_norm), len(franjas), len(distritos))
+
+
+def planificar_franjas(tipo_persona, tipo_vehiculo, rango_edad, sexo, meteo,
+                       distritos: Sequence[str] = None,
+                       dias: Sequence[str] = None,
+                       franjas: Sequence[str] = FRANJAS_VALIDAS,
+                       k: int = 5,
+                       activa: VersionModelo = None) -> Optional[List[Tuple[str, str, str, float]]]:
+    """
+    Las k combinaciones de día × franja × distrito con menor riesgo para
+    un perfil (por defecto, entre las 7 × 6 × 7 de la app).
+
+    Los riesgos salen de riesgos_rejilla(...) y solo se ordenan los k
+    mejores: np.argpartition los separa en O(n) y después se ordenan
+    entre sí.
+
+    Parameters
+    ----------
+    distritos, dias : list of str, optional
+        Valores a considerar, como en los desplegables de la app (por
+        defecto, todos).
+    k : int
+        Número de combinaciones a devolver (como mucho, todas).
+
+    Raises
+    ------
+    ValueError
+        Si k es menor que 1 o no hay ningún día, franja o distrito.
+
+    Returns
+    -------
+    mejores : list of (str, str, str, float)
+        (dia, franja, distrito, probabilidad) de menor a mayor riesgo, con
+        `dia` tal como se ha recibido. None si falta algún campo del perfil.
+    """
+    if k < 1:
+        raise ValueError(f"k debe ser al menos 1 (recibido: {k}).")
+    dias = list(dias) if dias is not None else valores(DIAS_SEMANA)
+    distritos = list(distritos) if distritos is not None else valores(DISTRITOS)
+    franjas = list(franjas)
+    vacios = [nombre for nombre, lista in (("días", dias), ("franjas", franjas), ("distritos", distritos))
+              if not lista]
+    if vacios:
+        raise ValueError(f"Hace falta al menos un valor en: {', '.join(vacios)}.")
+
+    with etapa("planificar"):
+        riesgos = riesgos_rejilla(tipo_persona, tipo_vehiculo, rango_edad, sexo, meteo,
+                                  distritos, dias, franjas, activa=activa)
+        if riesgos is None:
+            return None
+
+        plano = riesgos.ravel()
+        k = min(k, plano.size)
+        # Riesgo del k-ésimo mejor; los empatados con él entran en el orden
+        # de la rejilla, para que el resultado no dependa de argpartition
+        umbral = plano[np.argpartition(plano, k - 1)[k - 1]]
+        menores = np.flatnonzero(plano < umbral)
+        candidatos = np.concatenate([menores, np.flatnonzero(plano == umbral)[:k - len(menores)]])
+        # De menor a mayor riesgo; a igual riesgo, en el orden de la rejilla
+        candidatos = candidatos[np.lexsort((candidatos, plano[candidatos]))]
+        i_dia, i_franja, i_distrito = np.unravel_index(candidatos, riesgos.shape)
+
+        return [
+            (dias[d], franjas[f], distritos[di], float(plano[i]))
+            for i, d, f, di in zip(candidatos, i_dia, i_franja, i_distrito)
+        ]
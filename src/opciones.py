@@ -0,0 +1,95 @@
+# opciones.py
+"""
+Opciones de los controles del formulario de MADly Safe.
+
+Se definen aquí (y no en app.py) para que otras partes del proyecto
+(por ejemplo, la tabla de riesgos precalculada) puedan usar los mismos
+valores sin importar la aplicación Dash.
+"""
+
+TIPOS_PERSONA = [
+    {"label": "Conductor", "value": "Conductor"},
+    {"label": "Pasajero", "value": "Pasajero"},
+    {"label": "Peatón", "value": "Peatón"},
+]
+
+TIPOS_VEHICULO = [
+    {"label": "Turismo", "value": "Turismo"},
+    {"label": "Motocicleta", "value": "Motocicleta"},
+    {"label": "Furgoneta", "value": "Furgoneta"},
+    {"label": "Bicicleta", "value": "Bicicleta"},
+    {"label": "VMP / Patinete", "value": "VMP"},
+    {"label": "Sin vehículo (peatón)", "value": "Sin_vehiculo"},
+]
+
+RANGOS_EDAD = [
+    {"label": "Menor de 18 años", "value": "<18"},
+    {"label": "18–24 años", "value": "18-24"},
+    {"label": "25–34 años", "value": "25-34"},
+    {"label": "35–44 años", "value": "35-44"},
+    {"label": "45–54 años", "value": "45-54"},
+    {"label": "55–64 años", "value": "55-64"},
+    {"label": "65–74 años", "value": "65-74"},
+    {"label": "75+ años", "value": "75+"},
+]
+
+SEXO_OPCIONES = [
+    {"label": "Hombre", "value": "Hombre"},
+    {"label": "Mujer", "value": "Mujer"},
+    {"label": "Desconocido / Otro", "value": "Desconocido"},
+]
+
+DISTRITOS = [
+    {"label": "Centro", "value": "CENTRO"},
+    {"label": "Arganzuela", "value": "ARGANZUELA"},
+    {"label": "Retiro", "value": "RETIRO"},
+    {"label": "Salamanca", "value": "SALAMANCA"},
+    {"label": "Chamartín", "value": "CHAMARTIN"},
+    {"label": "Tetuán", "value": "TETUAN"},
+    {"label": "Chamberí", "value": "CHAMBERI"},
+]
+
+DIAS_SEMANA = [
+    {"label": "Lunes", "value": "Lunes"},
+    {"label": "Martes", "value": "Martes"},
+    {"label": "Miércoles", "value": "Miércoles"},
+    {"label": "Jueves", "value": "Jueves"},
+    {"label": "Viernes", "value": "Viernes"},
+    {"label": "Sábado", "value": "Sábado"},
+    {"label": "Domingo", "value": "Domingo"},
+]
+
+METEOROLOGIA = [
+    {"label": "Despejado", "value": "Despejado"},
+    {"label": "Nublado", "value": "Nublado"},
+    {"label": "Lluvia débil", "value": "Lluvia debil"},
+    {"label": "Lluvia intensa", "value": "Lluvia intensa"},
+    {"label": "Se desconoce", "value": "Desconocido"},
+]
+
+FRANJAS_HORARIAS = [
+    {"label": "00:00 – 05:59", "value": "Noche_madrugada"},
+    {"label": "06:00 – 09:59", "value": "Manana_punta"},
+    {"label": "10:00 – 13:59", "value": "Manana_media"},
+    {"label": "14:00 – 17:59", "value": "Tarde"},
+    {"label": "18:00 – 21:59", "value": "Tarde_punta"},
+    {"label": "22:00 – 23:59", "value": "Noche"},
+]
+
+
+# Valores iniciales del formulario (claves como CAMPOS_ESCENARIO en model.py)
+ESCENARIO_POR_DEFECTO = {
+    "tipo_persona": "Conductor",
+    "tipo_vehiculo": "Turismo",
+    "rango_edad": "25-34",
+    "sexo": "Hombre",
+    "distrito": "CENTRO",
+    "dia": "Lunes",
+    "franja": "Tarde_punta",
+    "meteo": "Despejado",
+}
+
+
+def valores(opciones) -> list:
+    """Devuelve solo los 'value' de una lista de opciones de Dropdown."""
+    return [opt["value"] for opt in opciones]
@@ -0,0 +1,225 @@
+# precarga.py
+"""
+Precarga y calentamiento del modelo de MADly Safe.
+
+Con gunicorn en modo preload_app (ver gunicorn.conf.py), la app se importa
+en el proceso maestro y precalentar() se ejecuta ahí antes de crear los
+workers. Así:
+
+- el modelo se abre con joblib.load(mmap_mode="r") y la tabla de riesgos
+  con np.load(mmap_mode="r"), de modo que sus arrays quedan en páginas
+  del fichero compartidas entre todos los workers,
+- el scorer lineal, los imports perezosos y la caché del escenario por
+  defecto ya están listos en cada worker tras el fork (copy-on-write),
+- la primera petición de cada worker no paga la carga del modelo,
+- el cubo de agregados del mapa (src/agregados.py) también se lee una
+  sola vez, en el maestro.
+
+Si el modelo tiene tabla de riesgos y scorer lineal, el pipeline de
+scikit-learn no llega a leerse (ver VersionModelo.modelo).
+
+precalentar_en_fondo() hace lo mismo en un hilo, para que el proceso
+atienda peticiones (la página de la app) mientras carga: es el modo de
+arranque rápido de gunicorn.conf.py (MADLY_CARGA_FONDO=1).
+
+estado_precarga() indica si el proceso está "caliente" y con qué versión
+del modelo; lo usa el endpoint de disponibilidad /api/v1/listo.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+from .model import (
+    calcular_riesgo,
+    calcular_riesgo_lote,
+    cargar_conjunto_bootstrap,
+    cargar_scorer_lineal,
+    cargar_tabla_riesgo,
+    version_activa,
+    version_cargada,
+)
+from .opciones import (
+    TIPOS_PERSONA,
+    TIPOS_VEHICULO,
+    RANGOS_EDAD,
+    SEXO_OPCIONES,
+    DISTRITOS,
+    DIAS_SEMANA,
+    METEOROLOGIA,
+    FRANJAS_HORARIAS,
+    ESCENARIO_POR_DEFECTO,
+    valores,
+)
+
+# Opciones del formulario en el orden de CAMPOS_ESCENARIO
+_OPCIONES_ESCENARIO = [
+    valores(opciones)
+    for opciones in [TIPOS_PERSONA, TIPOS_VEHICULO, RANGOS_EDAD, SEXO_OPCIONES,
+                     DISTRITOS, DIAS_SEMANA, FRANJAS_HORARIAS, METEOROLOGIA]
+]
+
+# Estado de la precarga en este proceso (se hereda en los workers)
+_ESTADO = {
+    "listo": False,
+    "pid_precarga": None,
+    "segundos": None,
+    "tabla": False,
+    "scorer_lineal": False,
+    "conjunto_bootstrap": False,
+    "cubo": False,
+    "error": None,
+}
+_LOCK = threading.Lock()
+
+# Hilo de precalentar_en_fondo (None si no se ha lanzado o ha fallado)
+_HILO = None
+_LOCK_HILO = threading.Lock()
+
+# Se marca cuando precalentar() ha terminado de importar pandas (ver
+# esperar_importaciones)
+_IMPORTADOS = threading.Event()
+
+log = logging.getLogger(__name__)
+
+
+def escenarios_calentamiento() -> list:
+    """
+    Escenarios para la pasada de calentamiento: el escenario por defecto
+    del formulario y una variante por cada valor de cada campo, de modo que
+    se recorren todos los valores que puede enviar la app.
+    """
+    por_defecto = tuple(ESCENARIO_POR_DEFECTO.values())
+    escenarios = [por_defecto]
+    for j, opciones in enumerate(_OPCIONES_ESCENARIO):
+        for valor in opciones:
+            if valor != por_defecto[j]:
+                escenarios.append(por_defecto[:j] + (valor,) + por_defecto[j + 1:])
+    return escenarios
+
+
+def precalentar() -> dict:
+    """
+    Carga modelo, tabla y scorer y hace una pasada de puntuación (el
+    pipeline de scikit-learn solo si hace falta para puntuar).
+
+    Es idempotente: si el proceso ya está caliente (p. ej. un worker que lo
+    ha heredado del maestro) no repite nada.
+
+    Returns
+    -------
+    estado : dict
+        El mismo contenido que estado_precarga().
+    """
+    with _LOCK:
+        if _ESTADO["listo"]:
+            return estado_precarga()
+
+        inicio = time.perf_counter()
+        _importar_modulos()
+        version_activa()
+        tabla = cargar_tabla_riesgo()
+        scorer = cargar_scorer_lineal()
+        conjunto = cargar_conjunto_bootstrap()
+        # Sin scorer lineal, el modelo se puntúa con el codificador compilado
+        if scorer is None:
+            version_activa().codificador()
+
+        # Recorre la tabla para que sus páginas estén en la caché del sistema
+        if tabla is not None:
+            float(np.sum(tabla.valores, dtype=np.float64))
+
+        escenarios = escenarios_calentamiento()
+        calcular_riesgo_lote(escenarios)
+        # El escenario por defecto queda además en la caché de escenarios
+        calcular_riesgo(*escenarios[0])
+
+        # src/agregados.py importa src/etl.py: fuera del arranque de la app
+        from .agregados import cargar_cubo
+
+        cubo = cargar_cubo()
+
+        _ESTADO.update(
+            listo=True,
+            pid_precarga=os.getpid(),
+            segundos=round(time.perf_counter() - inicio, 4),
+            tabla=tabla is not None,
+            scorer_lineal=scorer is not None,
+            conjunto_bootstrap=conjunto is not None,
+            cubo=cubo is not None,
+            error=None,
+        )
+        return estado_precarga()
+
+
+def _importar_modulos():
+    # pandas no hace falta para puntuar, pero sí para el cubo, la validación
+    # de src/recarga.py o el pipeline completo: se importa aquí, al
+    # calentar, y no en un hilo cualquiera con la app ya atendiendo
+    try:
+        import pandas  # noqa: F401
+    finally:
+        _IMPORTADOS.set()
+
+
+def esperar_importaciones():
+    """
+    Si la precarga en segundo plano está importando pandas, espera a que
+    acabe. La app lo llama antes de cada petición: al serializar cualquier
+    respuesta de Dash, plotly usa pandas si está en sys.modules, y uno a
+    medio importar por otro hilo daría error.
+    """
+    if _HILO is not None and not _IMPORTADOS.is_set():
+        _IMPORTADOS.wait()
+
+
+def _precalentar_en_hilo():
+    global _HILO
+
+    try:
+        estado = precalentar()
+    except Exception as e:
+        # Se podrá reintentar (la app vuelve a lanzarlo con la siguiente página)
+        log.exception("No se ha podido precargar el modelo")
+        with _LOCK_HILO:
+            _ESTADO["error"] = f"{type(e).__name__}: {e}"
+            _HILO = None
+        return
+    log.info("Modelo precargado en segundo plano en %.2f s (pid %s)",
+             estado["segundos"], estado["pid"])
+
+
+def precalentar_en_fondo() -> Optional[threading.Thread]:
+    """
+    Lanza precalentar() en un hilo, si no está ya caliente o en marcha.
+
+    Las peticiones que necesiten el modelo mientras tanto lo esperan (la
+    carga va con los mismos cerrojos); las que no, como la página de la
+    app, se atienden ya.
+
+    Returns
+    -------
+    hilo : threading.Thread or None
+        None si el proceso ya estaba caliente.
+    """
+    global _HILO
+
+    with _LOCK_HILO:
+        if _ESTADO["listo"]:
+            return None
+        if _HILO is None:
+            _HILO = threading.Thread(target=_precalentar_en_hilo,
+                                     name="madly-precarga", daemon=True)
+            _HILO.start()
+        return _HILO
+
+
+def estado_precarga() -> dict:
+    """Estado de la precarga en el proceso actual."""
+    activa = version_cargada()
+    return {**_ESTADO, "pid": os.getpid(),
+            "version_modelo": activa.version if activa is not None else None}
@@ -0,0 +1,240 @@
+# recarga.py
+"""
+Recarga en caliente del modelo de MADly Safe, sin reiniciar los workers.
+
+recargar() carga la versión activa del registro (src/registro.py), o la
+que se indique, fuera del camino de las peticiones:
+
+1. abre el modelo y prepara su tabla de riesgos, su scorer lineal y su
+   conjunto bootstrap (si lo tiene),
+2. lo valida con un lote de humo (los escenarios de calentamiento de
+   src/precarga.py): probabilidades finitas entre 0 y 1, y la tabla y el
+   scorer deben coincidir con predict_proba del propio pipeline,
+3. lo activa de una vez con model.activar_version(), que vacía la caché
+   de escenarios. Las peticiones en curso terminan con la versión
+   anterior; si la validación falla, se sigue con la anterior.
+
+Dos formas de dispararla:
+
+- iniciar_vigilancia(): hilo que cada MADLY_RECARGA_SEGUNDOS (30 por
+  defecto; 0 lo desactiva) mira qué versión marca models/registro/ACTIVA
+  y recarga si ha cambiado. Lo arranca cada worker de gunicorn
+  (gunicorn.conf.py), así que basta con `python -m src.registro activar`.
+  Una versión que no pasa la validación, o un ACTIVA que no se puede
+  resolver, se anota y no se reintenta hasta que cambie.
+- POST /api/v1/admin/recargar (src/api.py), protegido con
+  MADLY_ADMIN_TOKEN: recarga el worker que atiende la petición y, si la
+  versión es válida, la fija como activa; los demás la recogen con la
+  vigilancia.
+"""
+
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from .model import (
+    COLUMNAS_MODELO,
+    FRANJAS_VALIDAS,
+    MODEL_PATH,
+    VersionModelo,
+    _normalizar_dia_semana,
+    _normalizar_meteo,
+    abrir_version,
+    activar_version,
+    calcular_riesgo,
+    version_activa,
+    version_cargada,
+)
+from .opciones import ESCENARIO_POR_DEFECTO
+from .precarga import escenarios_calentamiento
+from .registro import NOMBRE_ACTIVA, REGISTRO_PATH, ruta_version, ruta_version_activa
+
+INTERVALO_VIGILANCIA = float(os.environ.get("MADLY_RECARGA_SEGUNDOS", "30"))
+
+# Diferencia máxima admitida frente a predict_proba (la tabla es float32)
+TOLERANCIA_SCORER = 1e-6
+TOLERANCIA_TABLA = 1e-4
+
+_LOCK = threading.Lock()
+_VIGILANCIA = None
+
+log = logging.getLogger(__name__)
+
+
+def _filas_humo() -> list:
+    """Filas del modelo (orden de COLUMNAS_MODELO) para el lote de humo."""
+    filas = []
+    for tipo_persona, tipo_vehiculo, rango_edad, sexo, distrito, dia, _, meteo in escenarios_calentamiento():
+        base = (tipo_persona, tipo_vehiculo, rango_edad, sexo, distrito, _normalizar_dia_semana(dia))
+        filas.extend(base + (fr, _normalizar_meteo(meteo)) for fr in FRANJAS_VALIDAS)
+    return filas
+
+
+def validar_version(version: VersionModelo) -> dict:
+    """
+    Puntúa el lote de humo con la versión y comprueba sus resultados.
+
+    Raises
+    ------
+    ValueError
+        Si alguna probabilidad no es válida o la tabla o el scorer no
+        coinciden con el pipeline.
+
+    Returns
+    -------
+    resumen : dict
+        Filas puntuadas y diferencias máximas de scorer y tabla.
+    """
+    import pandas as pd
+
+    filas = _filas_humo()
+    try:
+        probas = np.asarray(
+            version.modelo.predict_proba(pd.DataFrame(filas, columns=COLUMNAS_MODELO))[:, 1],
+            dtype=float,
+        )
+    except Exception as e:
+        raise ValueError(f"La versión {version.version!r} no puntúa el lote de humo: {e}") from e
+    if probas.shape != (len(filas),) or not np.all(np.isfinite(probas)) \
+            or probas.min() < 0 or probas.max() > 1:
+        raise ValueError(f"La versión {version.version!r} no devuelve probabilidades válidas.")
+
+    resumen = {"filas": len(filas), "diferencia_scorer": None, "diferencia_tabla": None}
+
+    scorer = version.scorer()
+    if scorer is not None:
+        diferencia = float(np.max(np.abs(scorer.puntuar(filas) - probas)))
+        if diferencia > TOLERANCIA_SCORER:
+            raise ValueError(
+                f"El scorer lineal de {version.version!r} no coincide con el modelo "
+                f"(diferencia {diferencia:.2e})."
+            )
+        resumen["diferencia_scorer"] = diferencia
+
+    tabla = version.tabla()
+    if tabla is not None:
+        n_franjas = len(FRANJAS_VALIDAS)
+        diferencia = 0.0
+        for inicio in range(0, len(filas), n_franjas):
+            fila = filas[inicio]
+            riesgos = tabla.riesgos_franjas(*fila[:6], fila[7], FRANJAS_VALIDAS)
+            if riesgos is None:
+                raise ValueError(f"A la tabla de {version.version!r} le faltan escenarios de la app.")
+            esperados = probas[inicio:inicio + n_franjas]
+            diferencia = max(diferencia, float(np.max(np.abs([r for _, r in riesgos] - esperados))))
+        if diferencia > TOLERANCIA_TABLA:
+            raise ValueError(
+                f"La tabla de riesgos de {version.version!r} no coincide con el modelo "
+                f"(diferencia {diferencia:.2e})."
+            )
+        resumen["diferencia_tabla"] = diferencia
+
+    return resumen
+
+
+def recargar(version: str = None, forzar: bool = False) -> dict:
+    """
+    Carga, valida y activa una versión del modelo.
+
+    Parameters
+    ----------
+    version : str, optional
+        Versión del registro. Por defecto, la activa del registro (o
+        MODEL_PATH si no hay registro).
+    forzar : bool
+        Si False y esa versión ya está en uso, no se hace nada.
+
+    Returns
+    -------
+    resultado : dict
+        version, anterior, recargada (bool), segundos y, si se ha
+        recargado, el resumen de validar_version.
+    """
+    with _LOCK:
+        ruta = ruta_version(version) if version is not None else ruta_version_activa()
+        ruta = (ruta or MODEL_PATH).resolve()
+
+        actual = version_cargada()
+        if not forzar and actual is not None and actual.ruta == ruta:
+            return {"version": actual.version, "anterior": actual.version,
+                    "recargada": False, "segundos": 0.0}
+
+        inicio = time.perf_counter()
+        nueva = abrir_version(ruta)
+        validacion = validar_version(nueva)
+        nueva.conjunto()
+        if nueva.scorer() is None:
+            nueva.codificador()
+        anterior = activar_version(nueva)
+
+        # El escenario por defecto del formulario vuelve a quedar en la caché
+        calcular_riesgo(*ESCENARIO_POR_DEFECTO.values())
+
+        return {
+            "version": nueva.version,
+            "anterior": anterior.version if anterior is not None else None,
+            "recargada": True,
+            "segundos": round(time.perf_counter() - inicio, 4),
+            "validacion": validacion,
+        }
+
+
+def _marca_activa():
+    # Fecha, tamaño y contenido de models/registro/ACTIVA (None si no existe)
+    ruta = REGISTRO_PATH / NOMBRE_ACTIVA
+    try:
+        info = ruta.stat()
+        return info.st_mtime_ns, info.st_size, ruta.read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+
+
+def _vigilar(intervalo: float):
+    rechazada = None
+    while True:
+        time.sleep(intervalo)
+        marca = (NOMBRE_ACTIVA, _marca_activa())
+        if marca == rechazada:
+            continue
+        try:
+            ruta = ruta_version_activa()
+        except Exception:
+            # ACTIVA apunta a una versión que no existe o no se puede leer:
+            # no se reintenta hasta que cambie el fichero
+            log.exception("No se puede resolver la versión activa del registro")
+            rechazada = marca
+            continue
+        if ruta is not None and ruta == rechazada:
+            continue
+        try:
+            resultado = recargar()
+        except Exception:
+            # La versión nueva no es válida: se sigue con la actual y no se
+            # reintenta hasta que el registro marque otra
+            log.exception("No se ha podido recargar el modelo")
+            rechazada = ruta
+            continue
+        if resultado["recargada"]:
+            log.info("Modelo recargado: %s -> %s en %.2f s (pid %s)", resultado["anterior"],
+                     resultado["version"], resultado["segundos"], os.getpid())
+
+
+def iniciar_vigilancia(intervalo: float = None):
+    """
+    Arranca (una vez por proceso) el hilo que recarga el modelo cuando
+    cambia la versión activa del registro. Con intervalo 0 no hace nada.
+    """
+    global _VIGILANCIA
+
+    intervalo = INTERVALO_VIGILANCIA if intervalo is None else intervalo
+    if intervalo <= 0 or (_VIGILANCIA is not None and _VIGILANCIA.is_alive()):
+        return _VIGILANCIA
+
+    version_activa()
+    _VIGILANCIA = threading.Thread(target=_vigilar, args=(intervalo,),
+                                   name="madly-recarga", daemon=True)
+    _VIGILANCIA.start()
+    return _VIGILANCIA
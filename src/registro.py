@@ -0,0 +1,216 @@
+# registro.py
+"""
+Registro de versiones del modelo de MADly Safe.
+
+Cada versión es una carpeta en models/registro/ con el fichero de modelo
+y los artefactos que dependen de él (pesos del scorer lineal y, si se
+pide, la tabla de riesgos), generados al publicarla:
+
+    models/registro/
+        ACTIVA                      <- nombre de la versión en uso
+        20260101-120000/
+            modelo.joblib
+            pesos_lineales_2025.json
+            tabla_riesgo_2025.npy / .json (opcional)
+            conjunto_bootstrap_2025.npy / .json (opcional)
+            tabla_intervalos_2025.npy / .json (opcional, con conjunto y tabla)
+
+Tanto la publicación de una versión como el cambio de ACTIVA son
+atómicos (os.replace), así que un proceso que lea el registro nunca ve
+una versión a medio copiar. Los workers de la app detectan el cambio de
+ACTIVA y cargan la nueva versión sin reiniciarse (ver src/recarga.py).
+
+Si no hay registro, la app usa models/modelo_mejor_2025.joblib.
+
+Uso, desde la raíz del proyecto:
+
+    python -m src.registro publicar models/candidato/modelo_mejor_2025.joblib [--version v2] [--tabla]
+    python -m src.registro activar v2
+    python -m src.registro listar
+"""
+
+import argparse
+import os
+import re
+import shutil
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+REGISTRO_PATH = Path(__file__).resolve().parents[1] / "models" / "registro"
+
+# Nombre del fichero de modelo dentro de cada versión
+NOMBRE_MODELO = "modelo.joblib"
+
+# Fichero con el nombre de la versión activa
+NOMBRE_ACTIVA = "ACTIVA"
+
+_PATRON_VERSION = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]*$")
+
+
+def _validar_nombre(version: str) -> str:
+    if not isinstance(version, str) or not _PATRON_VERSION.match(version):
+        raise ValueError(
+            f"Nombre de versión no válido: {version!r} (letras, números, '.', '_' y '-')."
+        )
+    return version
+
+
+def nombre_version(ruta_modelo: Path) -> str:
+    """
+    Nombre de versión de un fichero de modelo: su carpeta si es un modelo
+    del registro y, si no, el nombre del fichero sin extensión.
+    """
+    ruta_modelo = Path(ruta_modelo)
+    if ruta_modelo.name == NOMBRE_MODELO:
+        return ruta_modelo.parent.name
+    return ruta_modelo.stem
+
+
+def ruta_version(version: str, registro: Path = REGISTRO_PATH) -> Path:
+    """Ruta del fichero de modelo de una versión publicada."""
+    ruta = Path(registro) / _validar_nombre(version) / NOMBRE_MODELO
+    if not ruta.exists():
+        raise FileNotFoundError(f"No existe la versión {version!r} en {registro}.")
+    return ruta.resolve()
+
+
+def listar_versiones(registro: Path = REGISTRO_PATH) -> List[str]:
+    """Versiones publicadas, en orden alfabético."""
+    registro = Path(registro)
+    if not registro.exists():
+        return []
+    return sorted(
+        carpeta.name for carpeta in registro.iterdir()
+        if carpeta.is_dir() and (carpeta / NOMBRE_MODELO).exists()
+    )
+
+
+def version_activa_registro(registro: Path = REGISTRO_PATH) -> Optional[str]:
+    """Nombre de la versión activa del registro (None si no hay registro)."""
+    ruta = Path(registro) / NOMBRE_ACTIVA
+    try:
+        version = ruta.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+    return version or None
+
+
+def ruta_version_activa(registro: Path = REGISTRO_PATH) -> Optional[Path]:
+    """Fichero de modelo de la versión activa (None si no hay registro)."""
+    version = version_activa_registro(registro)
+    return ruta_version(version, registro) if version is not None else None
+
+
+def fijar_activa(version: str, registro: Path = REGISTRO_PATH):
+    """Marca una versión publicada como activa (escritura atómica)."""
+    ruta_version(version, registro)  # comprueba que existe
+    registro = Path(registro)
+    with tempfile.NamedTemporaryFile("w", dir=registro, prefix=".activa_",
+                                     encoding="utf-8", delete=False) as f:
+        f.write(version + "\n")
+    os.replace(f.name, registro / NOMBRE_ACTIVA)
+
+
+def publicar(modelo_path: Path, version: Optional[str] = None, activar: bool = True,
+             tabla: bool = False, registro: Path = REGISTRO_PATH) -> Path:
+    """
+    Copia un fichero de modelo al registro como una versión nueva.
+
+    Junto al modelo se exportan los pesos del scorer lineal (si es una
+    regresión logística) y, con tabla=True, la tabla de riesgos
+    precalculada (tarda más). Si junto al fichero hay un conjunto
+    bootstrap generado para él (src/bootstrap.py), se copia también y,
+    con tabla=True, se construye su tabla de intervalos. Todo
+    se prepara en una carpeta temporal y se mueve a su sitio de una vez.
+
+    Parameters
+    ----------
+    modelo_path : pathlib.Path
+        Fichero .joblib guardado sin comprimir (p. ej. por src.train).
+    version : str, optional
+        Nombre de la versión. Por defecto, la fecha y hora actuales.
+    activar : bool
+        Si True, la versión pasa a ser la activa.
+    tabla : bool
+        Si True, se construyen también la tabla de riesgos (y la de
+        intervalos, si hay conjunto bootstrap).
+
+    Returns
+    -------
+    ruta : pathlib.Path
+        Fichero de modelo de la versión publicada.
+    """
+    import joblib
+
+    from .bootstrap import CONJUNTO_PATH, INTERVALOS_PATH, cargar_conjunto, construir_tabla_intervalos
+    from .scorer_lineal import PESOS_PATH, exportar_pesos, guardar_pesos
+    from .tabla_riesgo import TABLA_PATH, construir_tabla
+
+    version = _validar_nombre(version or datetime.now().strftime("%Y%m%d-%H%M%S"))
+    registro = Path(registro)
+    destino = registro / version
+    if destino.exists():
+        raise ValueError(f"La versión {version!r} ya existe en {registro}.")
+    registro.mkdir(parents=True, exist_ok=True)
+
+    tmp = Path(tempfile.mkdtemp(dir=registro, prefix=f".{version}_"))
+    try:
+        ruta_modelo = tmp / NOMBRE_MODELO
+        shutil.copyfile(modelo_path, ruta_modelo)
+
+        scorer = exportar_pesos(joblib.load(ruta_modelo))
+        if scorer is not None:
+            guardar_pesos(scorer, ruta_modelo, tmp / PESOS_PATH.name)
+        if tabla:
+            construir_tabla(ruta_modelo, tmp / TABLA_PATH.name)
+        origen_conjunto = Path(modelo_path).parent / CONJUNTO_PATH.name
+        conjunto = cargar_conjunto(modelo_path, origen_conjunto)
+        if conjunto is not None:
+            shutil.copyfile(origen_conjunto, tmp / CONJUNTO_PATH.name)
+            shutil.copyfile(origen_conjunto.with_suffix(".json"), tmp / CONJUNTO_PATH.with_suffix(".json").name)
+            if tabla:
+                construir_tabla_intervalos(conjunto, ruta_modelo, tmp / CONJUNTO_PATH.name,
+                                           tmp / INTERVALOS_PATH.name)
+
+        os.replace(tmp, destino)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    if activar:
+        fijar_activa(version, registro)
+    return destino / NOMBRE_MODELO
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Registro de versiones del modelo de MADly Safe")
+    ordenes = parser.add_subparsers(dest="orden", required=True)
+
+    p_publicar = ordenes.add_parser("publicar", help="Publica un fichero de modelo como versión nueva")
+    p_publicar.add_argument("modelo", help="Fichero .joblib")
+    p_publicar.add_argument("--version", help="Nombre de la versión (por defecto, fecha y hora)")
+    p_publicar.add_argument("--tabla", action="store_true", help="Construye también la tabla de riesgos")
+    p_publicar.add_argument("--no-activar", action="store_true", help="Publica sin activarla")
+
+    p_activar = ordenes.add_parser("activar", help="Cambia la versión activa")
+    p_activar.add_argument("version")
+
+    ordenes.add_parser("listar", help="Muestra las versiones publicadas")
+    args = parser.parse_args(argv)
+
+    if args.orden == "publicar":
+        ruta = publicar(args.modelo, args.version, activar=not args.no_activar, tabla=args.tabla)
+        print(f"Versión {ruta.parent.name} publicada en: {ruta.parent}")
+    elif args.orden == "activar":
+        fijar_activa(args.version)
+        print(f"Versión activa: {args.version}")
+    else:
+        activa = version_activa_registro()
+        for version in listar_versiones():
+            print(("* " if version == activa else "  ") + version)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,486 @@
+# respuestas.py
+"""
+Compresión y caché HTTP de las respuestas de la app Dash de MADly Safe.
+
+Cada visita descargaba enteros y sin comprimir los paquetes JS de Dash y
+Plotly, y cada respuesta de un callback era JSON sin comprimir, aunque un
+mismo escenario da siempre los mismos bytes. registrar(app, ...) añade al
+servidor Flask:
+
+- Compresión con brotli (si el paquete está instalado) o gzip de las
+  respuestas de texto (JS, CSS, JSON, HTML) de al menos MIN_BYTES_GZIP,
+  según el Accept-Encoding del navegador.
+- Cache-Control "public, max-age=<un año>, immutable" para los ficheros
+  con huella: los de /_dash-component-suites/ con la versión en el nombre
+  y los de /assets/ pedidos con ?m=<fecha> (así los enlaza Dash).
+- ETag débil (la misma para todas las codificaciones) en el resto de
+  respuestas: una GET con If-None-Match que coincide (la página, el
+  layout, los ficheros sin huella) recibe un 304 sin cuerpo.
+- Una caché de respuestas compartida por todos los workers: un directorio
+  (por defecto en /dev/shm, que es memoria compartida) con un fichero por
+  respuesta. Se guardan el layout y los callbacks indicados, cuya
+  respuesta solo depende de los valores de entrada y del modelo en uso;
+  la clave es el hash de esos valores, de la versión del modelo (con la
+  firma de su fichero) y de la huella del código de la app (y, para el
+  layout, de la firma de los datos que lleve, p. ej. el mapa). Cada
+  respuesta se guarda también ya comprimida, así que un acierto no llama
+  al callback ni comprime nada. Los ficheros estáticos comprimidos van a
+  la misma caché.
+
+Las salidas que no deben guardarse (un error, el layout con el aviso de
+"Cargando el modelo…") lo indican con no_cachear().
+
+MADLY_CACHE_RESPUESTAS fija el número máximo de ficheros de la caché (0
+la desactiva; la compresión y las cabeceras se mantienen),
+MADLY_CACHE_RESPUESTAS_DIR su directorio, y MADLY_CACHE_HTTP=0 desactiva
+todo el módulo.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+
+from dash.fingerprint import check_fingerprint
+from flask import Response, g, has_request_context, request
+
+try:
+    import brotli
+except ImportError:
+    # Sin el paquete brotli se comprime solo con gzip
+    brotli = None
+
+from .api import MIN_BYTES_GZIP
+from .model import version_cargada
+
+ACTIVA = os.environ.get("MADLY_CACHE_HTTP", "1") != "0"
+CAPACIDAD = int(os.environ.get("MADLY_CACHE_RESPUESTAS", "2000"))
+
+# Un año: lo habitual para ficheros que no cambian nunca
+MAX_AGE_INMUTABLE = 31536000
+
+NIVEL_GZIP = 6
+CALIDAD_BROTLI = 5
+
+# Tipos de contenido que compensa comprimir
+TIPOS_COMPRIMIBLES = ("text/", "application/json", "application/javascript", "image/svg+xml")
+
+
+def _directorio_por_defecto() -> Path:
+    # /dev/shm es memoria compartida en Linux; si no está, la carpeta temporal
+    base = Path("/dev/shm")
+    if not (base.is_dir() and os.access(base, os.W_OK)):
+        base = Path(tempfile.gettempdir())
+    return base / "madly-respuestas"
+
+
+class AlmacenRespuestas:
+    """
+    Caché de cuerpos de respuesta en un directorio, compartida por todos
+    los procesos que lo usan.
+
+    Cada entrada es un fichero con el nombre de su clave; se escribe en un
+    temporal y se renombra, así que nadie lee una entrada a medias. Cuando
+    hay más de `capacidad` ficheros se borran los usados hace más tiempo
+    (un acierto actualiza la fecha del fichero). Los contadores son de
+    este proceso.
+
+    Parameters
+    ----------
+    directorio : pathlib.Path
+        Carpeta de la caché (se crea si no existe).
+    capacidad : int
+        Número máximo de entradas (0: no se guarda nada).
+    """
+
+    # Cada cuántas escrituras de este proceso se comprueba si hay que recortar
+    RECORTE_CADA = 64
+
+    def __init__(self, directorio: Path, capacidad: int):
+        if capacidad < 0:
+            raise ValueError("La capacidad de la caché no puede ser negativa.")
+        self.directorio = Path(directorio)
+        self.capacidad = int(capacidad)
+        self._lock = threading.Lock()
+        self._escrituras = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        if self.capacidad > 0:
+            self.directorio.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+    def obtener(self, *claves) -> tuple:
+        """
+        (clave, datos) de la primera de `claves` que esté guardada, o
+        (None, None). Cuenta un acierto o un fallo por llamada.
+        """
+        if self.capacidad == 0:
+            return None, None
+        for clave in claves:
+            ruta = self.directorio / clave
+            try:
+                datos = ruta.read_bytes()
+            except OSError:
+                continue
+            try:
+                os.utime(ruta)
+            except OSError:
+                pass  # otro proceso la acaba de desalojar
+            with self._lock:
+                self.aciertos += 1
+            return clave, datos
+        with self._lock:
+            self.fallos += 1
+        return None, None
+
+    def guardar(self, clave: str, datos: bytes):
+        if self.capacidad == 0:
+            return
+        temporal = None
+        try:
+            fd, temporal = tempfile.mkstemp(dir=self.directorio, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(datos)
+            os.replace(temporal, self.directorio / clave)
+        except OSError:
+            # p. ej. sin espacio: la caché solo ahorra trabajo, no es necesaria
+            if temporal is not None and os.path.exists(temporal):
+                os.unlink(temporal)
+            return
+        with self._lock:
+            self._escrituras += 1
+            recortar = self._escrituras % self.RECORTE_CADA == 0
+        if recortar:
+            self.recortar()
+
+    def _entradas(self) -> list:
+        # (fecha de último uso, ruta) de cada entrada
+        entradas = []
+        try:
+            with os.scandir(self.directorio) as it:
+                for entrada in it:
+                    if entrada.name.startswith("."):
+                        continue
+                    try:
+                        entradas.append((entrada.stat().st_mtime_ns, entrada.path))
+                    except OSError:
+                        pass
+        except FileNotFoundError:
+            pass
+        return entradas
+
+    def recortar(self):
+        """Borra las entradas usadas hace más tiempo hasta dejar `capacidad`."""
+        entradas = self._entradas()
+        sobran = len(entradas) - self.capacidad
+        if sobran <= 0:
+            return
+        entradas.sort()
+        borradas = 0
+        for _, ruta in entradas[:sobran]:
+            try:
+                os.unlink(ruta)
+                borradas += 1
+            except OSError:
+                pass  # ya la ha borrado otro worker
+        with self._lock:
+            self.desalojos += borradas
+
+    def limpiar(self):
+        """Borra todas las entradas. Mantiene los contadores."""
+        for _, ruta in self._entradas():
+            try:
+                os.unlink(ruta)
+            except OSError:
+                pass
+
+    def estadisticas(self) -> dict:
+        entradas = len(self._entradas()) if self.capacidad else 0
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "capacidad": self.capacidad,
+                "entradas": entradas,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "desalojos": self.desalojos,
+                "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+            }
+
+
+_ALMACEN = AlmacenRespuestas(_directorio_por_defecto(), 0)
+
+
+def estadisticas_respuestas() -> dict:
+    """Estadísticas de la caché de respuestas de este proceso."""
+    return _ALMACEN.estadisticas()
+
+
+def no_cachear():
+    """La respuesta de la petición en curso no debe guardarse en la caché."""
+    if has_request_context():
+        g.madly_no_cachear = True
+
+
+def id_callback(*salidas) -> str:
+    """Id de un callback por sus Output (el campo "output" de sus peticiones)."""
+    ids = [f"{s.component_id}.{s.component_property}" for s in salidas]
+    return ids[0] if len(ids) == 1 else ".." + "...".join(ids) + ".."
+
+
+def comprimir(datos: bytes, codificacion: str) -> bytes:
+    """Cuerpo comprimido con "br" o "gzip"."""
+    if codificacion == "br":
+        return brotli.compress(datos, quality=CALIDAD_BROTLI)
+    # mtime=0: los mismos datos dan siempre los mismos bytes
+    return gzip.compress(datos, compresslevel=NIVEL_GZIP, mtime=0)
+
+
+def _codificacion() -> Optional[str]:
+    # Codificación preferida de las que acepta el cliente
+    aceptadas = request.accept_encodings
+    if brotli is not None and aceptadas["br"]:
+        return "br"
+    if aceptadas["gzip"]:
+        return "gzip"
+    return None
+
+
+def _hash(*partes) -> str:
+    texto = json.dumps(partes, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+def _variante(clave: str, codificacion: Optional[str]) -> str:
+    return clave if codificacion is None else f"{clave}.{codificacion}"
+
+
+def _huella_codigo() -> str:
+    # Versión de Dash y Plotly y fecha y tamaño de los módulos de la app y
+    # sus assets: al cambiar el código, las respuestas guardadas dejan de valer
+    import dash
+    import plotly
+
+    carpeta = Path(__file__).parent
+    ficheros = sorted(carpeta.glob("*.py")) + sorted((carpeta / "assets").glob("*"))
+    firmas = []
+    for ruta in ficheros:
+        info = ruta.stat()
+        firmas.append((ruta.name, info.st_mtime_ns, info.st_size))
+    return _hash(dash.__version__, plotly.__version__, firmas)
+
+
+_GENERACION = (None, None)
+
+
+def _generacion() -> Optional[str]:
+    # Versión del modelo en uso y firma de su fichero (al reentrenar, el
+    # fichero se sobrescribe con el mismo nombre de versión). None si aún
+    # no hay modelo.
+    global _GENERACION
+    activa = version_cargada()
+    if activa is None:
+        return None
+    version, generacion = _GENERACION
+    if version is not activa:
+        try:
+            info = activa.ruta.stat()
+        except OSError:
+            return None
+        generacion = f"{activa.version}:{info.st_mtime_ns}:{info.st_size}"
+        _GENERACION = (activa, generacion)
+    return generacion
+
+
+def _aplanar(entradas) -> list:
+    # Las entradas con comodines (ALL) llegan como listas
+    planas = []
+    for entrada in entradas or []:
+        planas.extend(entrada if isinstance(entrada, list) else [entrada])
+    return planas
+
+
+def _no_modificada(etag: str) -> Response:
+    respuesta = Response(status=304)
+    respuesta.set_etag(etag, weak=True)
+    respuesta.vary.add("Accept-Encoding")
+    return respuesta
+
+
+def registrar(app, callbacks: dict, layout: bool = True, huella: str = "",
+              firma_layout: Optional[Callable[[], object]] = None):
+    """
+    Añade la compresión, las cabeceras de caché y la caché de respuestas
+    al servidor Flask de una app Dash (llamar después de definir los
+    callbacks).
+
+    Parameters
+    ----------
+    app : dash.Dash
+    callbacks : dict
+        {id del callback (ver id_callback): ids "componente.propiedad" de
+        las entradas que no cambian la respuesta (botones, avisos de
+        carga)}. Solo se guardan las respuestas de estos callbacks.
+    layout : bool
+        Guardar también el layout (GET /_dash-layout).
+    huella : str
+        Lo que cambie la respuesta y no esté en el código ni en las
+        entradas (p. ej. variables de entorno de la app).
+    firma_layout : callable, optional
+        Función sin argumentos que identifica los datos del layout que no
+        dependen del modelo (p. ej. el cubo del mapa). Su valor entra en
+        la clave del layout, y si cambia durante la petición el layout no
+        se guarda.
+
+    Raises
+    ------
+    ValueError
+        Si algún id de `callbacks` no es un callback de la app.
+    """
+    global _ALMACEN
+
+    if not ACTIVA:
+        return
+    desconocidos = [c for c in callbacks if c not in app.callback_map]
+    if desconocidos:
+        raise ValueError(f"Callbacks desconocidos: {', '.join(desconocidos)}.")
+
+    directorio = os.environ.get("MADLY_CACHE_RESPUESTAS_DIR")
+    _ALMACEN = AlmacenRespuestas(Path(directorio) if directorio else _directorio_por_defecto(),
+                                 CAPACIDAD)
+    huella = _hash(_huella_codigo(), huella)
+
+    server = app.server
+    prefijo = app.config.routes_pathname_prefix
+    ruta_callbacks = prefijo + "_dash-update-component"
+    ruta_layout = prefijo + "_dash-layout"
+    rutas_estaticas = (prefijo + "_dash-component-suites/",
+                       prefijo + app.config.assets_url_path.strip("/") + "/")
+
+    def _contexto(es_layout: bool):
+        # Modelo en uso y, para el layout, sus otros datos (None si aún
+        # no hay modelo)
+        generacion = _generacion()
+        if generacion is None:
+            return None
+        if es_layout and firma_layout is not None:
+            return generacion, firma_layout()
+        return generacion, None
+
+    def _clave_peticion() -> Optional[str]:
+        if request.method == "POST" and request.path == ruta_callbacks:
+            cuerpo = request.get_json(silent=True)
+            salida = cuerpo.get("output") if isinstance(cuerpo, dict) else None
+            if salida not in callbacks:
+                return None
+            ignorar = callbacks[salida]
+            valores = [
+                [e.get("id"), e.get("property"), e.get("value")]
+                for e in _aplanar(cuerpo.get("inputs")) + _aplanar(cuerpo.get("state"))
+                if f"{e.get('id')}.{e.get('property')}" not in ignorar
+            ]
+        elif request.method == "GET" and layout and request.path == ruta_layout:
+            salida, valores = "layout", None
+        else:
+            return None
+        contexto = _contexto(salida == "layout")
+        if contexto is None:
+            return None
+        g.madly_contexto = contexto
+        return _hash(huella, contexto, salida, valores)
+
+    @server.before_request
+    def _respuesta_guardada():
+        if _ALMACEN.capacidad == 0:
+            return None
+        clave = _clave_peticion()
+        if clave is None:
+            return None
+        g.madly_clave = clave
+        # La respuesta solo depende de la clave: la ETag sale de ella
+        etag = clave[:32]
+        if request.method == "GET" and request.if_none_match.contains_weak(etag):
+            g.madly_servida = True
+            return _no_modificada(etag)
+
+        codificacion = _codificacion()
+        claves = [clave] if codificacion is None else [_variante(clave, codificacion), clave]
+        encontrada, cuerpo = _ALMACEN.obtener(*claves)
+        if cuerpo is None:
+            return None
+        g.madly_servida = True
+        respuesta = Response(cuerpo, mimetype="application/json")
+        if encontrada != clave:
+            respuesta.headers["Content-Encoding"] = codificacion
+        respuesta.set_etag(etag, weak=True)
+        respuesta.vary.add("Accept-Encoding")
+        return respuesta
+
+    @server.after_request
+    def _preparar_respuesta(respuesta):
+        if g.get("madly_servida") or respuesta.status_code != 200:
+            return respuesta
+
+        estatico = request.method in ("GET", "HEAD") and request.path.startswith(rutas_estaticas)
+        if not estatico:
+            inmutable = False
+        elif request.path.startswith(rutas_estaticas[0]):
+            inmutable = check_fingerprint(request.path)[1]
+        else:
+            inmutable = request.args.get("m") is not None
+        if inmutable:
+            # send_file marca los de /assets/ como no-cache
+            respuesta.cache_control.no_cache = None
+            respuesta.cache_control.public = True
+            respuesta.cache_control.max_age = MAX_AGE_INMUTABLE
+            respuesta.cache_control.immutable = True
+
+        tipo = respuesta.mimetype or ""
+        if ("Content-Encoding" in respuesta.headers or not tipo.startswith(TIPOS_COMPRIMIBLES)
+                or respuesta.cache_control.no_transform):
+            return respuesta
+        # Los ficheros de /assets/ llegan como flujo (send_file): se leen
+        respuesta.direct_passthrough = False
+        cuerpo = respuesta.get_data()
+
+        clave = g.get("madly_clave")
+        if clave is not None and (g.get("madly_no_cachear")
+                                  or _contexto(request.path == ruta_layout) != g.get("madly_contexto")):
+            # Error, aviso de carga o el modelo (o los datos del layout) ha
+            # cambiado durante la petición
+            clave = None
+        if clave is not None:
+            _ALMACEN.guardar(clave, cuerpo)
+            etag = clave[:32]
+        elif inmutable:
+            etag = None
+        else:
+            etag = respuesta.get_etag()[0] or hashlib.blake2b(cuerpo, digest_size=16).hexdigest()
+        if etag is not None:
+            respuesta.set_etag(etag, weak=True)
+            if request.method in ("GET", "HEAD") and request.if_none_match.contains_weak(etag):
+                return _no_modificada(etag)
+
+        respuesta.vary.add("Accept-Encoding")
+        codificacion = _codificacion()
+        if codificacion is None or len(cuerpo) < MIN_BYTES_GZIP:
+            return respuesta
+        if clave is not None:
+            comprimido = comprimir(cuerpo, codificacion)
+            _ALMACEN.guardar(_variante(clave, codificacion), comprimido)
+        elif estatico:
+            # Los estáticos se comprimen una vez para todos los workers
+            base = _hash("estatico", request.full_path, etag, len(cuerpo))
+            _, comprimido = _ALMACEN.obtener(_variante(base, codificacion))
+            if comprimido is None:
+                comprimido = comprimir(cuerpo, codificacion)
+                _ALMACEN.guardar(_variante(base, codificacion), comprimido)
+        else:
+            comprimido = comprimir(cuerpo, codificacion)
+        respuesta.set_data(comprimido)
+        respuesta.headers["Content-Encoding"] = codificacion
+        return respuesta
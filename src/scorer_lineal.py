@@ -0,0 +1,183 @@
+# scorer_lineal.py
+"""
+Puntuación rápida para el modelo lineal de MADly Safe.
+
+El modelo desplegado es una Regresión Logística sobre variables
+categóricas con one-hot, así que cada predicción se reduce a sumar un
+coeficiente por variable (el de su categoría, o 0 si la categoría no se
+vio en el entrenamiento, igual que handle_unknown="ignore") más el
+intercepto, y aplicar la sigmoide.
+
+- exportar_pesos(modelo) extrae del pipeline las categorías del
+  OneHotEncoder, los valores de imputación y los coeficientes en una
+  tabla de pesos por variable.
+- guardar_pesos / cargar_pesos la guardan y leen como JSON, de modo que la
+  app puede puntuar sin cargar scikit-learn ni pandas.
+- ScorerLineal.puntuar(filas) calcula las probabilidades con NumPy.
+
+El scorer coincide con predict_proba a menos de 1e-9 (en la práctica,
+redondeo de float64). Ojo: si el modelo tiene tabla de riesgos
+(src/tabla_riesgo.py), la app la lee antes que el scorer y esa tabla es
+float32, así que lo que se sirve difiere de predict_proba hasta media
+unidad de float32 en [0, 1) (2**-25, unos 3e-8). El scorer solo puntúa
+los escenarios que no están en la tabla. benchmarks/bench_scorer_lineal.py
+comprueba las dos tolerancias.
+
+Para regenerar el JSON, desde la raíz del proyecto:
+
+    python -m src.scorer_lineal
+"""
+
+import json
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from .utilidades import es_nulo, huella_fichero
+
+# Ruta por defecto de los pesos exportados (junto al modelo)
+PESOS_PATH = Path(__file__).resolve().parents[1] / "models" / "pesos_lineales_2025.json"
+
+
+class ScorerLineal:
+    """
+    Regresión logística sobre variables categóricas, sin sklearn.
+
+    Parameters
+    ----------
+    columnas : list of str
+        Columnas de entrada, en el orden en que se pasan los valores.
+    pesos : list of dict
+        Para cada columna, {categoría: coeficiente}.
+    intercepto : float
+    imputacion : list
+        Valor con el que se sustituyen los nulos en cada columna.
+    """
+
+    def __init__(self, columnas: List[str], pesos: List[dict], intercepto: float,
+                 imputacion: list):
+        self.columnas = list(columnas)
+        self.pesos = [dict(p) for p in pesos]
+        self.intercepto = float(intercepto)
+        self.imputacion = list(imputacion)
+
+        # Versión en arrays: índice por categoría y vector de coeficientes
+        # con un 0 al final para las categorías desconocidas
+        self._indices = [{cat: i for i, cat in enumerate(p)} for p in self.pesos]
+        self._coefs = [np.append(np.fromiter(p.values(), dtype=float, count=len(p)), 0.0)
+                       for p in self.pesos]
+
+    def _codigos(self, j: int, valores: Sequence) -> np.ndarray:
+        indice = self._indices[j]
+        desconocido = len(indice)
+        imputado = self.imputacion[j]
+        return np.fromiter(
+            (indice.get(imputado if es_nulo(v) else v, desconocido) for v in valores),
+            dtype=np.intp, count=len(valores),
+        )
+
+    def decision(self, filas: Sequence[Sequence]) -> np.ndarray:
+        """Logit (X·coef + intercepto) para cada fila."""
+        columnas = list(zip(*filas)) if len(filas) else [()] * len(self.columnas)
+        z = np.full(len(filas), self.intercepto)
+        for j, valores in enumerate(columnas):
+            z += self._coefs[j][self._codigos(j, valores)]
+        return z
+
+    def puntuar(self, filas: Sequence[Sequence]) -> np.ndarray:
+        """
+        Probabilidad de la clase positiva para cada fila (equivalente a
+        predict_proba(X)[:, 1] del pipeline original).
+
+        Parameters
+        ----------
+        filas : list of tuple
+            Valores de cada fila en el orden de `columnas`.
+        """
+        return 1.0 / (1.0 + np.exp(-self.decision(filas)))
+
+    def a_dict(self) -> dict:
+        return {
+            "columnas": self.columnas,
+            "pesos": self.pesos,
+            "intercepto": self.intercepto,
+            "imputacion": self.imputacion,
+        }
+
+
+def exportar_pesos(modelo) -> Optional[ScorerLineal]:
+    """
+    Extrae la tabla de pesos de un pipeline
+    preprocess (imputer + onehot) → LogisticRegression binaria.
+
+    Devuelve None si el modelo no tiene esa forma (p.ej. un Random Forest),
+    en cuyo caso hay que seguir usando predict_proba.
+    """
+    try:
+        preprocess = modelo.named_steps["preprocess"]
+        clf = modelo.named_steps["clf"]
+        (nombre, transformador, columnas), = [
+            t for t in preprocess.transformers_ if t[0] != "remainder" or t[1] != "drop"
+        ]
+        imputer = transformador.named_steps["imputer"]
+        onehot = transformador.named_steps["onehot"]
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+    if type(clf).__name__ != "LogisticRegression" or clf.coef_.shape[0] != 1:
+        return None
+    if onehot.drop is not None or onehot.handle_unknown != "ignore":
+        return None
+    if getattr(onehot, "infrequent_categories_", None) and any(
+            c is not None for c in onehot.infrequent_categories_):
+        return None
+
+    coefs = clf.coef_.ravel()
+    pesos = []
+    inicio = 0
+    for categorias in onehot.categories_:
+        fin = inicio + len(categorias)
+        pesos.append({str(cat): float(c) for cat, c in zip(categorias, coefs[inicio:fin])})
+        inicio = fin
+
+    return ScorerLineal(
+        columnas=[str(c) for c in columnas],
+        pesos=pesos,
+        intercepto=float(clf.intercept_[0]),
+        imputacion=[str(v) for v in imputer.statistics_],
+    )
+
+
+def guardar_pesos(scorer: ScorerLineal, modelo_path: Path, ruta: Path = PESOS_PATH) -> Path:
+    """Guarda los pesos en JSON junto con la huella del fichero de modelo."""
+    datos = {**scorer.a_dict(), "modelo": Path(modelo_path).name,
+             "huella_modelo": huella_fichero(modelo_path)}
+    ruta = Path(ruta)
+    ruta.write_text(json.dumps(datos, ensure_ascii=False, indent=1), encoding="utf-8")
+    return ruta
+
+
+def cargar_pesos(modelo_path: Path, ruta: Path = PESOS_PATH) -> Optional[ScorerLineal]:
+    """
+    Lee los pesos exportados. Devuelve None si no existen o corresponden a
+    otro fichero de modelo.
+    """
+    ruta = Path(ruta)
+    if not ruta.exists():
+        return None
+    datos = json.loads(ruta.read_text(encoding="utf-8"))
+    if datos.get("huella_modelo") != huella_fichero(modelo_path):
+        return None
+    return ScorerLineal(datos["columnas"], datos["pesos"], datos["intercepto"], datos["imputacion"])
+
+
+if __name__ == "__main__":
+    import joblib
+
+    from .model import MODEL_PATH
+
+    scorer = exportar_pesos(joblib.load(MODEL_PATH))
+    if scorer is None:
+        raise SystemExit("El modelo no es una regresión logística sobre one-hot: no se exportan pesos.")
+    print(f"Pesos lineales guardados en: {guardar_pesos(scorer, MODEL_PATH)}")
@@ -0,0 +1,240 @@
+# tabla_riesgo.py
+"""
+Tabla de riesgos precalculada para MADly Safe.
+
+El espacio de entrada de la app es finito (todas las combinaciones de
+las opciones de los desplegables: ~635.000 escenarios), así que podemos
+puntuarlo entero una sola vez con el modelo y guardar el resultado en un
+array float32 indexado por los códigos de cada categoría. Al ser float32,
+cada riesgo difiere del de predict_proba hasta 2**-25 (unos 3e-8), frente
+al < 1e-9 del scorer lineal.
+
+- construir_tabla(...) puntúa el producto cartesiano completo por lotes
+  y lo guarda como .npy (más un .json con los ejes y la huella del modelo).
+- cargar_tabla(...) abre la tabla con memoria mapeada (mmap), de modo que
+  los workers de gunicorn comparten las mismas páginas del fichero.
+- TablaRiesgo.riesgos_franjas(...) responde en O(1) sin pasar por sklearn.
+- TablaRiesgo.subrejilla(...) devuelve de una vez los riesgos de un perfil
+  para todos los días, franjas y distritos (lo usa model.planificar_franjas).
+- TablaRiesgo.celda(...) devuelve lo guardado para un escenario; la tabla
+  de intervalos del conjunto bootstrap (src/bootstrap.py) usa estos
+  mismos ejes con una dimensión más.
+
+Para regenerarla, desde la raíz del proyecto:
+
+    python -m src.tabla_riesgo
+"""
+
+import json
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .model import (
+    MODEL_PATH,
+    _normalizar_dia_semana,
+    _normalizar_meteo,
+)
+from .opciones import (
+    TIPOS_PERSONA,
+    TIPOS_VEHICULO,
+    RANGOS_EDAD,
+    SEXO_OPCIONES,
+    DISTRITOS,
+    DIAS_SEMANA,
+    METEOROLOGIA,
+    FRANJAS_HORARIAS,
+    valores,
+)
+from .utilidades import huella_fichero
+
+TABLA_PATH = MODEL_PATH.parent / "tabla_riesgo_2025.npy"
+
+# Tamaño de lote (filas) al puntuar la rejilla completa
+TAMAÑO_LOTE = 100_000
+
+
+def _ruta_meta(ruta_tabla: Path) -> Path:
+    return ruta_tabla.with_suffix(".json")
+
+
+def huella_modelo(path: Path = MODEL_PATH) -> str:
+    """SHA-256 del fichero de modelo, para detectar tablas desactualizadas."""
+    return huella_fichero(path)
+
+
+def ejes_por_defecto() -> List[Tuple[str, list]]:
+    """
+    Ejes de la tabla: (columna del modelo, valores ya normalizados).
+
+    La franja horaria va en último lugar para que las seis franjas de un
+    mismo escenario queden contiguas en memoria.
+    """
+    return [
+        ("tipo_persona", valores(TIPOS_PERSONA)),
+        ("tipo_vehiculo", valores(TIPOS_VEHICULO)),
+        ("rango_edad", valores(RANGOS_EDAD)),
+        ("sexo", valores(SEXO_OPCIONES)),
+        ("distrito", valores(DISTRITOS)),
+        ("dia_semana", [_normalizar_dia_semana(v) for v in valores(DIAS_SEMANA)]),
+        ("estado_meteorológico", [_normalizar_meteo(v) for v in valores(METEOROLOGIA)]),
+        ("franja_horaria", valores(FRANJAS_HORARIAS)),
+    ]
+
+
+class TablaRiesgo:
+    """
+    Riesgos precalculados para todas las combinaciones de los ejes.
+
+    Parameters
+    ----------
+    valores : numpy.ndarray
+        Array float32 con una dimensión por eje (puede ser un memmap).
+    ejes : list of (str, list)
+        Columna del modelo y valores de cada eje, en el orden del array.
+    """
+
+    def __init__(self, valores: np.ndarray, ejes: List[Tuple[str, list]]):
+        # Vista ndarray (si es un memmap, sigue leyendo las páginas del
+        # fichero pero sin el coste por indexado de la subclase)
+        self.valores = np.asarray(valores)
+        self.ejes = ejes
+        self._indices = [{v: i for i, v in enumerate(vals)} for _, vals in ejes]
+
+    def riesgos_franjas(self, tipo_persona, tipo_vehiculo, rango_edad, sexo,
+                        distrito, dia_norm, meteo_norm,
+                        franjas: Sequence[str]) -> Optional[List[Tuple[str, float]]]:
+        """
+        Devuelve [(franja, probabilidad), ...] leyendo de la tabla, o None
+        si algún valor del escenario no está en los ejes (y hay que usar
+        el modelo).
+        """
+        claves = (tipo_persona, tipo_vehiculo, rango_edad, sexo,
+                  distrito, dia_norm, meteo_norm)
+        try:
+            idx = tuple(ind[c] for ind, c in zip(self._indices, claves))
+            idx_franjas = [self._indices[-1][fr] for fr in franjas]
+        except (KeyError, TypeError):
+            return None
+
+        fila = self.valores[idx]
+        return [(fr, float(fila[i])) for fr, i in zip(franjas, idx_franjas)]
+
+    def celda(self, tipo_persona, tipo_vehiculo, rango_edad, sexo,
+              distrito, dia_norm, meteo_norm, franja):
+        """
+        Valor guardado para un escenario (un escalar o, si el array tiene
+        una dimensión más que los ejes, el vector de esa dimensión), o None
+        si algún valor no está en los ejes.
+        """
+        claves = (tipo_persona, tipo_vehiculo, rango_edad, sexo,
+                  distrito, dia_norm, meteo_norm, franja)
+        try:
+            idx = tuple(ind[c] for ind, c in zip(self._indices, claves))
+        except (KeyError, TypeError):
+            return None
+        return self.valores[idx]
+
+    def subrejilla(self, tipo_persona, tipo_vehiculo, rango_edad, sexo, meteo_norm,
+                   distritos: Sequence[str], dias_norm: Sequence[str],
+                   franjas: Sequence[str]) -> Optional[np.ndarray]:
+        """
+        Riesgos de un perfil para todas las combinaciones de día, franja y
+        distrito, con un único indexado del array.
+
+        Returns
+        -------
+        riesgos : numpy.ndarray or None
+            Array (día, franja, distrito) en el orden recibido, o None si
+            algún valor no está en los ejes.
+        """
+        ind_distrito, ind_dia, ind_meteo, ind_franja = self._indices[4:]
+        try:
+            idx = tuple(ind[c] for ind, c in
+                        zip(self._indices, (tipo_persona, tipo_vehiculo, rango_edad, sexo)))
+            idx_meteo = ind_meteo[meteo_norm]
+            idx_distritos = [ind_distrito[d] for d in distritos]
+            idx_dias = [ind_dia[d] for d in dias_norm]
+            idx_franjas = [ind_franja[fr] for fr in franjas]
+        except (KeyError, TypeError):
+            return None
+
+        # (distrito, día, franja) del perfil y la meteorología -> (día, franja, distrito)
+        bloque = self.valores[idx][:, :, idx_meteo, :]
+        riesgos = bloque[np.ix_(idx_distritos, idx_dias, idx_franjas)]
+        return np.ascontiguousarray(riesgos.transpose(1, 2, 0), dtype=np.float64)
+
+
+def construir_tabla(modelo_path: Path = MODEL_PATH,
+                    ruta_tabla: Path = TABLA_PATH,
+                    tamaño_lote: int = TAMAÑO_LOTE) -> Path:
+    """
+    Puntúa el producto cartesiano completo de los ejes con el modelo y
+    guarda el resultado en disco.
+
+    Returns
+    -------
+    ruta_tabla : pathlib.Path
+        Ruta del .npy generado (el .json de metadatos va al lado).
+    """
+    import joblib
+    import pandas as pd
+
+    modelo = joblib.load(modelo_path)
+    ejes = ejes_por_defecto()
+    forma = tuple(len(vals) for _, vals in ejes)
+    total = int(np.prod(forma))
+
+    columnas = [col for col, _ in ejes]
+    valores_eje = [np.asarray(vals, dtype=object) for _, vals in ejes]
+
+    tabla = np.empty(total, dtype=np.float32)
+    for inicio in range(0, total, tamaño_lote):
+        fin = min(inicio + tamaño_lote, total)
+        codigos = np.unravel_index(np.arange(inicio, fin), forma)
+        df_lote = pd.DataFrame(
+            {col: vals[cod] for col, vals, cod in zip(columnas, valores_eje, codigos)}
+        )
+        tabla[inicio:fin] = modelo.predict_proba(df_lote)[:, 1]
+
+    ruta_tabla = Path(ruta_tabla)
+    np.save(ruta_tabla, tabla.reshape(forma))
+
+    meta = {
+        "ejes": [[col, vals] for col, vals in ejes],
+        "forma": list(forma),
+        "modelo": Path(modelo_path).name,
+        "huella_modelo": huella_modelo(modelo_path),
+    }
+    _ruta_meta(ruta_tabla).write_text(
+        json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+    return ruta_tabla
+
+
+def cargar_tabla(modelo_path: Path = MODEL_PATH,
+                 ruta_tabla: Path = TABLA_PATH) -> Optional[TablaRiesgo]:
+    """
+    Abre la tabla precalculada con memoria mapeada.
+
+    Devuelve None si no existe o si se generó con otro modelo (la huella
+    del .json no coincide con la del fichero de modelo actual).
+    """
+    ruta_tabla = Path(ruta_tabla)
+    ruta_meta = _ruta_meta(ruta_tabla)
+    if not ruta_tabla.exists() or not ruta_meta.exists():
+        return None
+
+    meta = json.loads(ruta_meta.read_text(encoding="utf-8"))
+    if meta.get("huella_modelo") != huella_modelo(modelo_path):
+        return None
+
+    valores_tabla = np.load(ruta_tabla, mmap_mode="r")
+    ejes = [(col, vals) for col, vals in meta["ejes"]]
+    return TablaRiesgo(valores_tabla, ejes)
+
+
+if __name__ == "__main__":
+    ruta = construir_tabla()
+    print(f"Tabla de riesgos guardada en: {ruta}")
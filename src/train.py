@@ -0,0 +1,318 @@
+# train.py
+"""
+Entrenamiento y selección del modelo de MADly Safe desde la línea de
+comandos (sustituye al entrenamiento a mano de los notebooks 02 y 03).
+
+- Datos: src.etl.cargar_y_preparar_2025, columnas COLUMNAS_MODELO y
+  objetivo "grave". Se reserva un 20 % estratificado como test, como en
+  los notebooks.
+- Para cada familia de modelos se hace una búsqueda de hiperparámetros con
+  validación cruzada estratificada, repartida entre procesos con el
+  backend "loky" de joblib.
+- Regresión Logística y Random Forest reciben el one-hot disperso (sin
+  sparse=False), y HistGradientBoosting usa sus categóricas nativas sobre
+  un OrdinalEncoder, sin one-hot.
+- El mejor modelo según la métrica elegida se reentrena con todo el
+  entrenamiento, se evalúa en test y se guarda con joblib (sin comprimir,
+  para poder abrirlo con mmap_mode="r"), junto con un informe JSON de
+  métricas y tiempos.
+- Por defecto se guarda como candidato (CANDIDATO_PATH), sin tocar el
+  modelo en uso ni su tabla, pesos y conjunto; se pone en producción con
+  src.registro. Escribir sobre el modelo activo exige --reemplazar-activo.
+- Con --bootstrap N, si el ganador es la regresión logística, se genera
+  además su conjunto bootstrap de N miembros (src/bootstrap.py) y su tabla
+  de intervalos precalculada para la app.
+
+Uso, desde la raíz del proyecto:
+
+    python -m src.train
+    python -m src.train --modelos logreg,hgb --n-jobs 4 --salida models/otro/modelo.joblib
+    python -m src.train --modelos logreg --bootstrap 100
+    python -m src.registro publicar models/candidato/modelo_mejor_2025.joblib [--tabla]
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+import numpy as np
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import average_precision_score, f1_score, roc_auc_score
+from sklearn.model_selection import GridSearchCV, StratifiedKFold, train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder
+
+from .bootstrap import CONJUNTO_PATH, INTERVALOS_PATH, construir_tabla_intervalos, entrenar_conjunto, guardar_conjunto
+from .etl import cargar_y_preparar_2025
+from .model import COLUMNAS_MODELO, MODEL_PATH
+from .registro import ruta_version_activa
+
+# Informe por defecto (junto al modelo)
+INFORME_PATH = MODEL_PATH.parent / "informe_entrenamiento_2025.json"
+
+# Salida por defecto: carpeta propia, para que ni el modelo ni el conjunto
+# bootstrap que se genera a su lado pisen los del modelo en uso
+CANDIDATO_PATH = MODEL_PATH.parent / "candidato" / MODEL_PATH.name
+
+METRICAS = ("roc_auc", "f1_macro", "average_precision")
+
+# Rejillas de hiperparámetros por familia de modelos
+REJILLAS = {
+    "logreg": {"clf__C": [0.01, 0.1, 1.0, 10.0]},
+    "rf": {
+        "clf__n_estimators": [100, 300],
+        "clf__min_samples_leaf": [2, 5],
+        "clf__max_depth": [None, 20],
+    },
+    "hgb": {
+        "clf__learning_rate": [0.05, 0.1],
+        "clf__max_leaf_nodes": [15, 31],
+        "clf__l2_regularization": [0.0, 1.0],
+    },
+}
+
+
+def _preproceso_onehot() -> ColumnTransformer:
+    # Misma estructura que el modelo de los notebooks (la usa scorer_lineal)
+    categorical_transformer = Pipeline(steps=[
+        ("imputer", SimpleImputer(strategy="most_frequent")),
+        ("onehot", OneHotEncoder(handle_unknown="ignore")),
+    ])
+    return ColumnTransformer(transformers=[("cat", categorical_transformer, COLUMNAS_MODELO)])
+
+
+def _preproceso_ordinal() -> ColumnTransformer:
+    # Categorías desconocidas y nulos quedan como NaN (valor ausente para HGB)
+    ordinal = OrdinalEncoder(
+        handle_unknown="use_encoded_value",
+        unknown_value=np.nan,
+        encoded_missing_value=np.nan,
+    )
+    return ColumnTransformer(transformers=[("cat", ordinal, COLUMNAS_MODELO)])
+
+
+def construir_pipeline(nombre: str, random_state: int = 42) -> Pipeline:
+    """
+    Pipeline sin entrenar de una familia de modelos: "logreg", "rf" o "hgb".
+    """
+    if nombre == "logreg":
+        preprocess = _preproceso_onehot()
+        clf = LogisticRegression(max_iter=500, class_weight="balanced")
+    elif nombre == "rf":
+        preprocess = _preproceso_onehot()
+        clf = RandomForestClassifier(
+            min_samples_split=5,
+            class_weight="balanced",
+            random_state=random_state,
+            n_jobs=1,  # el paralelismo lo pone la búsqueda
+        )
+    elif nombre == "hgb":
+        preprocess = _preproceso_ordinal()
+        clf = HistGradientBoostingClassifier(
+            categorical_features=[True] * len(COLUMNAS_MODELO),
+            class_weight="balanced",
+            max_iter=400,
+            early_stopping=True,
+            random_state=random_state,
+        )
+    else:
+        raise ValueError(f"Modelo desconocido: {nombre!r} (usa uno de {list(REJILLAS)}).")
+
+    return Pipeline(steps=[("preprocess", preprocess), ("clf", clf)])
+
+
+def _metricas_test(modelo, X_test, y_test) -> dict:
+    y_proba = modelo.predict_proba(X_test)[:, 1]
+    y_pred = modelo.predict(X_test)
+    return {
+        "roc_auc": float(roc_auc_score(y_test, y_proba)),
+        "f1_macro": float(f1_score(y_test, y_pred, average="macro")),
+        "average_precision": float(average_precision_score(y_test, y_proba)),
+    }
+
+
+def buscar(nombre: str, X_train, y_train, metrica: str = "roc_auc",
+           n_folds: int = 5, n_jobs: int = -1, random_state: int = 42):
+    """
+    Búsqueda en rejilla con validación cruzada estratificada.
+
+    Returns
+    -------
+    busqueda : sklearn.model_selection.GridSearchCV
+        Ya ajustada (el mejor pipeline, reentrenado, en best_estimator_).
+    resumen : dict
+        Mejores parámetros, media y desviación de cada métrica en CV y
+        tiempos de la búsqueda.
+    """
+    cv = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=random_state)
+    busqueda = GridSearchCV(
+        construir_pipeline(nombre, random_state),
+        REJILLAS[nombre],
+        scoring=list(METRICAS),
+        refit=metrica,
+        cv=cv,
+        n_jobs=n_jobs,
+    )
+
+    inicio = time.perf_counter()
+    with joblib.parallel_backend("loky", n_jobs=n_jobs):
+        busqueda.fit(X_train, y_train)
+    segundos = time.perf_counter() - inicio
+
+    i = busqueda.best_index_
+    resultados = busqueda.cv_results_
+    resumen = {
+        "mejores_params": {k.replace("clf__", ""): v for k, v in busqueda.best_params_.items()},
+        "cv": {
+            m: {
+                "media": float(resultados[f"mean_test_{m}"][i]),
+                "desviacion": float(resultados[f"std_test_{m}"][i]),
+            }
+            for m in METRICAS
+        },
+        "n_candidatos": len(resultados["params"]),
+        "segundos_busqueda": round(segundos, 3),
+        "segundos_ajuste_medio": round(float(resultados["mean_fit_time"][i]), 3),
+        "segundos_reentreno": round(float(busqueda.refit_time_), 3),
+    }
+    return busqueda, resumen
+
+
+def entrenar(modelos=("logreg", "rf", "hgb"), metrica: str = "roc_auc",
+             n_folds: int = 5, n_jobs: int = -1, random_state: int = 42):
+    """
+    Carga los datos, busca hiperparámetros para cada familia y elige la
+    mejor según la media de `metrica` en validación cruzada.
+
+    Returns
+    -------
+    mejor : sklearn.pipeline.Pipeline
+        Pipeline ganador, entrenado con todo el conjunto de entrenamiento.
+    informe : dict
+        Datos usados, resultados por modelo (CV, test y tiempos) y ganador.
+    """
+    if metrica not in METRICAS:
+        raise ValueError(f"Métrica no válida: {metrica!r} (usa una de {list(METRICAS)}).")
+    desconocidos = [m for m in modelos if m not in REJILLAS]
+    if desconocidos:
+        raise ValueError(f"Modelos desconocidos: {desconocidos} (usa {list(REJILLAS)}).")
+
+    inicio = time.perf_counter()
+    _, df_target = cargar_y_preparar_2025()
+    # Valores como texto, igual que los que recibe el modelo desde la app
+    X = df_target[COLUMNAS_MODELO].astype(object)
+    y = df_target["grave"].astype(int)
+    segundos_datos = time.perf_counter() - inicio
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, stratify=y, random_state=random_state,
+    )
+
+    informe = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "datos": {
+            "filas_entrenamiento": int(len(X_train)),
+            "filas_test": int(len(X_test)),
+            "proporcion_grave": float(y.mean()),
+            "segundos_carga": round(segundos_datos, 3),
+        },
+        "metrica": metrica,
+        "n_folds": n_folds,
+        "n_jobs": n_jobs,
+        "modelos": {},
+    }
+
+    mejor, mejor_nombre, mejor_valor = None, None, -np.inf
+    for nombre in modelos:
+        print(f"Buscando hiperparámetros de {nombre}...")
+        busqueda, resumen = buscar(nombre, X_train, y_train, metrica, n_folds, n_jobs, random_state)
+        resumen["test"] = _metricas_test(busqueda.best_estimator_, X_test, y_test)
+        informe["modelos"][nombre] = resumen
+
+        valor = resumen["cv"][metrica]["media"]
+        print(f"  {metrica} CV: {valor:.4f} | test: {resumen['test'][metrica]:.4f} "
+              f"| {resumen['segundos_busqueda']:.1f} s")
+        if valor > mejor_valor:
+            mejor, mejor_nombre, mejor_valor = busqueda.best_estimator_, nombre, valor
+
+    informe["ganador"] = mejor_nombre
+    informe["segundos_total"] = round(time.perf_counter() - inicio, 3)
+    return mejor, informe
+
+
+def guardar(modelo, informe: dict, salida: Path = CANDIDATO_PATH,
+            ruta_informe: Path = CANDIDATO_PATH.parent / INFORME_PATH.name) -> Path:
+    """Guarda el pipeline (sin comprimir) y el informe JSON."""
+    salida = Path(salida)
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(modelo, salida)
+    informe = {**informe, "modelo": str(salida)}
+    Path(ruta_informe).write_text(json.dumps(informe, ensure_ascii=False, indent=2), encoding="utf-8")
+    return salida
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Entrena y selecciona el modelo de MADly Safe")
+    parser.add_argument("--modelos", default="logreg,rf,hgb",
+                        help="Familias a comparar, separadas por comas")
+    parser.add_argument("--metrica", default="roc_auc", choices=METRICAS,
+                        help="Métrica de CV con la que se elige el ganador")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--n-jobs", type=int, default=-1,
+                        help="Procesos para la búsqueda (-1: todos los núcleos)")
+    parser.add_argument("--salida", default=str(CANDIDATO_PATH), help="Fichero .joblib del ganador")
+    parser.add_argument("--informe", default=None,
+                        help=f"Informe JSON de métricas y tiempos (por defecto, {INFORME_PATH.name} "
+                             "junto a la salida)")
+    parser.add_argument("--bootstrap", type=int, default=0,
+                        help="Miembros del conjunto bootstrap del ganador (0: no se genera)")
+    parser.add_argument("--reemplazar-activo", action="store_true",
+                        help="Permite que --salida sea el modelo en uso")
+    args = parser.parse_args(argv)
+
+    salida = Path(args.salida).resolve()
+    activos = {MODEL_PATH.resolve()}
+    ruta_activa = ruta_version_activa()
+    if ruta_activa is not None:
+        activos.add(Path(ruta_activa).resolve())
+    reemplaza_activo = salida in activos
+    if reemplaza_activo and not args.reemplazar_activo:
+        parser.error(f"{salida} es el modelo en uso; publica el candidato con src.registro "
+                     "o añade --reemplazar-activo")
+    informe_path = Path(args.informe) if args.informe else salida.parent / INFORME_PATH.name
+
+    mejor, informe = entrenar(
+        modelos=[m.strip() for m in args.modelos.split(",") if m.strip()],
+        metrica=args.metrica,
+        n_folds=args.folds,
+        n_jobs=args.n_jobs,
+    )
+    salida = guardar(mejor, informe, salida, informe_path)
+    print(f"Ganador: {informe['ganador']} -> {salida}")
+    print(f"Informe: {informe_path}")
+    if args.bootstrap > 0:
+        inicio = time.perf_counter()
+        try:
+            conjunto = entrenar_conjunto(mejor, args.bootstrap, args.n_jobs)
+        except ValueError as e:
+            print(f"No se genera el conjunto bootstrap: {e}")
+        else:
+            ruta = guardar_conjunto(conjunto, salida, salida.parent / CONJUNTO_PATH.name)
+            construir_tabla_intervalos(conjunto, salida, ruta, salida.parent / INTERVALOS_PATH.name)
+            print(f"Conjunto bootstrap ({conjunto.n_miembros} miembros) y su tabla de intervalos "
+                  f"({time.perf_counter() - inicio:.1f} s): {ruta}")
+    if reemplaza_activo:
+        print("Regenera la tabla y los pesos del nuevo modelo con "
+              "`python -m src.tabla_riesgo` y `python -m src.scorer_lineal`.")
+    else:
+        print(f"Para ponerlo en producción: `python -m src.registro publicar {salida} [--tabla]`")
+
+
+if __name__ == "__main__":
+    main()
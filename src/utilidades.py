@@ -0,0 +1,21 @@
+# utilidades.py
+"""
+Funciones pequeñas que comparten los módulos de puntuación de MADly Safe
+(scorer_lineal, codificador, bootstrap y tabla_riesgo).
+
+Solo usa la biblioteca estándar, para que los módulos que la importan
+sigan sin cargar pandas ni scikit-learn.
+"""
+
+import hashlib
+from pathlib import Path
+
+
+def es_nulo(valor) -> bool:
+    """True para None y NaN (lo que el SimpleImputer trata como vacío)."""
+    return valor is None or (isinstance(valor, float) and valor != valor)
+
+
+def huella_fichero(path: Path) -> str:
+    """SHA-256 de un fichero (p. ej. el modelo), para detectar artefactos desactualizados."""
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()